@@ -22,6 +22,18 @@ if(
     set(PACKAGE_PROJECT_INCLUDES_NAME ${PROJECT_INCLUDES_NAME_FOR_PACKAGE})
 endif()
 
+# if the library is built with interprocedural (link-time) optimization,
+# then its exported targets will have INTERPROCEDURAL_OPTIMIZATION set too,
+# so consumers could check it and enable the same for their targets
+# for inlining across the library boundaries (with a static library)
+if(CMAKE_INTERPROCEDURAL_OPTIMIZATION)
+    foreach(target ${PROJECT_TARGETS_TO_INSTALL})
+        set_property(TARGET ${target}
+            APPEND PROPERTY EXPORT_PROPERTIES INTERPROCEDURAL_OPTIMIZATION
+        )
+    endforeach()
+endif()
+
 # install the target(s) and create export-set
 install(TARGETS ${PROJECT_TARGETS_TO_INSTALL}
     EXPORT "${PROJECT_NAME}Targets"
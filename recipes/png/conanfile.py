@@ -6,16 +6,11 @@ from conan.tools.files import (
     copy,
     export_conandata_patches
 )
-from conan.tools.scm import Git
-from conan.tools.cmake import (
-    CMake,
-    cmake_layout,
-    CMakeToolchain
-)
 
 class pkgConan(ConanFile):
     name = "png"
     version = "1.6.53"
+    recipe_version = 5
 
     url = "https://libpng.sourceforge.io/"
     description = "PNG reference library"
@@ -24,11 +19,25 @@ class pkgConan(ConanFile):
     user = "decovar"
     channel = "public"
 
+    python_requires = "recipe-helpers/2026.10.17@decovar/public"
+    python_requires_extend = "recipe-helpers.CMakeRecipe"
+
     options = {
-        "shared": [True, False]
+        "shared": [True, False],
+        # interprocedural (link-time) optimization, which lets the compiler
+        # inline functions across source files of the library
+        "lto": [True, False],
+        "unity_build": [True, False],
+        # profile-guided optimization: the library is built twice, first with
+        # instrumentation for running the training program from `pgo` folder,
+        # and then with the collected profile
+        "pgo": [True, False]
     }
     default_options = {
-        "shared": False
+        "shared": False,
+        "lto": False,
+        "unity_build": False,
+        "pgo": False
     }
 
     settings = "os", "compiler", "build_type", "arch"
@@ -48,23 +57,29 @@ class pkgConan(ConanFile):
             src=self.recipe_folder,
             dst=pathlib.Path(self.export_sources_folder) / "_additional-files"
         )
+        copy(
+            self,
+            "*",
+            src=pathlib.Path(self.recipe_folder) / "pgo",
+            dst=pathlib.Path(self.export_sources_folder) / "pgo"
+        )
 
     def requirements(self):
         self.requires("zlib/1.3.1@decovar/public")
 
-    def layout(self):
-        cmake_layout(self)
-
     def source(self):
-        git = Git(self)
-        git.clone(
+        # only the pinned commit is fetched, without the entire history,
+        # and if the sources cache is configured, then they are fetched
+        # and prepared just once for all the profiles/configurations
+        self.python_requires["recipe-helpers"].module.fetchSources(
+            self,
             url="git@github.com:pnggroup/libpng.git",
-            hide_url=False,
-            target="src"
+            commit="4e3f57d50f552841550a36eabbb3fbcecacb7750",
+            target="src",
+            prepare=self.prepareSources
         )
-        git.folder = "src"
-        git.checkout("4e3f57d50f552841550a36eabbb3fbcecacb7750")
 
+    def prepareSources(self):
         apply_conandata_patches(self)
 
         copy(
@@ -74,11 +89,7 @@ class pkgConan(ConanFile):
             dst=pathlib.Path(self.export_sources_folder) / "src"
         )
 
-    def generate(self):
-        tc = CMakeToolchain(self, generator="Ninja")
-        tc.generate()
-
-    def build(self):
+    def getCMakeVariables(self):
         cmakeConfigurationVariables = {
             "PNG_TESTS": 0,
             "PNG_TOOLS": 0
@@ -104,17 +115,4 @@ class pkgConan(ConanFile):
             if self.settings.arch == "armv7a":
                 cmakeConfigurationVariables["PNG_ARM_NEON"] = "check"
 
-        cmake = CMake(self)
-        cmake.configure(
-            build_script_folder="src",
-            variables=cmakeConfigurationVariables
-        )
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        cmake.install()
-
-    def package_info(self):
-        self.cpp_info.set_property("cmake_find_mode", "none")
-        self.cpp_info.builddirs.append("share")
+        return cmakeConfigurationVariables
@@ -0,0 +1,276 @@
+// training workload for profile-guided optimization: encodes and decodes
+// sample images of different color types and bit depths with several
+// compression levels, so the profile covers the filtering and row
+// processing paths; the throughput it prints is only indicative,
+// as the library is instrumented when it runs for collecting the profile
+
+#include <setjmp.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include <png/png.h>
+
+#define IMAGE_WIDTH 512
+#define IMAGE_HEIGHT 512
+
+typedef struct
+{
+    png_bytep data;
+    size_t size;
+    size_t capacity;
+    size_t offset;
+} Buffer;
+
+static unsigned int seed = 12345;
+
+static unsigned int nextRandom(void)
+{
+    seed = seed * 1103515245u + 12345u;
+    return seed >> 8;
+}
+
+static void writeToBuffer(png_structp png, png_bytep data, size_t length)
+{
+    Buffer* buffer = (Buffer*)png_get_io_ptr(png);
+    if (buffer->size + length > buffer->capacity)
+    {
+        size_t capacity = (buffer->size + length) * 2;
+        png_bytep grown = realloc(buffer->data, capacity);
+        if (grown == NULL)
+        {
+            png_error(png, "Could not grow the buffer");
+        }
+        buffer->data = grown;
+        buffer->capacity = capacity;
+    }
+    memcpy(buffer->data + buffer->size, data, length);
+    buffer->size += length;
+}
+
+static void readFromBuffer(png_structp png, png_bytep data, size_t length)
+{
+    Buffer* buffer = (Buffer*)png_get_io_ptr(png);
+    if (buffer->offset + length > buffer->size)
+    {
+        png_error(png, "Read past the end of the buffer");
+    }
+    memcpy(data, buffer->data + buffer->offset, length);
+    buffer->offset += length;
+}
+
+static void flushBuffer(png_structp png)
+{
+    (void)png;
+}
+
+static double getSeconds(clock_t start)
+{
+    double seconds = (double)(clock() - start) / CLOCKS_PER_SEC;
+    return seconds > 0 ? seconds : 1e-6;
+}
+
+// smooth gradients with noisy and flat areas, something between
+// a photo and a screenshot, so different filters win on different rows
+static void generateImage(png_bytep pixels, size_t rowBytes, int bytesPerPixel, int colorType)
+{
+    for (size_t y = 0; y < IMAGE_HEIGHT; y++)
+    {
+        png_bytep row = pixels + y * rowBytes;
+        for (size_t i = 0; i < rowBytes; i++)
+        {
+            size_t x = i / bytesPerPixel;
+            // channels differ a bit from each other
+            size_t channel = i % bytesPerPixel;
+            unsigned int value;
+            if (colorType == PNG_COLOR_TYPE_PALETTE)
+            {
+                value = (unsigned int)((x / 32 + y / 32) % 16);
+            }
+            else if (y < IMAGE_HEIGHT / 3)
+            {
+                value = (unsigned int)(x + y + channel * 48);
+            }
+            else if (y < 2 * IMAGE_HEIGHT / 3)
+            {
+                value = (unsigned int)(x * 2 + y + channel * 48) + nextRandom() % 32;
+            }
+            else
+            {
+                value = (x / 64) % 2 ? 255 : 32;
+            }
+            row[i] = (png_byte)value;
+        }
+    }
+}
+
+static int encode(
+    Buffer* encoded,
+    png_bytep pixels,
+    size_t rowBytes,
+    int bitDepth,
+    int colorType,
+    int compressionLevel
+)
+{
+    png_structp png = png_create_write_struct(PNG_LIBPNG_VER_STRING, NULL, NULL, NULL);
+    png_infop info = png_create_info_struct(png);
+    if (png == NULL || info == NULL)
+    {
+        png_destroy_write_struct(&png, &info);
+        return 1;
+    }
+    if (setjmp(png_jmpbuf(png)))
+    {
+        png_destroy_write_struct(&png, &info);
+        return 1;
+    }
+
+    encoded->size = 0;
+    png_set_write_fn(png, encoded, writeToBuffer, flushBuffer);
+    png_set_compression_level(png, compressionLevel);
+    png_set_IHDR(
+        png, info, IMAGE_WIDTH, IMAGE_HEIGHT, bitDepth, colorType,
+        PNG_INTERLACE_NONE, PNG_COMPRESSION_TYPE_DEFAULT, PNG_FILTER_TYPE_DEFAULT
+    );
+    if (colorType == PNG_COLOR_TYPE_PALETTE)
+    {
+        png_color palette[16];
+        for (int i = 0; i < 16; i++)
+        {
+            palette[i].red = (png_byte)(i * 16);
+            palette[i].green = (png_byte)(255 - i * 16);
+            palette[i].blue = (png_byte)(i * 8);
+        }
+        png_set_PLTE(png, info, palette, 16);
+    }
+    png_write_info(png, info);
+    for (size_t y = 0; y < IMAGE_HEIGHT; y++)
+    {
+        png_write_row(png, pixels + y * rowBytes);
+    }
+    png_write_end(png, info);
+    png_destroy_write_struct(&png, &info);
+    return 0;
+}
+
+static int decode(Buffer* encoded, png_bytep pixels, size_t rowBytes)
+{
+    png_structp png = png_create_read_struct(PNG_LIBPNG_VER_STRING, NULL, NULL, NULL);
+    png_infop info = png_create_info_struct(png);
+    if (png == NULL || info == NULL)
+    {
+        png_destroy_read_struct(&png, &info, NULL);
+        return 1;
+    }
+    if (setjmp(png_jmpbuf(png)))
+    {
+        png_destroy_read_struct(&png, &info, NULL);
+        return 1;
+    }
+
+    encoded->offset = 0;
+    png_set_read_fn(png, encoded, readFromBuffer);
+    png_read_info(png, info);
+    if (png_get_rowbytes(png, info) != rowBytes)
+    {
+        png_destroy_read_struct(&png, &info, NULL);
+        return 1;
+    }
+    for (size_t y = 0; y < IMAGE_HEIGHT; y++)
+    {
+        png_read_row(png, pixels + y * rowBytes, NULL);
+    }
+    png_read_end(png, NULL);
+    png_destroy_read_struct(&png, &info, NULL);
+    return 0;
+}
+
+int main(void)
+{
+    const struct
+    {
+        const char* name;
+        int colorType;
+        int bitDepth;
+        int channels;
+    } formats[] = {
+        { "gray", PNG_COLOR_TYPE_GRAY, 8, 1 },
+        { "palette", PNG_COLOR_TYPE_PALETTE, 8, 1 },
+        { "rgb", PNG_COLOR_TYPE_RGB, 8, 3 },
+        { "rgba", PNG_COLOR_TYPE_RGB_ALPHA, 8, 4 },
+        { "rgb16", PNG_COLOR_TYPE_RGB, 16, 3 }
+    };
+    const int levels[] = { 1, 6, 9 };
+    // to get more stable numbers
+    const int repeats = 3;
+
+    size_t maxRowBytes = (size_t)IMAGE_WIDTH * 4 * 2;
+    png_bytep pixels = malloc(maxRowBytes * IMAGE_HEIGHT);
+    png_bytep decoded = malloc(maxRowBytes * IMAGE_HEIGHT);
+    Buffer encoded = { NULL, 0, 0, 0 };
+    if (pixels == NULL || decoded == NULL)
+    {
+        fprintf(stderr, "Could not allocate the buffers\n");
+        return 1;
+    }
+
+    int failed = 0;
+    for (size_t f = 0; f < sizeof(formats) / sizeof(formats[0]); f++)
+    {
+        int bytesPerPixel = formats[f].channels * formats[f].bitDepth / 8;
+        size_t rowBytes = (size_t)IMAGE_WIDTH * bytesPerPixel;
+        size_t imageSize = rowBytes * IMAGE_HEIGHT;
+        generateImage(pixels, rowBytes, bytesPerPixel, formats[f].colorType);
+
+        for (size_t l = 0; l < sizeof(levels) / sizeof(levels[0]); l++)
+        {
+            clock_t start = clock();
+            for (int r = 0; r < repeats; r++)
+            {
+                if (encode(&encoded, pixels, rowBytes, formats[f].bitDepth, formats[f].colorType, levels[l]) != 0)
+                {
+                    fprintf(stderr, "%s: could not encode the image\n", formats[f].name);
+                    failed = 1;
+                    break;
+                }
+            }
+            double encodeSeconds = getSeconds(start);
+
+            start = clock();
+            for (int r = 0; r < repeats; r++)
+            {
+                if (decode(&encoded, decoded, rowBytes) != 0)
+                {
+                    fprintf(stderr, "%s: could not decode the image\n", formats[f].name);
+                    failed = 1;
+                    break;
+                }
+            }
+            double decodeSeconds = getSeconds(start);
+
+            if (memcmp(pixels, decoded, imageSize) != 0)
+            {
+                fprintf(stderr, "%s: decoded image does not match the original\n", formats[f].name);
+                failed = 1;
+                continue;
+            }
+
+            double megabytes = (double)imageSize * repeats / (1024 * 1024);
+            printf(
+                "%-8s level %d: ratio %5.2f, encode %7.1f MB/s, decode %7.1f MB/s\n",
+                formats[f].name,
+                levels[l],
+                (double)imageSize / encoded.size,
+                megabytes / encodeSeconds,
+                megabytes / decodeSeconds
+            );
+        }
+    }
+
+    free(pixels);
+    free(decoded);
+    free(encoded.data);
+    return failed;
+}
@@ -0,0 +1,1109 @@
+import pathlib
+import os
+import re
+import contextlib
+import json
+import hashlib
+import inspect
+import tarfile
+import shutil
+import tempfile
+import io
+
+from conan import ConanFile
+from conan.errors import (
+    ConanException,
+    ConanInvalidConfiguration
+)
+from conan.tools.build import cross_building
+from conan.tools.files import save
+from conan.tools.scm import (
+    Git,
+    Version
+)
+from conan.tools.cmake import (
+    CMake,
+    cmake_layout,
+    CMakeToolchain
+)
+from conan.tools.env import Environment
+
+import typing
+
+# there is no `fcntl` on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# functions shared by recipes in this registry, which get them
+# via `python_requires`, for example:
+#
+#     python_requires = "recipe-helpers/2026.10.17@decovar/public"
+#
+#     def source(self):
+#         self.python_requires["recipe-helpers"].module.fetchSources(
+#             self,
+#             url="git@github.com:madler/zlib.git",
+#             commit="51b7f2abdade71cd9bb0e7a373ef2610ec6f9daf",
+#             prepare=self.prepareSources
+#         )
+#
+#     def prepareSources(self):
+#         apply_conandata_patches(self)
+
+# a folder with bare mirrors of the upstream repositories, shared by all
+# the builds on this machine, can be set either in `global.conf`/profile:
+#
+#     [conf]
+#     user.recipe-helpers:git_mirror=/path/to/git-mirror
+#     # only use what is already in the mirror, do not go to the network
+#     user.recipe-helpers:git_offline=True
+#
+# or via environment variables
+gitMirrorConf: str = "user.recipe-helpers:git_mirror"
+gitMirrorEnvVar: str = "RECIPE_HELPERS_GIT_MIRROR"
+gitOfflineConf: str = "user.recipe-helpers:git_offline"
+gitOfflineEnvVar: str = "RECIPE_HELPERS_GIT_OFFLINE"
+
+# a folder with already fetched and patched sources, also shared by all the builds,
+# which is limited in size (in megabytes), and the least recently used
+# sources are deleted from it when it gets bigger than that
+sourcesCacheConf: str = "user.recipe-helpers:sources_cache"
+sourcesCacheEnvVar: str = "RECIPE_HELPERS_SOURCES_CACHE"
+sourcesCacheMaxSizeConf: str = "user.recipe-helpers:sources_cache_max_size"
+sourcesCacheMaxSizeEnvVar: str = "RECIPE_HELPERS_SOURCES_CACHE_MAX_SIZE"
+sourcesCacheDefaultMaxSize: int = 1024
+# bump it whenever the cache key or the archives structure changes
+sourcesCacheFormat: int = 1
+
+# a compiler cache to use for building the recipes that extend `CMakeRecipe`,
+# either `ccache` or `sccache` (or a path to one of those), and optionally
+# a folder for its cache, instead of its default one
+compilerLauncherConf: str = "user.recipe-helpers:compiler_launcher"
+compilerLauncherEnvVar: str = "RECIPE_HELPERS_COMPILER_LAUNCHER"
+compilerCacheDirConf: str = "user.recipe-helpers:compiler_cache_dir"
+compilerCacheDirEnvVar: str = "RECIPE_HELPERS_COMPILER_CACHE_DIR"
+
+# how many compile and link jobs Ninja may run at once within one build
+# of the recipes that extend `CMakeRecipe` (on top of `tools.build:jobs`,
+# which limits all the jobs together); linking usually takes much more
+# memory than compiling, so it is the link pool that prevents running out
+# of it, especially when several packages are built at the same time
+compileJobsConf: str = "user.recipe-helpers:compile_jobs"
+compileJobsEnvVar: str = "RECIPE_HELPERS_COMPILE_JOBS"
+linkJobsConf: str = "user.recipe-helpers:link_jobs"
+linkJobsEnvVar: str = "RECIPE_HELPERS_LINK_JOBS"
+
+# compilers that CMake can do interprocedural (link-time) optimization with
+ltoCompilers: typing.Tuple[str, ...] = ("gcc", "clang", "apple-clang", "msvc")
+
+# by default CMake makes "slim" LTO objects, which contain only the compiler's
+# intermediate representation, and so static libraries made of them can
+# only be linked with LTO, while consumers might not do that; "fat" objects
+# contain the machine code as well, so they can be linked either way
+fatLTOObjectsCMake: str = """foreach(lang C CXX)
+    if(CMAKE_${lang}_COMPILE_OPTIONS_IPO)
+        list(REMOVE_ITEM CMAKE_${lang}_COMPILE_OPTIONS_IPO "-fno-fat-lto-objects")
+        list(APPEND CMAKE_${lang}_COMPILE_OPTIONS_IPO "-ffat-lto-objects")
+    endif()
+endforeach()
+"""
+
+# profile-guided optimization is supported for the recipes that have the `pgo`
+# option and a training program in the `pgo` folder of their sources: first
+# the library is built with instrumentation, then the training program is run
+# with it, and then the library is rebuilt using the collected profile; the
+# profiles can be stored in a folder, so the training is done only once
+# for every version of the sources and configuration:
+#
+#     [conf]
+#     user.recipe-helpers:pgo_profiles=/path/to/pgo-profiles
+pgoCompilers: typing.Tuple[str, ...] = ("gcc", "clang")
+pgoProfilesConf: str = "user.recipe-helpers:pgo_profiles"
+pgoProfilesEnvVar: str = "RECIPE_HELPERS_PGO_PROFILES"
+# bump it whenever the profile key or the stored profiles structure changes
+pgoProfilesFormat: int = 1
+# the same build folder is configured twice (to collect the profile
+# and then to use it), so the flags are given as variables when configuring
+pgoFlagsCMake: str = """if(RECIPE_HELPERS_PGO_COMPILE_FLAGS)
+    add_compile_options(${RECIPE_HELPERS_PGO_COMPILE_FLAGS})
+endif()
+if(RECIPE_HELPERS_PGO_LINK_FLAGS)
+    add_link_options(${RECIPE_HELPERS_PGO_LINK_FLAGS})
+endif()
+"""
+
+
+# the conf has priority over the environment variable
+def getConfValue(
+    conanfile: ConanFile,
+    confName: str,
+    envVarName: str,
+    checkType: type
+) -> typing.Any:
+    value = conanfile.conf.get(confName, check_type=checkType)
+    if value is not None:
+        return value
+    value = os.environ.get(envVarName)
+    if not value:
+        return None
+    if checkType is bool:
+        return value.lower() in ("1", "true", "yes")
+    try:
+        return checkType(value)
+    except ValueError:
+        raise ConanException(
+            f"The value of {envVarName} environment variable is not {checkType.__name__}"
+        )
+
+
+def getFolderConfValue(
+    conanfile: ConanFile,
+    confName: str,
+    envVarName: str
+) -> typing.Optional[pathlib.Path]:
+    folder = getConfValue(conanfile, confName, envVarName, str)
+    return pathlib.Path(folder).expanduser().resolve() if folder else None
+
+
+def getGitMirrorFolder(conanfile: ConanFile) -> typing.Optional[pathlib.Path]:
+    return getFolderConfValue(conanfile, gitMirrorConf, gitMirrorEnvVar)
+
+
+def isGitOffline(conanfile: ConanFile) -> bool:
+    return bool(getConfValue(conanfile, gitOfflineConf, gitOfflineEnvVar, bool))
+
+
+# git@github.com:madler/zlib.git -> github.com_madler_zlib.git
+def getGitMirrorName(url: str) -> str:
+    name = re.sub(r"^[a-z+]+://", "", url.rstrip("/"))
+    name = re.sub(r"^[^@/]+@", "", name)
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_.")
+    return name if name.endswith(".git") else f"{name}.git"
+
+
+# the lock is held until the file is closed, and the OS releases it
+# even if the process gets killed, so there are no stale locks
+@contextlib.contextmanager
+def lockFile(lockPath: pathlib.Path, exclusive: bool) -> typing.Iterator[None]:
+    with open(lockPath, "a+") as f:
+        # `msvcrt.locking()` locks starting from the current position
+        f.seek(0)
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            # no shared locks here, and `LK_LOCK` only retries for 10 seconds
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def gitMirrorHasCommit(mirror: Git, commit: str) -> bool:
+    try:
+        mirror.run(f"cat-file -e {commit}^{{commit}}")
+        return True
+    except ConanException:
+        return False
+
+
+# makes sure that the mirror of the repository exists and has the commit,
+# fetching only what is missing, and returns the path to the mirror
+def updateGitMirror(
+    conanfile: ConanFile,
+    gitMirrorFolder: pathlib.Path,
+    url: str,
+    commit: str,
+    hideURL: bool,
+    offline: bool
+) -> pathlib.Path:
+    mirrorPath = gitMirrorFolder / getGitMirrorName(url)
+    mirror = Git(conanfile, folder=str(mirrorPath))
+
+    gitMirrorFolder.mkdir(parents=True, exist_ok=True)
+    with lockFile(mirrorPath.with_name(f"{mirrorPath.name}.lock"), exclusive=True):
+        # a fetch of an already existing mirror might have been interrupted,
+        # but that is fine, as next fetch will just continue from there
+        if not (mirrorPath / "HEAD").is_file():
+            if offline:
+                raise ConanException(
+                    " ".join((
+                        f"There is no mirror of {'the repository' if hideURL else url}",
+                        f"in {gitMirrorFolder}, and network access is disabled"
+                    ))
+                )
+            mirrorPath.mkdir(parents=True, exist_ok=True)
+            mirror.run("init --bare")
+            mirror.run(
+                f'remote add --mirror=fetch origin "{url}"',
+                hidden_output=url if hideURL else None
+            )
+        # pinned commits never change, so if it is already there,
+        # then there is no need to go to the network at all
+        if gitMirrorHasCommit(mirror, commit):
+            return mirrorPath
+        if offline:
+            raise ConanException(
+                " ".join((
+                    f"The mirror {mirrorPath} does not have the commit {commit},",
+                    "and network access is disabled"
+                ))
+            )
+        conanfile.output.info(f"Updating git mirror {mirrorPath}")
+        # without `--prune`, so commits from deleted branches are kept
+        mirror.run("fetch origin")
+        # the commit might not be reachable from any branch or tag
+        if not gitMirrorHasCommit(mirror, commit):
+            mirror.run(f"fetch origin {commit}")
+    return mirrorPath
+
+
+# clones the repository using the local mirror, so only the objects
+# that are missing there are transferred over the network; the clone
+# is "dissociated", so it does not depend on the mirror afterwards
+def fetchGitCommitFromMirror(
+    conanfile: ConanFile,
+    gitMirrorFolder: pathlib.Path,
+    url: str,
+    commit: str,
+    target: str,
+    hideURL: bool
+) -> Git:
+    offline = isGitOffline(conanfile)
+    mirrorPath = updateGitMirror(conanfile, gitMirrorFolder, url, commit, hideURL, offline)
+
+    git = Git(conanfile)
+    # the mirror must not be updated while it is being cloned from
+    with lockFile(mirrorPath.with_name(f"{mirrorPath.name}.lock"), exclusive=False):
+        if not offline:
+            try:
+                git.clone(
+                    url=url,
+                    target=target,
+                    args=["--no-checkout", "--reference", f'"{mirrorPath}"', "--dissociate"],
+                    hide_url=hideURL
+                )
+            except ConanException as ex:
+                conanfile.output.warning(
+                    " ".join((
+                        f"Could not clone the repository ({ex}),",
+                        f"will clone it from the mirror {mirrorPath} instead"
+                    ))
+                )
+                offline = True
+        if offline:
+            git.clone(
+                url=str(mirrorPath),
+                target=target,
+                args=["--no-checkout"],
+                hide_url=False
+            )
+            git.folder = target
+            git.run(
+                f'remote set-url origin "{url}"',
+                hidden_output=url if hideURL else None
+            )
+    git.folder = target
+    git.checkout(commit)
+    return git
+
+
+# fetches only the given commit (without any history) into the `target` folder,
+# which is a lot faster than cloning the entire repository and then checking out
+# that commit; however, not every server allows fetching commits by their hashes
+# (GitHub does, but a self-hosted one might have `uploadpack.allowReachableSHA1InWant`
+# disabled), so then it falls back to fetching everything, as `git clone` would;
+# if the git mirror folder is configured, then the mirror is used instead
+def fetchGitCommit(
+    conanfile: ConanFile,
+    url: str,
+    commit: str,
+    target: str = "src",
+    hideURL: bool = False
+) -> Git:
+    gitMirrorFolder = getGitMirrorFolder(conanfile)
+    if gitMirrorFolder is not None:
+        return fetchGitCommitFromMirror(
+            conanfile,
+            gitMirrorFolder,
+            url,
+            commit,
+            target,
+            hideURL
+        )
+
+    git = Git(conanfile, folder=target)
+    try:
+        git.fetch_commit(url=url, commit=commit, hide_url=hideURL)
+    except ConanException as ex:
+        conanfile.output.warning(
+            " ".join((
+                f"Could not fetch just the commit {commit} ({ex}),",
+                "will fetch the entire repository instead"
+            ))
+        )
+        # the repository is already initialized and has the remote
+        git.run("fetch --tags origin")
+        git.checkout(commit)
+    return git
+
+
+def hashFile(filePath: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(filePath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# everything that affects the prepared sources: the commit, the patches
+# from `conandata.yml` and their contents, the files that are copied
+# into the sources (`_additional-files`) and the preparation code itself,
+# but not the profile or configuration, so all of them share the sources
+def getSourcesCacheKey(
+    conanfile: ConanFile,
+    commit: str,
+    prepare: typing.Optional[typing.Callable[[], None]]
+) -> str:
+    exportSourcesFolder = pathlib.Path(conanfile.export_sources_folder)
+
+    # the same layouts as `apply_conandata_patches()` accepts: either a list
+    # of patches for any version, or lists of patches for every version
+    patches = (conanfile.conan_data or {}).get("patches") or []
+    if isinstance(patches, dict):
+        patches = patches.get(str(conanfile.version)) or []
+    patchesHashes = {}
+    for p in patches:
+        patchFile = p.get("patch_file")
+        if patchFile is not None:
+            patchesHashes[patchFile] = hashFile(exportSourcesFolder / patchFile)
+
+    additionalFilesHashes = {}
+    additionalFilesFolder = exportSourcesFolder / "_additional-files"
+    if additionalFilesFolder.is_dir():
+        for f in sorted(additionalFilesFolder.rglob("*")):
+            if f.is_file():
+                additionalFilesHashes[
+                    f.relative_to(additionalFilesFolder).as_posix()
+                ] = hashFile(f)
+
+    prepareCode = ""
+    if prepare is not None:
+        try:
+            prepareCode = inspect.getsource(prepare)
+        except (OSError, TypeError):
+            # without the code there is no telling if it has changed
+            prepareCode = repr(prepare)
+
+    keySource = json.dumps(
+        {
+            "format": sourcesCacheFormat,
+            "name": conanfile.name,
+            "commit": commit,
+            "patches": patches,
+            "patchesHashes": patchesHashes,
+            "additionalFilesHashes": additionalFilesHashes,
+            "prepare": prepareCode
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(keySource.encode("utf-8")).hexdigest()
+
+
+# returns the counters after updating them
+def updateSourcesCacheStats(
+    sourcesCacheFolder: pathlib.Path,
+    **increments: int
+) -> typing.Dict[str, int]:
+    statsFile = sourcesCacheFolder / "stats.json"
+    stats = {"hits": 0, "misses": 0, "evictions": 0}
+    try:
+        with open(statsFile, "r") as f:
+            stats.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    for k, v in increments.items():
+        stats[k] = stats.get(k, 0) + v
+    statsFileTmp = statsFile.with_suffix(".tmp")
+    with open(statsFileTmp, "w") as f:
+        json.dump(stats, f, indent=4)
+    os.replace(statsFileTmp, statsFile)
+    return stats
+
+
+def getSourcesCacheStatsLine(stats: typing.Dict[str, int]) -> str:
+    accesses = stats["hits"] + stats["misses"]
+    hitRate = 100 * stats["hits"] / accesses if accesses else 0
+    return " ".join((
+        f"hits: {stats['hits']}, misses: {stats['misses']},",
+        f"evictions: {stats['evictions']}, hit rate: {hitRate:.0f}%"
+    ))
+
+
+# deletes the least recently used archives until the cache fits the size
+def evictCachedSources(
+    sourcesCacheFolder: pathlib.Path,
+    maxSize: int,
+    keep: pathlib.Path
+) -> int:
+    archives = []
+    for a in sourcesCacheFolder.glob("*.tar"):
+        try:
+            st = a.stat()
+        except OSError:
+            continue
+        archives.append((st.st_mtime, st.st_size, a))
+    totalSize = sum(a[1] for a in archives)
+    evictedCnt = 0
+    for _, size, a in sorted(archives, key=lambda a: a[0]):
+        if totalSize <= maxSize:
+            break
+        if a == keep:
+            continue
+        try:
+            a.unlink()
+        except OSError:
+            continue
+        totalSize -= size
+        evictedCnt += 1
+    return evictedCnt
+
+
+# returns `False` if there are no such sources in the cache
+def extractCachedSources(
+    conanfile: ConanFile,
+    sourcesCacheFolder: pathlib.Path,
+    key: str,
+    target: str
+) -> bool:
+    archive = sourcesCacheFolder / f"{key}.tar"
+    targetPath = pathlib.Path(target)
+    # so the archive does not get evicted while it is being extracted
+    with lockFile(sourcesCacheFolder / ".lock", exclusive=False):
+        if not archive.is_file():
+            return False
+        try:
+            with tarfile.open(archive, "r") as tar:
+                # not available in older Python versions
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(targetPath, filter="data")
+                else:
+                    tar.extractall(targetPath)
+        except (OSError, tarfile.TarError) as ex:
+            conanfile.output.warning(f"Could not extract cached sources {archive}: {ex}")
+            shutil.rmtree(targetPath, ignore_errors=True)
+            return False
+        # that is what makes it "least recently used"
+        try:
+            os.utime(archive)
+        except OSError:
+            pass
+    return True
+
+
+def storeCachedSources(
+    sourcesCacheFolder: pathlib.Path,
+    key: str,
+    target: str,
+    maxSize: int
+) -> int:
+    archive = sourcesCacheFolder / f"{key}.tar"
+    # not compressed, as extracting speed matters more here
+    fd, archiveTmp = tempfile.mkstemp(dir=sourcesCacheFolder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with tarfile.open(fileobj=f, mode="w") as tar:
+                tar.add(
+                    target,
+                    arcname=".",
+                    # the history is of no use for building
+                    filter=lambda ti: None if ti.name == "./.git" else ti
+                )
+        with lockFile(sourcesCacheFolder / ".lock", exclusive=True):
+            os.replace(archiveTmp, archive)
+            return evictCachedSources(sourcesCacheFolder, maxSize, archive)
+    finally:
+        if os.path.exists(archiveTmp):
+            os.remove(archiveTmp)
+
+
+# fetches the sources of the given commit (see `fetchGitCommit()`) and then
+# prepares them with the `prepare` function: applies patches, copies additional
+# files, etc; if the sources cache folder is configured, then all that is done
+# only once, and other builds just extract already prepared sources from there
+def fetchSources(
+    conanfile: ConanFile,
+    url: str,
+    commit: str,
+    target: str = "src",
+    prepare: typing.Optional[typing.Callable[[], None]] = None,
+    hideURL: bool = False
+) -> None:
+    sourcesCacheFolder = getFolderConfValue(conanfile, sourcesCacheConf, sourcesCacheEnvVar)
+    if sourcesCacheFolder is None:
+        fetchGitCommit(conanfile, url, commit, target, hideURL)
+        if prepare is not None:
+            prepare()
+        return
+
+    maxSize = getConfValue(
+        conanfile,
+        sourcesCacheMaxSizeConf,
+        sourcesCacheMaxSizeEnvVar,
+        int
+    )
+    if maxSize is None:
+        maxSize = sourcesCacheDefaultMaxSize
+    maxSize *= 1024 * 1024
+
+    sourcesCacheFolder.mkdir(parents=True, exist_ok=True)
+    key = getSourcesCacheKey(conanfile, commit, prepare)
+
+    if extractCachedSources(conanfile, sourcesCacheFolder, key, target):
+        with lockFile(sourcesCacheFolder / ".lock", exclusive=True):
+            stats = updateSourcesCacheStats(sourcesCacheFolder, hits=1)
+        conanfile.output.info(
+            f"Sources cache hit {key[:12]} ({getSourcesCacheStatsLine(stats)})"
+        )
+        return
+
+    fetchGitCommit(conanfile, url, commit, target, hideURL)
+    if prepare is not None:
+        prepare()
+
+    evictedCnt = 0
+    try:
+        evictedCnt = storeCachedSources(sourcesCacheFolder, key, target, maxSize)
+    except (OSError, tarfile.TarError) as ex:
+        # the sources are fine, they just will not be cached
+        conanfile.output.warning(f"Could not store the sources in the cache: {ex}")
+    with lockFile(sourcesCacheFolder / ".lock", exclusive=True):
+        stats = updateSourcesCacheStats(sourcesCacheFolder, misses=1, evictions=evictedCnt)
+    conanfile.output.info(
+        f"Sources cache miss {key[:12]} ({getSourcesCacheStatsLine(stats)})"
+    )
+
+
+# returns the full path to the compiler cache executable, if it is configured
+def getCompilerLauncher(
+    conanfile: ConanFile,
+    warnIfMissing: bool = True
+) -> typing.Optional[str]:
+    launcher = getConfValue(conanfile, compilerLauncherConf, compilerLauncherEnvVar, str)
+    if not launcher:
+        return None
+    if pathlib.Path(launcher).stem not in ("ccache", "sccache"):
+        raise ConanException(
+            f"Unsupported compiler launcher {launcher}, only ccache and sccache are supported"
+        )
+    launcherPath = shutil.which(launcher)
+    if launcherPath is None and warnIfMissing:
+        # not a reason to fail the build, it will just take longer
+        conanfile.output.warning(f"Compiler launcher {launcher} is not found, building without it")
+    return launcherPath
+
+
+# returns the counters of cache hits and misses, or `None` if they could not be
+# gotten; those are global for the cache, so builds running at the same time
+# will affect each other numbers
+def getCompilerCacheStats(
+    conanfile: ConanFile,
+    launcher: str
+) -> typing.Optional[typing.Dict[str, int]]:
+    output = io.StringIO()
+    try:
+        if pathlib.Path(launcher).stem == "sccache":
+            conanfile.run(
+                f'"{launcher}" --show-stats --stats-format=json',
+                stdout=output,
+                quiet=True
+            )
+            stats = json.loads(output.getvalue()).get("stats", {})
+            return {
+                "hits": sum(stats.get("cache_hits", {}).get("counts", {}).values()),
+                "misses": sum(stats.get("cache_misses", {}).get("counts", {}).values())
+            }
+        else:
+            # the machine-readable format is available since ccache 4.0
+            conanfile.run(f'"{launcher}" --print-stats', stdout=output, quiet=True)
+            stats = {}
+            for line in output.getvalue().splitlines():
+                key, _, value = line.partition("\t")
+                if value.strip().isdigit():
+                    stats[key.strip()] = int(value)
+            return {
+                "hits": stats.get("direct_cache_hit", 0) + stats.get("preprocessed_cache_hit", 0),
+                "misses": stats.get("cache_miss", 0)
+            }
+    except (ConanException, ValueError, AttributeError) as ex:
+        conanfile.output.warning(f"Could not get compiler cache statistics: {ex}")
+        return None
+
+
+# Ninja job pools with the sizes from the conf, as the `JOB_POOLS` value
+# and the pools to use for compiling and linking
+def getJobPools(conanfile: ConanFile) -> typing.Dict[str, str]:
+    jobPools: typing.Dict[str, int] = {}
+    for pool, confName, envVarName in (
+        ("compile", compileJobsConf, compileJobsEnvVar),
+        ("link", linkJobsConf, linkJobsEnvVar)
+    ):
+        size = getConfValue(conanfile, confName, envVarName, int)
+        if size is None:
+            continue
+        if size < 1:
+            raise ConanException(f"The size of the {pool} job pool must be at least 1")
+        jobPools[pool] = size
+    if not jobPools:
+        return {}
+    cacheVariables: typing.Dict[str, str] = {
+        "CMAKE_JOB_POOLS": ";".join(f"{p}={s}" for p, s in jobPools.items())
+    }
+    for pool in jobPools:
+        cacheVariables[f"CMAKE_JOB_POOL_{pool.upper()}"] = pool
+    return cacheVariables
+
+
+# the profile is only valid for the very same sources and configuration,
+# so everything that affects the compiled code is in the key, except for
+# the folders paths, which are taken out of the profile by the flags
+def getPGOProfileKey(conanfile: ConanFile, trainingFolder: pathlib.Path) -> str:
+    sourcesHashes = {}
+    for folder in (pathlib.Path(conanfile.source_folder) / "src", trainingFolder):
+        for f in sorted(folder.rglob("*")):
+            if f.is_file() and ".git" not in f.relative_to(folder).parts:
+                sourcesHashes[
+                    f.relative_to(conanfile.source_folder).as_posix()
+                ] = hashFile(f)
+
+    keySource = json.dumps(
+        {
+            "format": pgoProfilesFormat,
+            "name": conanfile.name,
+            "version": conanfile.version,
+            "settings": dict(conanfile.settings.items()),
+            # a unity build produces the same code
+            "options": {
+                k: v for k, v in conanfile.options.items()
+                if k != "unity_build"
+            },
+            "sourcesHashes": sourcesHashes
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(keySource.encode("utf-8")).hexdigest()
+
+
+# compiler and linker flags for building with instrumentation,
+# which writes the profile to the given folder, or for using that profile
+def getPGOFlags(
+    conanfile: ConanFile,
+    profileFolder: pathlib.Path,
+    useProfile: bool
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    if conanfile.settings.get_safe("compiler") == "gcc":
+        # otherwise the profile files are named after the full paths
+        # of the object files, and another build folder would not find them
+        pathFlags = [
+            f"-fprofile-prefix-path={pathlib.Path(conanfile.build_folder).as_posix()}"
+        ]
+    else:
+        # otherwise the names of static functions in the profile include
+        # the full paths of the sources, and they would not match in another folder
+        pathFlags = ["SHELL:-mllvm -static-func-full-module-prefix=false"]
+
+    if not useProfile:
+        return (
+            [f"-fprofile-generate={profileFolder.as_posix()}"] + pathFlags,
+            ["-fprofile-generate"]
+        )
+
+    if conanfile.settings.get_safe("compiler") == "gcc":
+        return (
+            [
+                f"-fprofile-use={profileFolder.as_posix()}",
+                # the code that the training has not reached is still optimized
+                # for speed, and not for size as if it was never executed
+                "-fprofile-partial-training",
+                # not every source file is reached by the training
+                "-Wno-missing-profile",
+                # the source paths are a part of the functions checksums, so
+                # the profile from another build folder fails the build, although
+                # it is still usable, as it is only ever used with the same sources
+                "-Wno-coverage-mismatch"
+            ] + pathFlags,
+            []
+        )
+    return (
+        [
+            f"-fprofile-use={(profileFolder / 'default.profdata').as_posix()}",
+            "-Wno-profile-instr-unprofiled",
+            "-Wno-profile-instr-out-of-date"
+        ] + pathFlags,
+        []
+    )
+
+
+# Clang writes raw profiles, which need to be merged by `llvm-profdata`
+# of the same version, preferably the one next to the compiler
+def getLLVMProfdata(conanfile: ConanFile) -> str:
+    names = [
+        f"llvm-profdata-{Version(conanfile.settings.get_safe('compiler.version')).major}",
+        "llvm-profdata"
+    ]
+    compilers = conanfile.conf.get(
+        "tools.build:compiler_executables",
+        default={},
+        check_type=dict
+    )
+    compilerFolder = (
+        pathlib.Path(compilers["c"]).parent
+        if compilers.get("c") and pathlib.Path(compilers["c"]).is_absolute()
+        else None
+    )
+    for name in names:
+        profdata = shutil.which(
+            name,
+            path=str(compilerFolder) if compilerFolder is not None else None
+        ) or shutil.which(name)
+        if profdata is not None:
+            return profdata
+    raise ConanException(
+        "There is no llvm-profdata, which is required for PGO with Clang"
+    )
+
+
+# common parts of the recipes that are built with CMake, which extend it
+# instead of repeating the same `layout()`, `generate()`, `build()`, etc:
+#
+#     python_requires = "recipe-helpers/2026.10.17@decovar/public"
+#     python_requires_extend = "recipe-helpers.CMakeRecipe"
+#
+#     # if the project needs some configuration variables
+#     def getCMakeVariables(self):
+#         return {"ZLIB_BUILD_EXAMPLES": "NO"}
+#
+# it also handles `lto`, `unity_build` and `pgo` options, if the recipe has them:
+#
+#     options = {
+#         "shared": [True, False],
+#         "lto": [True, False],
+#         "unity_build": [True, False],
+#         # requires a training program in `pgo` folder of the exported sources,
+#         # a CMake project that finds the library with `find_package()`
+#         "pgo": [True, False]
+#     }
+class CMakeRecipe:
+    def getCMakeVariables(self) -> typing.Dict[str, typing.Any]:
+        return {}
+
+    def layout(self):
+        cmake_layout(self)
+
+    def validate(self):
+        if self.options.get_safe("lto"):
+            compiler = str(self.settings.get_safe("compiler"))
+            if compiler not in ltoCompilers:
+                raise ConanInvalidConfiguration(
+                    f"{self.ref} cannot be built with LTO by {compiler}"
+                )
+            # fat LTO objects are supported only since Clang 18
+            if (
+                compiler == "clang"
+                and not self.options.get_safe("shared")
+                and Version(self.settings.get_safe("compiler.version")) < "18"
+            ):
+                raise ConanInvalidConfiguration(
+                    " ".join((
+                        f"{self.ref} static library can be built with LTO",
+                        "only by Clang 18 or newer, otherwise consumers",
+                        "would have to link it with LTO too"
+                    ))
+                )
+        if self.options.get_safe("pgo"):
+            compiler = str(self.settings.get_safe("compiler"))
+            if compiler not in pgoCompilers:
+                raise ConanInvalidConfiguration(
+                    f"{self.ref} cannot be built with PGO by {compiler}"
+                )
+            # `-fprofile-prefix-path` is available only since GCC 11
+            if compiler == "gcc" and Version(self.settings.get_safe("compiler.version")) < "11":
+                raise ConanInvalidConfiguration(
+                    f"{self.ref} can be built with PGO only by GCC 11 or newer"
+                )
+            if cross_building(self):
+                raise ConanInvalidConfiguration(
+                    " ".join((
+                        f"{self.ref} cannot be built with PGO when cross-building,",
+                        "as the training program needs to run on the build machine"
+                    ))
+                )
+
+    def package_id(self):
+        # a unity build produces the same library, just faster
+        self.info.options.rm_safe("unity_build")
+
+    def generate(self):
+        tc = CMakeToolchain(self, generator="Ninja")
+
+        # CMake code to include after `project()`
+        projectInclude: typing.List[str] = []
+        if self.options.get_safe("lto"):
+            tc.cache_variables["CMAKE_INTERPROCEDURAL_OPTIMIZATION"] = "ON"
+            # otherwise projects that require CMake older than 3.9
+            # (like zlib does) would only get it with Intel compiler
+            tc.cache_variables["CMAKE_POLICY_DEFAULT_CMP0069"] = "NEW"
+            # Apple and Microsoft linkers handle LTO objects in static libraries
+            # on their own, and older Clang versions are rejected in `validate()`
+            if (
+                not self.options.get_safe("shared")
+                and self.settings.get_safe("compiler") in ("gcc", "clang")
+            ):
+                projectInclude.append(fatLTOObjectsCMake)
+        if self.options.get_safe("unity_build"):
+            tc.cache_variables["CMAKE_UNITY_BUILD"] = "ON"
+        if self.options.get_safe("pgo"):
+            projectInclude.append(pgoFlagsCMake)
+        if projectInclude:
+            save(
+                self,
+                self.getProjectIncludeFile(),
+                "\n".join(["# included after `project()` via CMAKE_PROJECT_INCLUDE"] + projectInclude)
+            )
+            tc.cache_variables["CMAKE_PROJECT_INCLUDE"] = self.getProjectIncludeFile().as_posix()
+
+        jobPools = getJobPools(self)
+        if jobPools:
+            tc.cache_variables.update(jobPools)
+            self.output.info(f"Ninja job pools: {jobPools['CMAKE_JOB_POOLS']}")
+
+        launcher = getCompilerLauncher(self)
+        if launcher is not None:
+            for lang in ("C", "CXX"):
+                tc.cache_variables[f"CMAKE_{lang}_COMPILER_LAUNCHER"] = (
+                    pathlib.Path(launcher).as_posix()
+                )
+
+            env = Environment()
+            isSccache = pathlib.Path(launcher).stem == "sccache"
+            compilerCacheDir = getFolderConfValue(
+                self,
+                compilerCacheDirConf,
+                compilerCacheDirEnvVar
+            )
+            if compilerCacheDir is not None:
+                env.define_path(
+                    "SCCACHE_DIR" if isSccache else "CCACHE_DIR",
+                    str(compilerCacheDir)
+                )
+            # the sources and build folders paths differ between packages,
+            # so they need to be relative to the same base, otherwise
+            # the same sources would never get cache hits in other packages;
+            # sccache always hashes full paths, so there is no base for it
+            if not isSccache:
+                baseDir = os.path.commonpath([self.source_folder, self.build_folder])
+                env.define_path("CCACHE_BASEDIR", baseDir)
+                env.define("CCACHE_NOHASHDIR", "true")
+                # and the debug information should not contain the full paths either
+                if self.settings.get_safe("compiler") in ("gcc", "clang", "apple-clang"):
+                    prefixMap = f"-fdebug-prefix-map={pathlib.Path(baseDir).as_posix()}=."
+                    tc.extra_cflags.append(prefixMap)
+                    tc.extra_cxxflags.append(prefixMap)
+            env.vars(self, scope="build").save_script("conancompilercache")
+
+        tc.generate()
+
+    def getProjectIncludeFile(self) -> pathlib.Path:
+        return pathlib.Path(self.generators_folder) / "conan_project_include.cmake"
+
+    def getPGOVariables(
+        self,
+        profileFolder: pathlib.Path,
+        useProfile: bool
+    ) -> typing.Dict[str, str]:
+        compileFlags, linkFlags = getPGOFlags(self, profileFolder, useProfile)
+        return {
+            "RECIPE_HELPERS_PGO_COMPILE_FLAGS": ";".join(compileFlags),
+            "RECIPE_HELPERS_PGO_LINK_FLAGS": ";".join(linkFlags)
+        }
+
+    # builds the library with instrumentation, runs the training program
+    # with it and saves the collected profile to the given folder
+    def trainPGO(self, profileFolder: pathlib.Path):
+        buildFolder = pathlib.Path(self.build_folder)
+        rawProfileFolder = buildFolder / "pgo-raw-profile"
+        instrumentedFolder = buildFolder / "pgo-instrumented"
+        trainingBuildFolder = buildFolder / "pgo-training"
+        for folder in (rawProfileFolder, instrumentedFolder, trainingBuildFolder):
+            shutil.rmtree(folder, ignore_errors=True)
+
+        cmake = CMake(self)
+        cmake.configure(
+            build_script_folder="src",
+            variables={
+                **self.getCMakeVariables(),
+                **self.getPGOVariables(rawProfileFolder, useProfile=False)
+            }
+        )
+        cmake.build()
+
+        cmakeProgram = self.conf.get("tools.cmake:cmake_program", default="cmake")
+        self.run(
+            f'"{cmakeProgram}" --install "{buildFolder}" --prefix "{instrumentedFolder}"'
+        )
+        # the training program only needs to be linked with the profiling runtime
+        _, linkFlags = getPGOFlags(self, rawProfileFolder, useProfile=False)
+        self.run(
+            " ".join((
+                f'"{cmakeProgram}" -G Ninja',
+                f'-S "{pathlib.Path(self.source_folder) / "pgo"}"',
+                f'-B "{trainingBuildFolder}"',
+                f'-DCMAKE_TOOLCHAIN_FILE="{pathlib.Path(self.generators_folder) / "conan_toolchain.cmake"}"',
+                f'-DCMAKE_BUILD_TYPE={self.settings.build_type}',
+                f'-DCMAKE_PREFIX_PATH="{instrumentedFolder.as_posix()}"',
+                f'-DCMAKE_PROJECT_INCLUDE="{self.getProjectIncludeFile().as_posix()}"',
+                f'-DRECIPE_HELPERS_PGO_LINK_FLAGS="{";".join(linkFlags)}"'
+            ))
+        )
+        self.run(f'"{cmakeProgram}" --build "{trainingBuildFolder}"')
+
+        # the shared library needs to be found when running the training program
+        env = Environment()
+        env.prepend_path("PATH", str(instrumentedFolder / "bin"))
+        env.prepend_path("LD_LIBRARY_PATH", str(instrumentedFolder / "lib"))
+        env.prepend_path("DYLD_LIBRARY_PATH", str(instrumentedFolder / "lib"))
+        trainingProgram = trainingBuildFolder / (
+            "training.exe" if self.settings.get_safe("os") == "Windows" else "training"
+        )
+        with env.vars(self).apply():
+            self.run(f'"{trainingProgram}"', env="conanrun")
+
+        shutil.rmtree(profileFolder, ignore_errors=True)
+        if self.settings.get_safe("compiler") == "gcc":
+            shutil.copytree(rawProfileFolder, profileFolder)
+        else:
+            profileFolder.mkdir(parents=True)
+            rawProfiles = " ".join(
+                f'"{f}"' for f in sorted(rawProfileFolder.glob("*.profraw"))
+            )
+            self.run(
+                " ".join((
+                    f'"{getLLVMProfdata(self)}" merge',
+                    f'-output="{profileFolder / "default.profdata"}"',
+                    rawProfiles
+                ))
+            )
+
+    # returns the folder with the profile for building the library,
+    # which is either taken from the profiles folder or collected by training
+    def getPGOProfile(self) -> pathlib.Path:
+        profileFolder = pathlib.Path(self.build_folder) / "pgo-profile"
+        pgoProfilesFolder = getFolderConfValue(self, pgoProfilesConf, pgoProfilesEnvVar)
+        if pgoProfilesFolder is None:
+            self.trainPGO(profileFolder)
+            return profileFolder
+
+        key = getPGOProfileKey(self, pathlib.Path(self.source_folder) / "pgo")
+        versionFolder = pgoProfilesFolder / self.name / self.version
+        versionFolder.mkdir(parents=True, exist_ok=True)
+        storedProfileFolder = versionFolder / key
+        with lockFile(versionFolder / ".lock", exclusive=False):
+            if storedProfileFolder.is_dir():
+                shutil.rmtree(profileFolder, ignore_errors=True)
+                shutil.copytree(storedProfileFolder, profileFolder)
+                self.output.info(f"PGO profile cache hit {key[:12]}")
+                return profileFolder
+
+        self.trainPGO(profileFolder)
+        try:
+            tmpFolder = tempfile.mkdtemp(dir=versionFolder, suffix=".tmp")
+            try:
+                shutil.copytree(profileFolder, tmpFolder, dirs_exist_ok=True)
+                with lockFile(versionFolder / ".lock", exclusive=True):
+                    # another build might have stored it in the meantime
+                    if not storedProfileFolder.exists():
+                        os.replace(tmpFolder, storedProfileFolder)
+            finally:
+                shutil.rmtree(tmpFolder, ignore_errors=True)
+        except OSError as ex:
+            # the profile is fine, it just will not be stored
+            self.output.warning(f"Could not store the PGO profile: {ex}")
+        self.output.info(f"PGO profile cache miss {key[:12]}")
+        return profileFolder
+
+    def build(self):
+        variables = self.getCMakeVariables()
+        if self.options.get_safe("pgo"):
+            variables = {
+                **variables,
+                **self.getPGOVariables(self.getPGOProfile(), useProfile=True)
+            }
+
+        cmake = CMake(self)
+        cmake.configure(
+            build_script_folder="src",
+            variables=variables
+        )
+
+        # if it is missing, then `generate()` has already warned about that
+        launcher = getCompilerLauncher(self, warnIfMissing=False)
+        statsBefore = (
+            getCompilerCacheStats(self, launcher)
+            if launcher is not None
+            else None
+        )
+        cmake.build()
+        if statsBefore is not None:
+            statsAfter = getCompilerCacheStats(self, launcher)
+            if statsAfter is not None:
+                hits = statsAfter["hits"] - statsBefore["hits"]
+                misses = statsAfter["misses"] - statsBefore["misses"]
+                hitRate = 100 * hits / (hits + misses) if hits + misses else 0
+                self.output.info(
+                    " ".join((
+                        f"Compiler cache ({pathlib.Path(launcher).stem}):",
+                        f"{hits} hits, {misses} misses, hit rate: {hitRate:.0f}%"
+                    ))
+                )
+
+    def package(self):
+        cmake = CMake(self)
+        cmake.install()
+
+    def package_info(self):
+        # do not let Conan try to be smarter than CMake or/and maintainer,
+        # otherwise it will generate some bizarre CMake configs of its own
+        # based on god knows what
+        self.cpp_info.set_property("cmake_find_mode", "none")
+        # this is required too, otherwise consumers won't be able to find CMake configs,
+        # and obviously if you are installing package configs to a different path,
+        # then you will need to replace `share` with whichever you are using
+        self.cpp_info.builddirs.append("share")
+
+
+class pkgConan(ConanFile):
+    name = "recipe-helpers"
+    version = "2026.10.17"
+    recipe_version = 7
+
+    description = "Functions shared by recipes in this registry"
+    license = "GPL-3.0-or-later"
+
+    user = "decovar"
+    channel = "public"
+
+    package_type = "python-require"
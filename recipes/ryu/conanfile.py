@@ -6,16 +6,11 @@ from conan.tools.files import (
     copy,
     export_conandata_patches
 )
-from conan.tools.scm import Git
-from conan.tools.cmake import (
-    CMake,
-    cmake_layout,
-    CMakeToolchain
-)
 
 class pkgConan(ConanFile):
     name = "ryu"
     version = "2024.2.19"
+    recipe_version = 5
 
     url = "https://github.com/ulfjack/ryu"
     description = "Converts floating point numbers to decimal strings"
@@ -24,11 +19,20 @@ class pkgConan(ConanFile):
     user = "decovar"
     channel = "public"
 
+    python_requires = "recipe-helpers/2026.10.17@decovar/public"
+    python_requires_extend = "recipe-helpers.CMakeRecipe"
+
     options = {
-        "shared": [True, False]
+        "shared": [True, False],
+        # interprocedural (link-time) optimization, which lets the compiler
+        # inline functions across source files of the library
+        "lto": [True, False],
+        "unity_build": [True, False]
     }
     default_options = {
-        "shared": False
+        "shared": False,
+        "lto": False,
+        "unity_build": False
     }
 
     settings = "os", "compiler", "build_type", "arch"
@@ -57,19 +61,19 @@ class pkgConan(ConanFile):
             # does not export symbols for making a DLL
             self.options.rm_safe("shared")
 
-    def layout(self):
-        cmake_layout(self)
-
     def source(self):
-        git = Git(self)
-        git.clone(
+        # only the pinned commit is fetched, without the entire history,
+        # and if the sources cache is configured, then they are fetched
+        # and prepared just once for all the profiles/configurations
+        self.python_requires["recipe-helpers"].module.fetchSources(
+            self,
             url="git@github.com:ulfjack/ryu.git",
-            hide_url=False,
-            target="src"
+            commit="1264a946ba66eab320e927bfd2362e0c8580c42f",
+            target="src",
+            prepare=self.prepareSources
         )
-        git.folder = "src"
-        git.checkout("1264a946ba66eab320e927bfd2362e0c8580c42f")
 
+    def prepareSources(self):
         apply_conandata_patches(self)
 
         copy(
@@ -78,22 +82,3 @@ class pkgConan(ConanFile):
             src=pathlib.Path(self.export_sources_folder) / "_additional-files",
             dst=pathlib.Path(self.export_sources_folder) / "src"
         )
-
-    def generate(self):
-        tc = CMakeToolchain(self, generator="Ninja")
-        tc.generate()
-
-    def build(self):
-        cmake = CMake(self)
-        cmake.configure(
-            build_script_folder="src"
-        )
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        cmake.install()
-
-    def package_info(self):
-        self.cpp_info.set_property("cmake_find_mode", "none")
-        self.cpp_info.builddirs.append("share")
@@ -2,15 +2,11 @@ import pathlib
 
 from conan import ConanFile
 from conan.tools.files import copy
-from conan.tools.cmake import (
-    CMake,
-    cmake_layout,
-    CMakeToolchain
-)
 
 class pkgConan(ConanFile):
     name = "zlib-stupid-wrapper"
     version = "2026.3.13"
+    recipe_version = 1
 
     description = "A pointless package made merely for testing Conan peculiarities"
     license = "GPL-3.0-or-later"
@@ -18,6 +14,9 @@ class pkgConan(ConanFile):
     user = "decovar"
     channel = "public"
 
+    python_requires = "recipe-helpers/2026.10.17@decovar/public"
+    python_requires_extend = "recipe-helpers.CMakeRecipe"
+
     options = {
         "shared": [True, False]
     }
@@ -38,27 +37,7 @@ class pkgConan(ConanFile):
     def requirements(self):
         self.requires("zlib/1.3.1@decovar/public")
 
-    def layout(self):
-        cmake_layout(self)
-
-    def generate(self):
-        tc = CMakeToolchain(self, generator="Ninja")
-        tc.generate()
-
-    def build(self):
-        cmake = CMake(self)
-        cmake.configure(
-            build_script_folder="src",
-            variables={
-                "THINGY_VERSION": self.version
-            }
-        )
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        cmake.install()
-
-    def package_info(self):
-        self.cpp_info.set_property("cmake_find_mode", "none")
-        self.cpp_info.builddirs.append("share")
+    def getCMakeVariables(self):
+        return {
+            "THINGY_VERSION": self.version
+        }
@@ -3,21 +3,15 @@ import pathlib
 from conan import ConanFile
 from conan.tools.files import (
     apply_conandata_patches,
-    #collect_libs,
     copy,
     export_conandata_patches,
     rm
 )
-from conan.tools.scm import Git
-from conan.tools.cmake import (
-    CMake,
-    cmake_layout,
-    CMakeToolchain
-)
 
 class pkgConan(ConanFile):
     name = "zlib"
     version = "1.3.1"
+    recipe_version = 5
 
     url = "https://github.com/madler/zlib"
     description = "A massively spiffy yet delicately unobtrusive compression library"
@@ -26,11 +20,25 @@ class pkgConan(ConanFile):
     user = "decovar"
     channel = "public"
 
+    python_requires = "recipe-helpers/2026.10.17@decovar/public"
+    python_requires_extend = "recipe-helpers.CMakeRecipe"
+
     options = {
-        "shared": [True, False]
+        "shared": [True, False],
+        # interprocedural (link-time) optimization, which lets the compiler
+        # inline functions across source files of the library
+        "lto": [True, False],
+        "unity_build": [True, False],
+        # profile-guided optimization: the library is built twice, first with
+        # instrumentation for running the training program from `pgo` folder,
+        # and then with the collected profile
+        "pgo": [True, False]
     }
     default_options = {
-        "shared": False
+        "shared": False,
+        "lto": False,
+        "unity_build": False,
+        "pgo": False
     }
 
     settings = "os", "compiler", "build_type", "arch"
@@ -43,25 +51,33 @@ class pkgConan(ConanFile):
             "*", # or do it with explicit files names in several `copy()` calls
             src=pathlib.Path(self.recipe_folder) / ".." / ".." / "common" / "cmake",
             # trying to "export" additional files directly into `src` folder
-            # will prevent `git.clone()` from cloning the repository,
+            # will interfere with fetching the repository sources there,
             # because `src` folder will already exist by that moment
             #dst=pathlib.Path(self.export_sources_folder) / "src"
             dst=pathlib.Path(self.export_sources_folder) / "_additional-files"
         )
-
-    def layout(self):
-        cmake_layout(self)
+        # the training program for the `pgo` option, which is not a part
+        # of the library sources, so it is kept out of `src`
+        copy(
+            self,
+            "*",
+            src=pathlib.Path(self.recipe_folder) / "pgo",
+            dst=pathlib.Path(self.export_sources_folder) / "pgo"
+        )
 
     def source(self):
-        git = Git(self)
-        git.clone(
+        # only the pinned commit is fetched, without the entire history,
+        # and if the sources cache is configured, then they are fetched
+        # and prepared just once for all the profiles/configurations
+        self.python_requires["recipe-helpers"].module.fetchSources(
+            self,
             url="git@github.com:madler/zlib.git",
-            hide_url=False,
-            target="src"
+            commit="51b7f2abdade71cd9bb0e7a373ef2610ec6f9daf",
+            target="src",
+            prepare=self.prepareSources
         )
-        git.folder = "src"
-        git.checkout("51b7f2abdade71cd9bb0e7a373ef2610ec6f9daf")
 
+    def prepareSources(self):
         apply_conandata_patches(self)
 
         # since one cannot export additional files directly to `src`,
@@ -77,33 +93,7 @@ class pkgConan(ConanFile):
         # the original header and use the generated header instead
         rm(self, "zconf.h", "src")
 
-    def generate(self):
-        tc = CMakeToolchain(self, generator="Ninja")
-        tc.generate()
-
-    def build(self):
-        cmake = CMake(self)
-        cmake.configure(
-            build_script_folder="src",
-            variables={
-                "ZLIB_BUILD_EXAMPLES": "NO"
-            }
-        )
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        cmake.install()
-
-    def package_info(self):
-        # is this even needed for anything?
-        #self.cpp_info.libs = collect_libs(self)
-
-        # do not let Conan try to be smarter than CMake or/and maintainer,
-        # otherwise it will generate some bizarre CMake configs of its own
-        # based on god knows what
-        self.cpp_info.set_property("cmake_find_mode", "none")
-        # this is required too, otherwise consumers won't be able to find CMake configs,
-        # and obviously if you are installing package configs to a different path,
-        # then you will need to replace `share` with whichever you are using
-        self.cpp_info.builddirs.append("share")
+    def getCMakeVariables(self):
+        return {
+            "ZLIB_BUILD_EXAMPLES": "NO"
+        }
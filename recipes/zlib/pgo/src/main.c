@@ -0,0 +1,223 @@
+// training workload for profile-guided optimization: compresses and decompresses
+// different kinds of data at several levels, so the profile covers the typical
+// deflate/inflate paths; the throughput it prints is only indicative,
+// as the library is instrumented when it runs for collecting the profile
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include <zlib/zlib.h>
+
+#define DATA_SIZE (2 * 1024 * 1024)
+#define CHUNK_SIZE (64 * 1024)
+
+static unsigned int seed = 12345;
+
+static unsigned int nextRandom(void)
+{
+    seed = seed * 1103515245u + 12345u;
+    return seed >> 8;
+}
+
+// words from a small vocabulary, like in text and markup
+static void generateText(unsigned char* data, size_t size)
+{
+    static const char* words[] = {
+        "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog",
+        "<div class=\"item\">", "</div>", "compression", "library", "\n",
+        "deflate", "inflate", "stream", "buffer", "window", "  ", "{\"id\": "
+    };
+    size_t i = 0;
+    while (i < size)
+    {
+        const char* word = words[nextRandom() % (sizeof(words) / sizeof(words[0]))];
+        size_t len = strlen(word);
+        for (size_t j = 0; j < len && i < size; j++)
+        {
+            data[i++] = (unsigned char)word[j];
+        }
+        if (i < size)
+        {
+            data[i++] = ' ';
+        }
+    }
+}
+
+// records of slowly changing numbers, like in binary formats
+static void generateRecords(unsigned char* data, size_t size)
+{
+    unsigned int value = 0;
+    for (size_t i = 0; i < size; i++)
+    {
+        if (i % 16 == 0)
+        {
+            value += nextRandom() % 4;
+        }
+        data[i] = (unsigned char)(i % 16 < 4 ? value >> (8 * (i % 4)) : i % 16);
+    }
+}
+
+// hardly compressible data
+static void generateNoise(unsigned char* data, size_t size)
+{
+    for (size_t i = 0; i < size; i++)
+    {
+        data[i] = (unsigned char)nextRandom();
+    }
+}
+
+static double getSeconds(clock_t start)
+{
+    double seconds = (double)(clock() - start) / CLOCKS_PER_SEC;
+    return seconds > 0 ? seconds : 1e-6;
+}
+
+// both directions go through the streaming interface in chunks,
+// as that is how it is commonly used
+static int roundTrip(
+    const char* corpus,
+    const unsigned char* data,
+    size_t size,
+    int level,
+    int windowBits,
+    int strategy,
+    unsigned char* compressed,
+    size_t compressedCapacity,
+    unsigned char* decompressed
+)
+{
+    z_stream strm;
+    memset(&strm, 0, sizeof(strm));
+    if (deflateInit2(&strm, level, Z_DEFLATED, windowBits, 8, strategy) != Z_OK)
+    {
+        fprintf(stderr, "deflateInit2() has failed\n");
+        return 1;
+    }
+    clock_t start = clock();
+    strm.next_out = compressed;
+    strm.avail_out = (uInt)compressedCapacity;
+    size_t offset = 0;
+    int ret = Z_OK;
+    while (ret != Z_STREAM_END)
+    {
+        size_t chunk = size - offset < CHUNK_SIZE ? size - offset : CHUNK_SIZE;
+        strm.next_in = (Bytef*)(data + offset);
+        strm.avail_in = (uInt)chunk;
+        offset += chunk;
+        ret = deflate(&strm, offset == size ? Z_FINISH : Z_NO_FLUSH);
+        if (ret == Z_STREAM_ERROR || (ret == Z_BUF_ERROR && offset == size))
+        {
+            fprintf(stderr, "deflate() has failed\n");
+            deflateEnd(&strm);
+            return 1;
+        }
+    }
+    size_t compressedSize = strm.total_out;
+    deflateEnd(&strm);
+    double compressSeconds = getSeconds(start);
+
+    memset(&strm, 0, sizeof(strm));
+    if (inflateInit2(&strm, windowBits) != Z_OK)
+    {
+        fprintf(stderr, "inflateInit2() has failed\n");
+        return 1;
+    }
+    start = clock();
+    strm.next_out = decompressed;
+    strm.avail_out = (uInt)size;
+    offset = 0;
+    ret = Z_OK;
+    while (ret != Z_STREAM_END)
+    {
+        size_t chunk = compressedSize - offset < CHUNK_SIZE ? compressedSize - offset : CHUNK_SIZE;
+        if (chunk == 0)
+        {
+            break;
+        }
+        strm.next_in = compressed + offset;
+        strm.avail_in = (uInt)chunk;
+        offset += chunk;
+        ret = inflate(&strm, Z_NO_FLUSH);
+        if (ret != Z_OK && ret != Z_STREAM_END)
+        {
+            fprintf(stderr, "inflate() has failed: %d\n", ret);
+            inflateEnd(&strm);
+            return 1;
+        }
+    }
+    size_t decompressedSize = strm.total_out;
+    inflateEnd(&strm);
+    double decompressSeconds = getSeconds(start);
+
+    if (ret != Z_STREAM_END || decompressedSize != size || memcmp(data, decompressed, size) != 0)
+    {
+        fprintf(stderr, "%s: decompressed data does not match the original\n", corpus);
+        return 1;
+    }
+
+    double megabytes = (double)size / (1024 * 1024);
+    printf(
+        "%-8s %-8s level %d: ratio %5.2f, deflate %7.1f MB/s, inflate %7.1f MB/s\n",
+        corpus,
+        windowBits > 15 ? "gzip" : (strategy == Z_FILTERED ? "filtered" : "zlib"),
+        level,
+        (double)size / compressedSize,
+        megabytes / compressSeconds,
+        megabytes / decompressSeconds
+    );
+    return 0;
+}
+
+int main(void)
+{
+    const struct
+    {
+        const char* name;
+        void (*generate)(unsigned char*, size_t);
+    } corpora[] = {
+        { "text", generateText },
+        { "records", generateRecords },
+        { "noise", generateNoise }
+    };
+    const int levels[] = { 1, 6, 9 };
+
+    // with some room for the gzip header and trailer
+    size_t compressedCapacity = compressBound(DATA_SIZE) + 64;
+    unsigned char* data = malloc(DATA_SIZE);
+    unsigned char* compressed = malloc(compressedCapacity);
+    unsigned char* decompressed = malloc(DATA_SIZE);
+    if (data == NULL || compressed == NULL || decompressed == NULL)
+    {
+        fprintf(stderr, "Could not allocate the buffers\n");
+        return 1;
+    }
+
+    int failed = 0;
+    for (size_t c = 0; c < sizeof(corpora) / sizeof(corpora[0]); c++)
+    {
+        corpora[c].generate(data, DATA_SIZE);
+        for (size_t l = 0; l < sizeof(levels) / sizeof(levels[0]); l++)
+        {
+            failed |= roundTrip(
+                corpora[c].name, data, DATA_SIZE, levels[l], 15, Z_DEFAULT_STRATEGY,
+                compressed, compressedCapacity, decompressed
+            );
+        }
+        // gzip format with its CRC-32 and the strategy that PNG uses by default
+        failed |= roundTrip(
+            corpora[c].name, data, DATA_SIZE, 6, 15 + 16, Z_DEFAULT_STRATEGY,
+            compressed, compressedCapacity, decompressed
+        );
+        failed |= roundTrip(
+            corpora[c].name, data, DATA_SIZE, 6, 15, Z_FILTERED,
+            compressed, compressedCapacity, decompressed
+        );
+    }
+
+    free(data);
+    free(compressed);
+    free(decompressed);
+    return failed;
+}
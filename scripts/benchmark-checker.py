@@ -0,0 +1,460 @@
+import logging
+from datetime import datetime
+import pathlib
+import argparse
+import sys
+import subprocess
+import json
+import os
+import shutil
+import tempfile
+import time
+import platform
+
+import typing
+
+loggingLevel: int = logging.INFO
+loggingFormat: str = "[%(levelname)s] %(message)s"
+
+argParser = argparse.ArgumentParser(
+    prog="benchmark-checker",
+    description="".join((
+        "-= %(prog)s =-\n",
+        "Generates synthetic registries of different sizes and measures ",
+        "how check-versions-and-hashes performs on them.\n\n",
+        f"Copyright (C) 2026-{datetime.now().year} ",
+        "Declaration of VAR\n",
+        "License: GPLv3"
+    )),
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    allow_abbrev=False
+)
+argParser.add_argument(
+    "--sizes",
+    default="10,1000,10000",
+    metavar="N[,N...]",
+    help="numbers of recipes in generated registries (default: %(default)s)"
+)
+argParser.add_argument(
+    "--versions",
+    type=int,
+    default=3,
+    metavar="M",
+    help="number of versions (commits) per recipe (default: %(default)s)"
+)
+argParser.add_argument(
+    "--runs",
+    type=int,
+    default=3,
+    help=" ".join((
+        "how many times to run the checker for each measurement,",
+        "the best run is reported (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--checker-args",
+    default="",
+    metavar="\"ARGS\"",
+    help="additional arguments for the checker, such as \"--jobs 0\""
+)
+argParser.add_argument(
+    "--output",
+    type=pathlib.Path,
+    metavar="/path/to/results.json",
+    help="where to save the results (default: print them)"
+)
+argParser.add_argument(
+    "--compare",
+    type=pathlib.Path,
+    metavar="/path/to/previous-results.json",
+    help="results of a previous run to compare against"
+)
+argParser.add_argument(
+    "--work-folder",
+    type=pathlib.Path,
+    metavar="/path/to/folder/",
+    help=" ".join((
+        "where to generate registries (default: a temporary folder,",
+        "which is deleted afterwards)"
+    ))
+)
+argParser.add_argument(
+    "--debug",
+    action='store_true',
+    help="enable debug/dev mode (default: %(default)s)"
+)
+cliArgs = argParser.parse_args()
+
+debugMode: bool = cliArgs.debug
+
+if debugMode:
+    loggingLevel = logging.DEBUG
+    # 8 is the length of "CRITICAL" - the longest log level name
+    loggingFormat = "%(asctime)s | %(levelname)-8s | %(message)s"
+
+logging.basicConfig(
+    format=loggingFormat,
+    level=loggingLevel,
+    stream=sys.stderr
+)
+
+logging.debug(f"CLI arguments: {cliArgs}")
+logging.debug("-")
+
+scriptsPath: pathlib.Path = pathlib.Path(__file__).resolve().parent
+checkerScript: pathlib.Path = scriptsPath / "check-versions-and-hashes.py"
+
+# the one from `check-versions-and-hashes.py`
+startupTargetMilliseconds: float = 50
+
+try:
+    registrySizes: typing.List[int] = [
+        int(n) for n in cliArgs.sizes.split(",") if n.strip()
+    ]
+except ValueError:
+    argParser.error(f"Invalid --sizes value: {cliArgs.sizes}")
+if cliArgs.versions < 1 or cliArgs.runs < 1:
+    argParser.error("--versions and --runs values must be positive")
+
+gitBinary: typing.Optional[str] = shutil.which("git")
+if gitBinary is None:
+    logging.error("Could not find Git")
+    raise SystemExit(2)
+
+
+def runGit(registryPath: pathlib.Path, *args: str) -> str:
+    return subprocess.run(
+        [gitBinary, "-C", registryPath.as_posix(), *args],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE
+    ).stdout
+
+
+def writeFile(filePath: pathlib.Path, content: str) -> None:
+    with open(filePath, "w", newline="\n") as f:
+        f.write(content)
+
+
+# same layout as the real registry: every version of every recipe
+# is a separate commit (well, all the recipes are bumped in the same commit),
+# and versions files list all of them with their trees
+def generateRegistry(
+    registryPath: pathlib.Path,
+    recipesCnt: int,
+    versionsCnt: int
+) -> None:
+    logging.info(
+        f"Generating a registry with {recipesCnt} recipes, {versionsCnt} versions each"
+    )
+    recipes: typing.List[str] = [f"recipe-{i:05}" for i in range(recipesCnt)]
+    recipesTrees: typing.Dict[str, typing.List[str]] = {p: [] for p in recipes}
+
+    registryPath.mkdir(parents=True)
+    runGit(registryPath, "init", "--quiet")
+    runGit(registryPath, "config", "user.name", "benchmark")
+    runGit(registryPath, "config", "user.email", "benchmark@localhost")
+    runGit(registryPath, "config", "commit.gpgsign", "false")
+
+    for v in range(versionsCnt):
+        for p in recipes:
+            recipePath = registryPath / "recipes" / p
+            recipePath.mkdir(parents=True, exist_ok=True)
+            writeFile(
+                recipePath / "conanfile.py",
+                "\n".join((
+                    "from conan import ConanFile",
+                    "",
+                    "class pkgConan(ConanFile):",
+                    f"    name = \"{p}\"",
+                    f"    version = \"1.0.{v}\"",
+                    ""
+                ))
+            )
+            if v == 0:
+                writeFile(recipePath / "conandata.yml", "patches: {}\n")
+        runGit(registryPath, "add", "--all")
+        runGit(registryPath, "commit", "--quiet", "-m", f"Version 1.0.{v}")
+        for entry in runGit(
+            registryPath,
+            "ls-tree",
+            "HEAD",
+            "recipes/"
+        ).splitlines():
+            entryInfo, _, entryPath = entry.partition("\t")
+            recipesTrees[entryPath.split("/")[1]].append(entryInfo.split(" ")[2])
+
+    baseline: typing.Dict[str, typing.Any] = {"default": {}}
+    for p in recipes:
+        versionsPath = registryPath / "versions" / f"{p[0]}-"
+        versionsPath.mkdir(parents=True, exist_ok=True)
+        writeFile(
+            versionsPath / f"{p}.json",
+            json.dumps(
+                {
+                    "versions": [
+                        {"version": f"1.0.{v}", "git-tree": t}
+                        for v, t in enumerate(recipesTrees[p])
+                    ]
+                },
+                indent=4
+            )
+        )
+        baseline["default"][p] = {
+            "baseline": f"1.0.{versionsCnt - 1}",
+            "recipe-version": 0
+        }
+    writeFile(
+        registryPath / "versions" / "baseline.json",
+        json.dumps(baseline, indent=4)
+    )
+    writeFile(registryPath / ".gitignore", "/.cache/\n")
+    runGit(registryPath, "add", "--all")
+    runGit(registryPath, "commit", "--quiet", "-m", "Versions")
+
+
+# a `git` wrapper that counts its invocations, put in front of the real one
+def makeGitCounter(binPath: pathlib.Path) -> typing.Optional[pathlib.Path]:
+    if os.name != "posix":
+        return None
+    binPath.mkdir(parents=True, exist_ok=True)
+    counterFile = binPath / "git-calls"
+    wrapper = binPath / "git"
+    writeFile(
+        wrapper,
+        "\n".join((
+            "#!/bin/sh",
+            f"echo >> \"{counterFile.as_posix()}\"",
+            f"exec \"{gitBinary}\" \"$@\"",
+            ""
+        ))
+    )
+    wrapper.chmod(0o755)
+    return counterFile
+
+
+class RunResult:
+    __slots__ = (
+        "wallTime",
+        "peakRssKiB",
+        "subprocesses",
+        "exitCode"
+    )
+
+    def __init__(
+        self,
+        wallTime: float,
+        peakRssKiB: typing.Optional[int],
+        subprocesses: typing.Optional[int],
+        exitCode: int
+    ):
+        self.wallTime: float = wallTime
+        self.peakRssKiB: typing.Optional[int] = peakRssKiB
+        self.subprocesses: typing.Optional[int] = subprocesses
+        self.exitCode: int = exitCode
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+
+def runMeasured(
+    cmd: typing.List[str],
+    gitCounterFile: typing.Optional[pathlib.Path]
+) -> RunResult:
+    env = dict(os.environ)
+    # measuring with the bytecode cached, as it is for users
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if gitCounterFile is not None:
+        gitCounterFile.unlink(missing_ok=True)
+        env["PATH"] = os.pathsep.join((
+            gitCounterFile.parent.as_posix(),
+            env.get("PATH", "")
+        ))
+    logging.debug(f"Running: {' '.join(cmd)}")
+    startTime = time.perf_counter()
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env
+    )
+    peakRssKiB: typing.Optional[int] = None
+    if hasattr(os, "wait4"):
+        # rusage of the checker process (and of its children it waited for)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wallTime = time.perf_counter() - startTime
+        exitCode = os.waitstatus_to_exitcode(status)
+        process.returncode = exitCode
+        # kilobytes on Linux, but bytes on macOS
+        peakRssKiB = (
+            rusage.ru_maxrss // 1024
+            if sys.platform == "darwin"
+            else rusage.ru_maxrss
+        )
+    else:
+        exitCode = process.wait()
+        wallTime = time.perf_counter() - startTime
+
+    subprocessesCnt: typing.Optional[int] = None
+    if gitCounterFile is not None:
+        subprocessesCnt = (
+            len(gitCounterFile.read_text().splitlines())
+            if gitCounterFile.is_file()
+            else 0
+        )
+    return RunResult(wallTime, peakRssKiB, subprocessesCnt, exitCode)
+
+
+def runBest(
+    cmd: typing.List[str],
+    gitCounterFile: typing.Optional[pathlib.Path],
+    runsCnt: int
+) -> RunResult:
+    best: typing.Optional[RunResult] = None
+    for _ in range(runsCnt):
+        r = runMeasured(cmd, gitCounterFile)
+        if best is None or r.wallTime < best.wallTime:
+            best = r
+    assert best is not None
+    return best
+
+
+workFolder: pathlib.Path = (
+    cliArgs.work_folder
+    if cliArgs.work_folder is not None
+    else pathlib.Path(tempfile.mkdtemp(prefix="checker-benchmark-"))
+)
+checkerArgs: typing.List[str] = cliArgs.checker_args.split()
+
+try:
+    gitCounterFile = makeGitCounter(workFolder / "bin")
+
+    # startup is measured without any registry, just `--help`,
+    # and the first run only compiles and caches the bytecode
+    runMeasured([sys.executable, checkerScript.as_posix(), "--help"], None)
+    bareStartup = runBest(
+        [sys.executable, "-c", "pass"],
+        None,
+        cliArgs.runs
+    )
+    checkerStartup = runBest(
+        [sys.executable, checkerScript.as_posix(), "--help"],
+        None,
+        cliArgs.runs
+    )
+    startupOverheadMilliseconds: float = (
+        checkerStartup.wallTime - bareStartup.wallTime
+    ) * 1000
+    logging.info(
+        " ".join((
+            f"Startup overhead: {startupOverheadMilliseconds:.1f} ms",
+            f"(target: {startupTargetMilliseconds:.0f} ms)"
+        ))
+    )
+
+    results: typing.List[typing.Dict[str, typing.Any]] = []
+    for recipesCnt in registrySizes:
+        registryPath = workFolder / f"registry-{recipesCnt}"
+        if registryPath.exists():
+            shutil.rmtree(registryPath)
+        generateRegistry(registryPath, recipesCnt, cliArgs.versions)
+
+        checkerCmd = [
+            sys.executable,
+            checkerScript.as_posix(),
+            registryPath.as_posix(),
+            *checkerArgs
+        ]
+        scenarios: typing.List[typing.Tuple[str, typing.List[str]]] = [
+            ("cold", checkerCmd + ["--no-cache"]),
+            ("warm", checkerCmd),
+            ("audit-history", checkerCmd + ["--audit-history"])
+        ]
+        # prime the caches for the "warm" scenario
+        runMeasured(checkerCmd, None)
+        for scenario, cmd in scenarios:
+            r = runBest(cmd, gitCounterFile, cliArgs.runs)
+            logging.info(
+                " ".join((
+                    f"- {recipesCnt} recipes, {scenario}:",
+                    f"{r.wallTime:.3f} s,",
+                    f"peak RSS {r.peakRssKiB} KiB,",
+                    f"{r.subprocesses} Git calls,",
+                    f"exit code {r.exitCode}"
+                ))
+            )
+            if r.exitCode != 0:
+                logging.warning(
+                    f"The checker failed on the generated registry ({scenario})"
+                )
+            results.append(
+                {
+                    "recipes": recipesCnt,
+                    "versions": cliArgs.versions,
+                    "scenario": scenario,
+                    **r.toDict()
+                }
+            )
+finally:
+    if cliArgs.work_folder is None:
+        shutil.rmtree(workFolder, ignore_errors=True)
+
+currentCommit: typing.Optional[str] = None
+try:
+    currentCommit = subprocess.run(
+        [gitBinary, "-C", scriptsPath.as_posix(), "rev-parse", "HEAD"],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    ).stdout.strip()
+except subprocess.CalledProcessError:
+    pass
+
+benchmarkResults: typing.Dict[str, typing.Any] = {
+    "commit": currentCommit,
+    "timestamp": datetime.now().astimezone().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "checkerArgs": checkerArgs,
+    "startup": {
+        "bareWallTime": bareStartup.wallTime,
+        "checkerWallTime": checkerStartup.wallTime,
+        "overheadMilliseconds": startupOverheadMilliseconds,
+        "targetMilliseconds": startupTargetMilliseconds,
+        "targetIsMet": startupOverheadMilliseconds <= startupTargetMilliseconds
+    },
+    "results": results
+}
+
+if cliArgs.output is not None:
+    with open(cliArgs.output, "w") as f:
+        json.dump(benchmarkResults, f, indent=4)
+        f.write("\n")
+else:
+    print(json.dumps(benchmarkResults, indent=4))
+
+if cliArgs.compare is not None:
+    with open(cliArgs.compare, "r") as f:
+        previousResults = json.load(f)
+    previous: typing.Dict[typing.Tuple[int, int, str], typing.Dict[str, typing.Any]] = {
+        (r["recipes"], r["versions"], r["scenario"]): r
+        for r in previousResults.get("results", [])
+    }
+    print(f"Compared to [{previousResults.get('commit')}]:", file=sys.stderr)
+    for r in results:
+        p = previous.get((r["recipes"], r["versions"], r["scenario"]))
+        if p is None:
+            continue
+        print(
+            " ".join((
+                f"- {r['recipes']} recipes, {r['scenario']}:",
+                f"{p['wallTime']:.3f} s -> {r['wallTime']:.3f} s",
+                f"({r['wallTime'] / p['wallTime']:.2f}x),",
+                f"{p['subprocesses']} -> {r['subprocesses']} Git calls"
+            )),
+            file=sys.stderr
+        )
+
+if not benchmarkResults["startup"]["targetIsMet"]:
+    logging.warning("Startup time target is not met")
@@ -0,0 +1,467 @@
+import logging
+from datetime import datetime
+import pathlib
+import argparse
+import sys
+import json
+import os
+import shlex
+import threading
+import time
+
+import typing
+
+# all the actual work is done there, this is only the command line interface
+from registry_matrix import (
+    MatrixBuilder,
+    MatrixResult,
+    getMatrixConfigurations,
+    getMatrixSummary
+)
+from registry_builder import getJobTokensBudget
+from registry_checker import renderTable
+
+loggingLevel: int = logging.INFO
+loggingFormat: str = "[%(levelname)s] %(message)s"
+
+argParser = argparse.ArgumentParser(
+    prog="build-matrix",
+    description="".join((
+        "-= %(prog)s =-\n",
+        "Builds recipes of the registry for every combination ",
+        "of the given profiles, settings and options, but only ",
+        "those which are not in the Conan cache yet.\n\n",
+        "Example:\n",
+        "$ python ./build-matrix.py --profile some-profile ",
+        "--setting build_type=Debug,Release --option \"*:shared=True,False\"\n\n",
+        f"Copyright (C) 2026-{datetime.now().year} ",
+        "Declaration of VAR\n",
+        "License: GPLv3"
+    )),
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    allow_abbrev=False
+)
+argParser.add_argument(
+    "repositoryPath",
+    type=pathlib.Path,
+    nargs="?",
+    default=pathlib.Path("."),
+    metavar="/path/to/conan-recipes/",
+    help="path to the repository with Conan recipes"
+)
+argParser.add_argument(
+    "--recipe",
+    dest="recipes",
+    action="append",
+    metavar="NAME",
+    help=" ".join((
+        "build only this recipe, can be given several times;",
+        "their dependencies are expected to be already",
+        "in the Conan cache (default: all the recipes)"
+    ))
+)
+argParser.add_argument(
+    "--profile",
+    dest="profiles",
+    action="append",
+    default=[],
+    metavar="NAME",
+    help=" ".join((
+        "host profile of the matrix, can be given several times",
+        "(default: the default profile)"
+    ))
+)
+argParser.add_argument(
+    "--setting",
+    dest="settings",
+    action="append",
+    default=[],
+    metavar="NAME=VALUE1,VALUE2",
+    help=" ".join((
+        "setting of the matrix with its values, can be given several times,",
+        "such as build_type=Debug,Release"
+    ))
+)
+argParser.add_argument(
+    "--option",
+    dest="options",
+    action="append",
+    default=[],
+    metavar="NAME=VALUE1,VALUE2",
+    help=" ".join((
+        "option of the matrix with its values, can be given several times,",
+        "such as \"*:shared=True,False\""
+    ))
+)
+argParser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help=" ".join((
+        "check and build this many combinations in parallel,",
+        "0 means the number of CPU cores (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--job-tokens",
+    type=int,
+    metavar="N",
+    help=" ".join((
+        "the budget of jobs shared by all the combinations built in parallel,",
+        "each build gets its share as tools.build:jobs,",
+        "0 means the number of CPU cores (default: not limited)"
+    ))
+)
+argParser.add_argument(
+    "--memory-per-job",
+    type=int,
+    metavar="MB",
+    help=" ".join((
+        "how much memory one job takes, so the jobs budget",
+        "does not exceed the machine memory (default: not limited)"
+    ))
+)
+argParser.add_argument(
+    "--conan",
+    default="conan",
+    metavar="/path/to/conan",
+    help="Conan executable (default: %(default)s)"
+)
+argParser.add_argument(
+    "--conan-args",
+    default="",
+    metavar="\"ARGS\"",
+    help=" ".join((
+        "additional arguments for every combination,",
+        "such as \"-pr:b some-profile\""
+    ))
+)
+argParser.add_argument(
+    "--logs-folder",
+    type=pathlib.Path,
+    metavar="/path/to/logs/",
+    help=" ".join((
+        "where to save the build log of every combination",
+        "(default: .cache/build-logs in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--build-state",
+    type=pathlib.Path,
+    metavar="/path/to/build-state.json",
+    help=" ".join((
+        "where to record the successful builds, for plan-rebuild",
+        "(default: .cache/build-state.json in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--matrix-store",
+    type=pathlib.Path,
+    metavar="/path/to/matrix-store.json",
+    help=" ".join((
+        "where to remember the packages of every combination,",
+        "so unchanged recipes are not checked with Conan again",
+        "(default: .cache/matrix-store.json in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--summary",
+    type=pathlib.Path,
+    metavar="/path/to/summary.json",
+    help=" ".join((
+        "where to save the summary with the results, timings and cache hits",
+        "(default: .cache/matrix-summary.json in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--quiet",
+    action='store_true',
+    help=" ".join((
+        "do not print the builds output, only save it",
+        "to the log files (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--dry-run",
+    action='store_true',
+    help=" ".join((
+        "only print the combinations of the matrix",
+        "(default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--format",
+    choices=["table", "json"],
+    default="table",
+    help=" ".join((
+        "output format of the results: a table for humans,",
+        "or the summary JSON for machines (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--debug",
+    action='store_true',
+    help="enable debug/dev mode (default: %(default)s)"
+)
+cliArgs = argParser.parse_args()
+
+
+# NAME=VALUE1,VALUE2 to ("NAME", ["VALUE1", "VALUE2"])
+def parseMatrixAxis(
+    argName: str,
+    axis: str
+) -> typing.Tuple[str, typing.List[str]]:
+    name, _, values = axis.partition("=")
+    valuesList = [v.strip() for v in values.split(",") if v.strip()]
+    if not name.strip() or not valuesList:
+        argParser.error(
+            f"{argName} value must be NAME=VALUE1,VALUE2, got [{axis}]"
+        )
+    return name.strip(), valuesList
+
+
+repositoryPath: pathlib.Path = cliArgs.repositoryPath
+recipesToBuild: typing.Optional[typing.List[str]] = cliArgs.recipes
+matrixProfiles: typing.List[str] = cliArgs.profiles
+matrixSettings: typing.List[typing.Tuple[str, typing.List[str]]] = [
+    parseMatrixAxis("--setting", s) for s in cliArgs.settings
+]
+matrixOptions: typing.List[typing.Tuple[str, typing.List[str]]] = [
+    parseMatrixAxis("--option", o) for o in cliArgs.options
+]
+jobsCnt: int = cliArgs.jobs
+jobTokens: typing.Optional[int] = cliArgs.job_tokens
+memoryPerJob: typing.Optional[int] = cliArgs.memory_per_job
+conanCommand: str = cliArgs.conan
+conanArgs: typing.List[str] = shlex.split(cliArgs.conan_args)
+logsFolder: typing.Optional[pathlib.Path] = cliArgs.logs_folder
+buildStateFile: typing.Optional[pathlib.Path] = cliArgs.build_state
+matrixStoreFile: typing.Optional[pathlib.Path] = cliArgs.matrix_store
+summaryFile: pathlib.Path = (
+    cliArgs.summary
+    if cliArgs.summary is not None
+    else repositoryPath / ".cache" / "matrix-summary.json"
+)
+quietMode: bool = cliArgs.quiet
+dryRun: bool = cliArgs.dry_run
+outputFormat: str = cliArgs.format
+debugMode: bool = cliArgs.debug
+
+if jobsCnt < 0:
+    argParser.error("--jobs value cannot be negative")
+elif jobsCnt == 0:
+    jobsCnt = os.cpu_count() or 1
+
+if jobTokens is not None and jobTokens < 0:
+    argParser.error("--job-tokens value cannot be negative")
+if memoryPerJob is not None and memoryPerJob < 1:
+    argParser.error("--memory-per-job value must be positive")
+
+if debugMode:
+    loggingLevel = logging.DEBUG
+    # 8 is the length of "CRITICAL" - the longest log level name
+    loggingFormat = "%(asctime)s | %(levelname)-8s | %(message)s"
+
+# in machine-readable formats stdout is only for results
+outputStream: typing.TextIO = sys.stdout if outputFormat == "table" else sys.stderr
+
+logging.basicConfig(
+    format=loggingFormat,
+    level=loggingLevel,
+    stream=outputStream
+)
+
+logging.debug(f"CLI arguments: {cliArgs}")
+logging.debug("-")
+
+if jobTokens is not None or memoryPerJob is not None:
+    jobTokens = getJobTokensBudget(jobTokens, memoryPerJob)
+    logging.debug(f"Jobs budget: {jobTokens}")
+
+# --- do some checks first
+
+if not repositoryPath.is_dir():
+    logging.error(f"Registry path [{repositoryPath.resolve()}] doesn't exist")
+    raise SystemExit(2)
+
+recipesPath: pathlib.Path = repositoryPath / "recipes"
+if not recipesPath.is_dir():
+    logging.error(
+        " ".join((
+            "There is no [recipes] folder inside the registry,",
+            "you might have provided a wrong path to the registry"
+        ))
+    )
+    raise SystemExit(3)
+
+matrixConfigurations: typing.List[typing.List[str]] = getMatrixConfigurations(
+    matrixProfiles,
+    matrixSettings,
+    matrixOptions,
+    conanArgs
+)
+
+matrixBuilder: MatrixBuilder = MatrixBuilder(
+    repositoryPath,
+    matrixConfigurations,
+    jobsCnt,
+    logsFolder,
+    conanCommand,
+    buildStateFile,
+    matrixStoreFile,
+    jobTokens
+)
+
+if recipesToBuild is not None:
+    unknownRecipes = sorted(set(recipesToBuild) - set(matrixBuilder.getRecipes()))
+    if unknownRecipes:
+        logging.error(
+            f"There are no such recipes in the registry: {', '.join(unknownRecipes)}"
+        )
+        raise SystemExit(4)
+    recipesToBuild = sorted(set(recipesToBuild))
+
+try:
+    matrixBuilder.getBuildLevels(recipesToBuild)
+except ValueError as ex:
+    logging.error(ex)
+    raise SystemExit(4)
+
+# ---
+
+# the log files and the output lines are numbered by combinations
+for i, c in enumerate(matrixConfigurations):
+    if dryRun:
+        print(f"{i + 1}: {' '.join(c)}")
+    else:
+        logging.info(f"Combination {i + 1}: {' '.join(c) or '(no arguments)'}")
+if dryRun:
+    raise SystemExit(0)
+
+ansiReset: str = "\033[0m"
+ansiBright: str = "\033[1m"
+ansiDim: str = "\033[2m"
+ansiRed: str = "\033[31m"
+ansiGreen: str = "\033[32m"
+ansiYellow: str = "\033[33m"
+ansiBlue: str = "\033[34m"
+
+statusColors: typing.Dict[str, str] = {
+    "cached": ansiBlue,
+    "built": ansiGreen,
+    "failed": ansiRed,
+    "skipped": ansiYellow,
+    "invalid": ansiDim
+}
+
+outputLock: threading.Lock = threading.Lock()
+
+
+# lines of parallel builds are interleaved, so each is prefixed with its task
+def printBuildOutput(taskName: str, line: str) -> None:
+    with outputLock:
+        print(f"{ansiDim}[{taskName}]{ansiReset} {line}", file=outputStream, flush=True)
+
+
+def getMatrixResultCells(
+    r: MatrixResult
+) -> typing.Tuple[str, str, str, str, str]:
+    return (
+        f"{ansiDim}{r.name}{ansiReset}",
+        r.configuration,
+        "".join((
+            statusColors[r.status],
+            ansiBright,
+            r.status,
+            ansiReset,
+            f" ({r.cacheHit})" if r.cacheHit else "",
+            f" (because of {r.failedDependency})" if r.failedDependency else ""
+        )),
+        f"{r.duration:.1f} s" if r.duration else "",
+        f"{ansiDim}{r.logFile}{ansiReset}" if r.logFile is not None else ""
+    )
+
+
+startTime: float = time.perf_counter()
+matrixResults: typing.List[MatrixResult] = []
+try:
+    for r in matrixBuilder.buildMatrix(
+        recipesToBuild,
+        None if quietMode else printBuildOutput
+    ):
+        matrixResults.append(r)
+        if r.status == "failed":
+            logging.error(
+                " ".join((
+                    f"Recipe [{r.name}] has failed with [{r.configuration}]",
+                    f"see {r.logFile}" if r.logFile is not None else ""
+                )).strip()
+            )
+        elif r.status == "skipped":
+            logging.warning(
+                f"Recipe [{r.name}] with [{r.configuration}] is skipped, because [{r.failedDependency}] has failed"
+                if r.failedDependency
+                else f"Recipe [{r.name}] with [{r.configuration}] is skipped"
+            )
+        elif r.status == "built":
+            logging.info(
+                f"Recipe [{r.name}] with [{r.configuration}] is built in {r.duration:.1f} s"
+            )
+        else:
+            logging.debug(f"Recipe [{r.name}] with [{r.configuration}] is {r.status}")
+except KeyboardInterrupt:
+    matrixBuilder.cancel()
+    logging.error("Interrupted, running builds are terminated")
+    raise SystemExit(1)
+
+duration: float = time.perf_counter() - startTime
+
+configurationNames: typing.List[str] = [" ".join(c) for c in matrixConfigurations]
+matrixResults.sort(key=lambda r: (r.name, configurationNames.index(r.configuration)))
+matrixSummary: typing.Dict[str, typing.Any] = getMatrixSummary(
+    matrixResults,
+    matrixConfigurations,
+    duration,
+    matrixBuilder.stageDurations
+)
+try:
+    summaryFile.parent.mkdir(parents=True, exist_ok=True)
+    with open(summaryFile, "w") as f:
+        json.dump(matrixSummary, f, indent=4)
+except OSError as ex:
+    logging.warning(f"Could not save the summary: {ex}")
+
+if outputFormat == "json":
+    print(json.dumps(matrixSummary, indent=4))
+else:
+    print(
+        renderTable(
+            (
+                "",
+                f"{ansiDim}combination{ansiReset}",
+                f"{ansiDim}status{ansiReset}",
+                f"{ansiDim}time{ansiReset}",
+                f"{ansiDim}log{ansiReset}"
+            ),
+            (getMatrixResultCells(r) for r in matrixResults)
+        )
+    )
+    statuses: typing.Dict[str, int] = matrixSummary["statuses"]
+    cacheHits: typing.Dict[str, int] = matrixSummary["cacheHits"]
+    logging.info(
+        " ".join((
+            f"Combinations: {matrixSummary['combinations']},",
+            f"{statuses['cached']} cached",
+            f"({cacheHits['store']} from the store, {cacheHits['conan']} from Conan),",
+            f"{statuses['built']} built, {statuses['failed']} failed,",
+            f"{statuses['skipped']} skipped, {statuses['invalid']} invalid;",
+            f"hit rate: {matrixSummary['hitRate'] or 0:.0%},",
+            f"total time: {duration:.1f} s",
+            f"(checks: {matrixBuilder.stageDurations['store'] + matrixBuilder.stageDurations['conan']:.1f} s,",
+            f"builds: {matrixBuilder.stageDurations['build']:.1f} s)"
+        ))
+    )
+
+if any(r.status in ("failed", "skipped") for r in matrixResults):
+    raise SystemExit(1)
@@ -0,0 +1,346 @@
+import logging
+from datetime import datetime
+import pathlib
+import argparse
+import sys
+import json
+import os
+import shlex
+import threading
+
+import typing
+
+# all the actual work is done there, this is only the command line interface
+from registry_builder import (
+    BuildResult,
+    RegistryBuilder,
+    getJobTokensBudget
+)
+from registry_checker import renderTable
+
+loggingLevel: int = logging.INFO
+loggingFormat: str = "[%(levelname)s] %(message)s"
+
+argParser = argparse.ArgumentParser(
+    prog="build-recipes",
+    description="".join((
+        "-= %(prog)s =-\n",
+        "Builds recipes of the registry with conan create ",
+        "in the order of their dependencies.\n\n",
+        f"Copyright (C) 2026-{datetime.now().year} ",
+        "Declaration of VAR\n",
+        "License: GPLv3"
+    )),
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    allow_abbrev=False
+)
+argParser.add_argument(
+    "repositoryPath",
+    type=pathlib.Path,
+    nargs="?",
+    default=pathlib.Path("."),
+    metavar="/path/to/conan-recipes/",
+    help="path to the repository with Conan recipes"
+)
+argParser.add_argument(
+    "--recipe",
+    dest="recipes",
+    action="append",
+    metavar="NAME",
+    help=" ".join((
+        "build only this recipe, can be given several times;",
+        "their dependencies are expected to be already",
+        "in the Conan cache (default: all the recipes)"
+    ))
+)
+argParser.add_argument(
+    "--recipes-from",
+    type=argparse.FileType("r"),
+    metavar="/path/to/list.txt",
+    help=" ".join((
+        "build only the recipes listed in this file, one per line,",
+        "such as the output of plan-rebuild; - means stdin"
+    ))
+)
+argParser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help=" ".join((
+        "build this many recipes in parallel,",
+        "0 means the number of CPU cores (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--job-tokens",
+    type=int,
+    metavar="N",
+    help=" ".join((
+        "the budget of jobs shared by all the recipes built in parallel,",
+        "each build gets its share as tools.build:jobs,",
+        "0 means the number of CPU cores (default: not limited)"
+    ))
+)
+argParser.add_argument(
+    "--memory-per-job",
+    type=int,
+    metavar="MB",
+    help=" ".join((
+        "how much memory one job takes, so the jobs budget",
+        "does not exceed the machine memory (default: not limited)"
+    ))
+)
+argParser.add_argument(
+    "--conan",
+    default="conan",
+    metavar="/path/to/conan",
+    help="Conan executable (default: %(default)s)"
+)
+argParser.add_argument(
+    "--conan-args",
+    default="",
+    metavar="\"ARGS\"",
+    help=" ".join((
+        "additional arguments for every conan create,",
+        "such as \"-pr:h some-profile -s build_type=Debug\""
+    ))
+)
+argParser.add_argument(
+    "--logs-folder",
+    type=pathlib.Path,
+    metavar="/path/to/logs/",
+    help=" ".join((
+        "where to save the build log of every recipe",
+        "(default: .cache/build-logs in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--build-state",
+    type=pathlib.Path,
+    metavar="/path/to/build-state.json",
+    help=" ".join((
+        "where to record the successful builds, for plan-rebuild",
+        "(default: .cache/build-state.json in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--quiet",
+    action='store_true',
+    help=" ".join((
+        "do not print the builds output, only save it",
+        "to the log files (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--dry-run",
+    action='store_true',
+    help=" ".join((
+        "only print the recipes in the order they would be built,",
+        "grouped by levels that can be built in parallel (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--format",
+    choices=["table", "json", "ndjson"],
+    default="table",
+    help=" ".join((
+        "output format of the results: a table for humans, or JSON",
+        "for machines, where ndjson prints every recipe result",
+        "as soon as it is ready (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--debug",
+    action='store_true',
+    help="enable debug/dev mode (default: %(default)s)"
+)
+cliArgs = argParser.parse_args()
+
+repositoryPath: pathlib.Path = cliArgs.repositoryPath
+recipesToBuild: typing.Optional[typing.List[str]] = cliArgs.recipes
+jobsCnt: int = cliArgs.jobs
+jobTokens: typing.Optional[int] = cliArgs.job_tokens
+memoryPerJob: typing.Optional[int] = cliArgs.memory_per_job
+conanCommand: str = cliArgs.conan
+conanArgs: typing.List[str] = shlex.split(cliArgs.conan_args)
+logsFolder: typing.Optional[pathlib.Path] = cliArgs.logs_folder
+buildStateFile: typing.Optional[pathlib.Path] = cliArgs.build_state
+quietMode: bool = cliArgs.quiet
+dryRun: bool = cliArgs.dry_run
+outputFormat: str = cliArgs.format
+debugMode: bool = cliArgs.debug
+
+if jobsCnt < 0:
+    argParser.error("--jobs value cannot be negative")
+elif jobsCnt == 0:
+    jobsCnt = os.cpu_count() or 1
+
+if jobTokens is not None and jobTokens < 0:
+    argParser.error("--job-tokens value cannot be negative")
+if memoryPerJob is not None and memoryPerJob < 1:
+    argParser.error("--memory-per-job value must be positive")
+
+if debugMode:
+    loggingLevel = logging.DEBUG
+    # 8 is the length of "CRITICAL" - the longest log level name
+    loggingFormat = "%(asctime)s | %(levelname)-8s | %(message)s"
+
+# in machine-readable formats stdout is only for results
+outputStream: typing.TextIO = sys.stdout if outputFormat == "table" else sys.stderr
+
+logging.basicConfig(
+    format=loggingFormat,
+    level=loggingLevel,
+    stream=outputStream
+)
+
+logging.debug(f"CLI arguments: {cliArgs}")
+logging.debug("-")
+
+if jobTokens is not None or memoryPerJob is not None:
+    jobTokens = getJobTokensBudget(jobTokens, memoryPerJob)
+    logging.debug(f"Jobs budget: {jobTokens}")
+
+# --- do some checks first
+
+if not repositoryPath.is_dir():
+    logging.error(f"Registry path [{repositoryPath.resolve()}] doesn't exist")
+    raise SystemExit(2)
+
+recipesPath: pathlib.Path = repositoryPath / "recipes"
+if not recipesPath.is_dir():
+    logging.error(
+        " ".join((
+            "There is no [recipes] folder inside the registry,",
+            "you might have provided a wrong path to the registry"
+        ))
+    )
+    raise SystemExit(3)
+
+if cliArgs.recipes_from is not None:
+    with cliArgs.recipes_from as f:
+        recipesToBuild = (recipesToBuild or []) + [
+            line.strip() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    # an empty plan means that there is nothing to build,
+    # and not that everything should be built
+    if not recipesToBuild:
+        logging.info("There are no recipes to build")
+        raise SystemExit(0)
+
+registryBuilder: RegistryBuilder = RegistryBuilder(
+    repositoryPath,
+    jobsCnt,
+    logsFolder,
+    conanCommand,
+    conanArgs,
+    buildStateFile,
+    jobTokens
+)
+
+if recipesToBuild is not None:
+    unknownRecipes = sorted(set(recipesToBuild) - set(registryBuilder.getRecipes()))
+    if unknownRecipes:
+        logging.error(
+            f"There are no such recipes in the registry: {', '.join(unknownRecipes)}"
+        )
+        raise SystemExit(4)
+    recipesToBuild = sorted(set(recipesToBuild))
+
+try:
+    buildLevels = registryBuilder.getBuildLevels(recipesToBuild)
+except ValueError as ex:
+    logging.error(ex)
+    raise SystemExit(4)
+
+# ---
+
+if dryRun:
+    if outputFormat == "table":
+        for i, level in enumerate(buildLevels):
+            print(f"{i + 1}: {' '.join(level)}")
+    else:
+        print(json.dumps(buildLevels, indent=None if outputFormat == "ndjson" else 4))
+    raise SystemExit(0)
+
+ansiReset: str = "\033[0m"
+ansiBright: str = "\033[1m"
+ansiDim: str = "\033[2m"
+ansiRed: str = "\033[31m"
+ansiGreen: str = "\033[32m"
+ansiYellow: str = "\033[33m"
+
+statusColors: typing.Dict[str, str] = {
+    "built": ansiGreen,
+    "failed": ansiRed,
+    "skipped": ansiYellow
+}
+
+outputLock: threading.Lock = threading.Lock()
+
+
+# lines of parallel builds are interleaved, so each is prefixed with its recipe
+def printBuildOutput(p: str, line: str) -> None:
+    with outputLock:
+        print(f"{ansiDim}[{p}]{ansiReset} {line}", file=outputStream, flush=True)
+
+
+def getBuildResultCells(r: BuildResult) -> typing.Tuple[str, str, str, str]:
+    return (
+        f"{ansiDim}{r.name}{ansiReset}",
+        "".join((
+            statusColors[r.status],
+            ansiBright,
+            r.status,
+            ansiReset,
+            f" (because of {r.failedDependency})" if r.failedDependency else ""
+        )),
+        f"{r.duration:.1f} s" if r.status != "skipped" else "",
+        f"{ansiDim}{r.logFile}{ansiReset}" if r.logFile is not None else ""
+    )
+
+
+buildResults: typing.List[BuildResult] = []
+try:
+    for r in registryBuilder.buildRecipes(
+        recipesToBuild,
+        None if quietMode else printBuildOutput
+    ):
+        buildResults.append(r)
+        if outputFormat == "ndjson":
+            print(json.dumps(r.toDict()), flush=True)
+        elif r.status == "failed":
+            logging.error(f"Recipe [{r.name}] has failed to build, see {r.logFile}")
+        elif r.status == "skipped":
+            logging.warning(
+                f"Recipe [{r.name}] is skipped, because [{r.failedDependency}] has failed"
+                if r.failedDependency
+                else f"Recipe [{r.name}] is skipped"
+            )
+        else:
+            logging.info(f"Recipe [{r.name}] is built in {r.duration:.1f} s")
+except KeyboardInterrupt:
+    registryBuilder.cancel()
+    logging.error("Interrupted, running builds are terminated")
+    raise SystemExit(1)
+
+buildResults.sort(key=lambda r: r.name)
+if outputFormat == "json":
+    print(json.dumps([r.toDict() for r in buildResults], indent=4))
+elif outputFormat == "table":
+    print(
+        renderTable(
+            (
+                "",
+                f"{ansiDim}status{ansiReset}",
+                f"{ansiDim}time{ansiReset}",
+                f"{ansiDim}log{ansiReset}"
+            ),
+            (getBuildResultCells(r) for r in buildResults)
+        )
+    )
+
+if any(r.status != "built" for r in buildResults):
+    raise SystemExit(1)
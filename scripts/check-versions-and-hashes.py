@@ -1,18 +1,37 @@
+import time
+# for `--profile`, so the imports could be measured too
+scriptStartTime: float = time.perf_counter()
+scriptStartCPUTime: float = time.process_time()
+
 import logging
 from datetime import datetime
 import pathlib
 import argparse
 import sys
-import subprocess
 import json
-import re
-import pandas
-from pandera import pandas as pandera
-from tabulate import tabulate
-from colorama import Fore, Style
+import os
+import atexit
+# pandas, pandera and tabulate are heavy to import, so they are imported
+# only when they are actually needed (with `--validate-schema`),
+# and colorama is not needed at all, since it is just ANSI sequences;
+# the target is to keep `--help` within 50 ms of a bare `python -c pass`
 
 import typing
 
+# all the actual work is done there, this is only the command line interface
+import registry_checker
+from registry_checker import (
+    HistoryAuditResult,
+    Profiler,
+    RecipeResult,
+    RegistryChecker,
+    VersionsFixer,
+    renderTable
+)
+
+importsEndTime: float = time.perf_counter()
+importsEndCPUTime: float = time.process_time()
+
 loggingLevel: int = logging.INFO
 loggingFormat: str = "[%(levelname)s] %(message)s"
 
@@ -37,6 +56,125 @@ argParser.add_argument(
     metavar="/path/to/conan-recipes/",
     help="path to the repository with Conan recipes"
 )
+argParser.add_argument(
+    "--worktree",
+    action='store_true',
+    help=" ".join((
+        "calculate actual hashes from the files in the working tree",
+        "instead of taking them from HEAD (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--staged",
+    action='store_true',
+    help=" ".join((
+        "verify only the recipes with staged changes, taking actual hashes,",
+        "conanfiles and versions files from the index instead of HEAD,",
+        "as a pre-commit hook would need (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--watch",
+    action='store_true',
+    help=" ".join((
+        "stay running and verify the working tree again on every change",
+        "in recipes, versions and common CMake files, but only",
+        "the affected recipes (implies --worktree) (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--socket",
+    type=pathlib.Path,
+    metavar="/path/to/socket",
+    help=" ".join((
+        "in watch mode, serve the latest results at this Unix socket:",
+        "send a line with recipe names (or an empty one for all of them)",
+        "and get back a JSON document",
+        "(default: .cache/check-versions-and-hashes.sock in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--format",
+    choices=["table", "json", "ndjson"],
+    default="table",
+    help=" ".join((
+        "output format: a colored table for humans, or JSON",
+        "without ANSI escapes for machines, where ndjson prints",
+        "every recipe result as soon as it is ready (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--validate-schema",
+    action='store_true',
+    help=" ".join((
+        "validate the resulting table with pandera schema,",
+        "requires pandas and pandera (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--audit-history",
+    action='store_true',
+    help=" ".join((
+        "instead of verifying current versions, verify that every",
+        "version/git-tree pair in versions files exists",
+        "in the history of HEAD (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--fix",
+    action='store_true',
+    help=" ".join((
+        "write actual hashes into versions files for the recipes",
+        "that have wrong or missing entries, and update the baseline",
+        "for them (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--since",
+    metavar="REV",
+    help=" ".join((
+        "verify only the recipes that were changed",
+        "between this revision and HEAD"
+    ))
+)
+argParser.add_argument(
+    "--no-cache",
+    action='store_true',
+    help=" ".join((
+        "do not use (and do not update) the cached results",
+        "of previous runs (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help=" ".join((
+        "verify recipes with this many parallel jobs,",
+        "0 means the number of CPU cores (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--profile",
+    type=int,
+    nargs="?",
+    const=10,
+    metavar="N",
+    help=" ".join((
+        "measure time spent in every phase and on every recipe,",
+        "and print N slowest recipes (default N: %(const)s)"
+    ))
+)
+argParser.add_argument(
+    "--profile-trace",
+    type=pathlib.Path,
+    metavar="/path/to/trace.json",
+    help=" ".join((
+        "also save the profiling results in Chrome trace format,",
+        "for chrome://tracing, Perfetto or speedscope (implies --profile)"
+    ))
+)
 argParser.add_argument(
     "--debug",
     action='store_true',
@@ -45,70 +183,98 @@ argParser.add_argument(
 cliArgs = argParser.parse_args()
 
 repositoryPath: pathlib.Path = cliArgs.repositoryPath
+worktreeMode: bool = cliArgs.worktree
+stagedMode: bool = cliArgs.staged
+watchMode: bool = cliArgs.watch
+socketPath: typing.Optional[pathlib.Path] = cliArgs.socket
+outputFormat: str = cliArgs.format
+validateSchema: bool = cliArgs.validate_schema
+useCache: bool = not cliArgs.no_cache
+sinceRevision: typing.Optional[str] = cliArgs.since
+auditHistory: bool = cliArgs.audit_history
+fixMode: bool = cliArgs.fix
+jobsCnt: int = cliArgs.jobs
+profileTopCnt: typing.Optional[int] = cliArgs.profile
+profileTraceFile: typing.Optional[pathlib.Path] = cliArgs.profile_trace
+if profileTraceFile is not None and profileTopCnt is None:
+    profileTopCnt = 10
 debugMode: bool = cliArgs.debug
 
+if stagedMode and (
+    worktreeMode or auditHistory or fixMode or sinceRevision is not None
+):
+    argParser.error(
+        " ".join((
+            "--staged cannot be combined with",
+            "--worktree, --audit-history, --fix or --since"
+        ))
+    )
+if watchMode:
+    if stagedMode or auditHistory or fixMode or sinceRevision is not None:
+        argParser.error(
+            " ".join((
+                "--watch cannot be combined with",
+                "--staged, --audit-history, --fix or --since"
+            ))
+        )
+    worktreeMode = True
+    if socketPath is None:
+        socketPath = (
+            repositoryPath / ".cache" / "check-versions-and-hashes.sock"
+        )
+elif socketPath is not None:
+    argParser.error("--socket only makes sense with --watch")
+if jobsCnt < 0:
+    argParser.error("--jobs value cannot be negative")
+elif jobsCnt == 0:
+    jobsCnt = os.cpu_count() or 1
+
 if debugMode:
     loggingLevel = logging.DEBUG
     # 8 is the length of "CRITICAL" - the longest log level name
     loggingFormat = "%(asctime)s | %(levelname)-8s | %(message)s"
 
+# in machine-readable formats stdout is only for results
+outputStream: typing.TextIO = sys.stdout if outputFormat == "table" else sys.stderr
+
 logging.basicConfig(
     format=loggingFormat,
     level=loggingLevel,
-    stream=sys.stdout
+    stream=outputStream
 )
 
 logging.debug(f"CLI arguments: {cliArgs}")
 logging.debug("-")
 
-versionRegEx = re.compile(r"version = \"(\d+\.\d+\.\d+)\"")
-recipeVersionRegEx = re.compile(r"recipe_version = (\d+)")
+profiler: Profiler = Profiler(
+    profileTopCnt is not None,
+    scriptStartTime,
+    scriptStartCPUTime
+)
+# the module functions report to this profiler too
+registry_checker.profiler = profiler
+profiler.addEvent(
+    "imports",
+    "phase",
+    scriptStartTime,
+    importsEndTime - scriptStartTime,
+    importsEndCPUTime - scriptStartCPUTime
+)
+
 
-def getRevParseHash(
-    pathToRepository: pathlib.Path,
-    commitHash: str,
-    pathInRepository: str
-) -> str:
-    logging.debug(
-        f"- getting rev-parse hash value of [{pathInRepository}]"
-    )
-    cmdResult = subprocess.run(
-        [
-            "git",
-            "-C",
-            pathToRepository.as_posix(),
-            "rev-parse",
-            f"{commitHash}:{pathInRepository}"
-        ],
-        # check=True,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT
-    )
-    if cmdResult.returncode != 0:
-        logging.error(
-            "".join((
-                f"The command was: {' '.join(cmdResult.args)}\n",
-                f"Output: {cmdResult.stdout.strip()}"
-            ))
-        )
-        raise OSError(
-            "Failed to get rev-parse hash"
-        )
-    else:
-        revParsedHash = cmdResult.stdout.strip()
-        if len(revParsedHash) != 40:
-            raise ValueError(
-                " ".join((
-                    "The rev-parsed value doesn't look like",
-                    f"a valid Git hash: [{revParsedHash}]",
-                    "(must be a string of 40 symbols length",
-                    "without newlines)"
-                ))
-            )
-        else:
-            logging.debug(f"- {revParsedHash}")
-            return revParsedHash
+def reportProfiling() -> None:
+    assert profileTopCnt is not None
+    profiler.printReport(profileTopCnt, outputStream)
+    if profileTraceFile is not None:
+        try:
+            profiler.saveTrace(profileTraceFile)
+        except OSError as ex:
+            logging.error(f"Could not save the profiling trace: {ex}")
+
+
+# the report is printed on exit, whichever the exit code is
+if profiler.isEnabled:
+    atexit.register(reportProfiling)
 
 
 # --- do some checks first
@@ -138,189 +304,322 @@ if not (repositoryPath / "versions" / "baseline.json").is_file():
 
 # ---
 
+ansiReset: str = "\033[0m"
+ansiBright: str = "\033[1m"
+ansiDim: str = "\033[2m"
+ansiRed: str = "\033[31m"
+ansiGreen: str = "\033[32m"
+
 valueErrorTemplateString = "".join((
-    Fore.RED,
-    Style.BRIGHT,
+    ansiRed,
+    ansiBright,
     "{errorval}",
-    Style.RESET_ALL
+    ansiReset
 ))
 valueSuccessTemplateString = "".join((
-    Fore.GREEN,
-    Style.BRIGHT,
+    ansiGreen,
+    ansiBright,
     "{successval}",
-    Style.RESET_ALL
+    ansiReset
 ))
 
-recipesSchema = pandera.DataFrameSchema(
-    {
-        "version": pandera.Column(str),
-        "stated-hash": pandera.Column(str),
-        "actual-hash": pandera.Column(str)
-    },
-    index=pandera.Index(str, unique=True),
-    strict=True,
-    coerce=False
-)
 
-recipes: pandas.DataFrame = pandas.DataFrame()
-problematicRecipes: typing.Set[str] = set()
+def getRecipeCells(r: RecipeResult) -> typing.Tuple[str, str, str, str]:
+    return (
+        f"{ansiDim}{r.name}{ansiReset}",
+        (
+            f"{ansiDim}{r.version}{ansiReset}"
+            if r.version is not None
+            else valueErrorTemplateString.format(
+                errorval="could not get version"
+            )
+        ),
+        (
+            f"{ansiDim}{r.statedHash}{ansiReset}"
+            if r.statedHash is not None
+            else valueErrorTemplateString.format(
+                errorval="could not get stated hash"
+            )
+        ),
+        (
+            valueErrorTemplateString.format(
+                errorval="could not get actual hash"
+            )
+            if r.actualHash is None
+            else valueSuccessTemplateString.format(
+                successval=r.actualHash
+            )
+            if r.hashIsValid
+            else valueErrorTemplateString.format(
+                errorval=r.actualHash
+            )
+        )
+    )
+
 
-for p in sorted([p.name for p in recipesPath.iterdir() if p.is_dir()]):
-    version: typing.Optional[str] = None
-    statedHash: typing.Optional[str] = None
-    actualHash: typing.Optional[str] = None
-    recipeVersion: int = 0
-
-    logging.debug(f"Processing recipe [{p}]")
-
-    conanfile: pathlib.Path = recipesPath / p / "conanfile.py"
-    if not conanfile.is_file():
-        problematicRecipes.add(p)
-        logging.error(f"Recipe [{p}] has no conanfile")
-    else:
-        conanfileContent: typing.Dict[str, typing.Any] = {}
-        with open(conanfile, "r") as f:
-            conanfileContent = f.read()
-
-            searchResultVersion = versionRegEx.search(conanfileContent)
-            if searchResultVersion: # and len(searchResultVersion.groups()) > 0:
-                version = searchResultVersion.group(1)
-                logging.debug(f"- found version value: {version}")
-            else:
-                problematicRecipes.add(p)
-                logging.error("Could not find a version value")
-
-            searchResultRecipeVersion = recipeVersionRegEx.search(conanfileContent)
-            if searchResultRecipeVersion: # and len(searchResultRecipeVersion.groups()) > 0:
-                recipeVersion = int(searchResultRecipeVersion.group(1))
-                logging.debug(f"- also found recipe version value: {recipeVersion}")
-
-    if version is not None:
-        versionsFile: pathlib.Path = (
-            repositoryPath / "versions" / f"{p[0]}-" / f"{p}.json"
+def getHistoryAuditCells(
+    r: HistoryAuditResult
+) -> typing.Tuple[str, str, str, str]:
+    return (
+        f"{ansiDim}{r.name}{ansiReset}",
+        (
+            f"{ansiDim}{r.version}{ansiReset}"
+            if r.version is not None
+            else valueErrorTemplateString.format(
+                errorval="missing version"
+            )
+        ),
+        (
+            f"{ansiDim}{r.gitTree}{ansiReset}"
+            if r.gitTree is not None
+            else valueErrorTemplateString.format(
+                errorval="missing git-tree"
+            )
+        ),
+        (
+            valueErrorTemplateString.format(errorval=r.error)
+            if r.error is not None
+            else valueSuccessTemplateString.format(
+                successval=r.commit
+            )
         )
-        if not versionsFile.is_file():
-            problematicRecipes.add(p)
-            logging.error(f"Recipe [{p}] has no versions file")
-        else:
-            versionsFileContent: typing.Dict[str, typing.Any] = {}
-            with open(versionsFile, "r") as f:
-                versionsFileContent = json.load(f)
-
-            for v in versionsFileContent["versions"]:
-                versionsFileVersion: str = v.get("version")
-                versionsFilerecipeVersion: typing.Optional[int] = 0
-                foundMatchingVersion: bool = False
-                if versionsFileVersion is None:
-                    logging.warning(
-                        " ".join((
-                            f"Recipe [{p}] is missing one of the version values",
-                            "in its versions file"
-                        ))
-                    )
-                else:
-                    versionsFilerecipeVersion = v.get("recipe-version", 0)
-                if (
-                    version == versionsFileVersion
-                    and
-                    recipeVersion == versionsFilerecipeVersion
-                ):
-                    foundMatchingVersion = True
-
-                    # stated hash is read from the recipe versions file
-                    statedHash = v.get("git-tree", statedHash)
-
-                    # actual hash is calculated with a bare `git rev-parse`
-                    try:
-                        actualHash = getRevParseHash(
-                            repositoryPath,
-                            "HEAD",
-                            f"recipes/{p}"
-                        )
-                        # both stated and actual hash values can be None,
-                        # so comparing them not only will be useless
-                        # but also incorrect, as None == None
-                        if actualHash is None:
-                            problematicRecipes.add(p)
-                        elif (
-                            actualHash != statedHash
-                        ):
-                            problematicRecipes.add(p)
-                            actualHash = valueErrorTemplateString.format(
-                                errorval=actualHash
-                            )
-                    except Exception as ex:
-                        problematicRecipes.add(p)
-                        logging.error(ex)
-
-                    break
-            if not foundMatchingVersion:
-                problematicRecipes.add(p)
-                logging.error(
-                    " ".join((
-                        f"Version [{version}#{recipeVersion}] for the recipe",
-                        f"[{p}] is not present in its versions file"
-                    ))
-                )
+    )
+
 
-    if version is not None and recipeVersion != 0:
-        version = f"{version}#{recipeVersion}"
-    recipe: pandas.DataFrame = pandas.DataFrame(
+historyAuditTableHeaders: typing.Tuple[str, ...] = (
+    "",
+    "version",
+    "git-tree",
+    "commit"
+)
+
+recipesTableHeaders: typing.Tuple[str, ...] = (
+    "",
+    "version",
+    "stated-hash",
+    "actual-hash"
+)
+
+
+def validateRecipesSchema(recipes: typing.List[RecipeResult]) -> None:
+    import pandas
+    from pandera import pandas as pandera
+
+    recipesSchema = pandera.DataFrameSchema(
         {
-            "version": (
-                f"{Style.DIM}{version}{Style.RESET_ALL}"
-                if version is not None
-                else valueErrorTemplateString.format(
-                    errorval="could not get version"
-                )
-            ),
-            "stated-hash": (
-                f"{Style.DIM}{statedHash}{Style.RESET_ALL}"
-                if statedHash is not None
-                else valueErrorTemplateString.format(
-                    errorval="could not get stated hash"
-                )
-            ),
-            "actual-hash": (
-                valueSuccessTemplateString.format(
-                    successval=actualHash
-                )
-                if actualHash is not None
-                else valueErrorTemplateString.format(
-                    errorval="could not get actual hash"
-                )
-            )
+            "version": pandera.Column(str),
+            "stated-hash": pandera.Column(str),
+            "actual-hash": pandera.Column(str)
         },
-        index=[f"{Style.DIM}{p}{Style.RESET_ALL}"]
+        index=pandera.Index(str, unique=True),
+        strict=True,
+        coerce=False
     )
-    recipes = pandas.concat([recipes, recipe])
-
-recipesSchema.validate(recipes)
-
-print(
-    tabulate(
-        recipes,
-        headers=[
-            f"{Style.DIM}{header.replace('-', ' ')}{Style.RESET_ALL}"
-            for header
-            in recipes.columns.values.tolist()
-        ],
-        tablefmt="psql",
-        floatfmt="g"
+    cells = [getRecipeCells(r) for r in recipes]
+    recipesSchema.validate(
+        pandas.DataFrame(
+            [c[1:] for c in cells],
+            columns=list(recipesTableHeaders[1:]),
+            index=[c[0] for c in cells]
+        )
     )
-)
 
-problematicRecipesCnt: int = len(problematicRecipes)
-if problematicRecipesCnt > 0:
-    print(
-        "".join((
-            f"Problematic recipes (total {problematicRecipesCnt}): ",
-            ", ".join(
+
+def printResults(
+    recipes: typing.List[RecipeResult],
+    problematicRecipes: typing.Set[str]
+) -> None:
+    # in ndjson mode results are printed as they come
+    if outputFormat == "json":
+        print(
+            json.dumps(
+                {
+                    "recipes": [r.toDict() for r in recipes],
+                    "problematicRecipes": sorted(problematicRecipes)
+                },
+                indent=4
+            ),
+            flush=True
+        )
+    elif outputFormat == "table":
+        print(
+            renderTable(
                 [
-                    f"{Fore.RED}{p}{Style.RESET_ALL}"
-                    for p in sorted(problematicRecipes)
-                ]
+                    f"{ansiDim}{header.replace('-', ' ')}{ansiReset}" if header else ""
+                    for header in recipesTableHeaders
+                ],
+                (getRecipeCells(r) for r in recipes)
+            )
+        )
+        if problematicRecipes:
+            print(
+                "".join((
+                    f"Problematic recipes (total {len(problematicRecipes)}): ",
+                    ", ".join(
+                        [
+                            f"{ansiRed}{p}{ansiReset}"
+                            for p in sorted(problematicRecipes)
+                        ]
+                    )
+                ))
             )
+        sys.stdout.flush()
+
+
+def printWatchResults(
+    recipes: typing.List[RecipeResult],
+    removedRecipes: typing.List[str]
+) -> None:
+    for p in removedRecipes:
+        if outputFormat == "ndjson":
+            print(json.dumps({"recipe": p, "isRemoved": True}))
+        else:
+            logging.info(f"Recipe [{p}] is no longer there")
+    if outputFormat == "ndjson":
+        for r in recipes:
+            print(json.dumps(r.toDict()))
+        sys.stdout.flush()
+    elif recipes:
+        printResults(
+            recipes,
+            set(r.name for r in recipes if r.isProblematic)
+        )
+
+
+recipes: typing.List[RecipeResult] = []
+problematicRecipes: typing.Set[str] = set()
+
+registryChecker: RegistryChecker = RegistryChecker(
+    repositoryPath,
+    worktreeMode,
+    useCache,
+    stagedMode
+)
+
+if watchMode:
+    # imported only here, as it is not needed for a single check
+    from registry_watcher import RegistryWatcher
+
+    assert socketPath is not None
+    try:
+        registryWatcher = RegistryWatcher(registryChecker, socketPath, jobsCnt)
+    except OSError as ex:
+        logging.error(f"Could not start watching: {ex}")
+        raise SystemExit(7)
+    try:
+        registryWatcher.run(printWatchResults)
+    except KeyboardInterrupt:
+        logging.info("Stopped watching")
+    finally:
+        registryWatcher.close()
+    raise SystemExit(0)
+
+recipesToVerify: typing.List[str] = registryChecker.getRecipes()
+if stagedMode:
+    try:
+        recipesToVerify = registryChecker.getStagedRecipes()
+    except OSError as ex:
+        logging.error(ex)
+        raise SystemExit(5)
+    logging.debug(f"Verifying {len(recipesToVerify)} recipes with staged changes")
+elif sinceRevision is not None:
+    try:
+        recipesToVerify = registryChecker.getChangedRecipes(
+            sinceRevision,
+            recipesToVerify
+        )
+    except OSError as ex:
+        logging.error(ex)
+        raise SystemExit(5)
+    logging.debug(
+        " ".join((
+            f"Verifying {len(recipesToVerify)} recipes",
+            f"affected since [{sinceRevision}]"
         ))
     )
+if auditHistory:
+    try:
+        auditResults = registryChecker.auditHistory(recipesToVerify)
+    except OSError as ex:
+        logging.error(ex)
+        raise SystemExit(5)
+    auditRows: typing.List[HistoryAuditResult] = []
+    for r in auditResults:
+        if r.error is not None:
+            problematicRecipes.add(r.name)
+        if outputFormat == "ndjson":
+            print(json.dumps(r.toDict()), flush=True)
+        else:
+            auditRows.append(r)
+    if outputFormat == "json":
+        print(
+            json.dumps(
+                {
+                    "versions": [r.toDict() for r in auditRows],
+                    "problematicRecipes": sorted(problematicRecipes)
+                },
+                indent=4
+            )
+        )
+    elif outputFormat == "table":
+        print(
+            renderTable(
+                [
+                    f"{ansiDim}{header.replace('-', ' ')}{ansiReset}" if header else ""
+                    for header in historyAuditTableHeaders
+                ],
+                (getHistoryAuditCells(r) for r in auditRows)
+            )
+        )
+    if problematicRecipes and outputFormat == "table":
+        print(
+            "".join((
+                f"Problematic recipes (total {len(problematicRecipes)}): ",
+                ", ".join(
+                    [
+                        f"{ansiRed}{p}{ansiReset}"
+                        for p in sorted(problematicRecipes)
+                    ]
+                )
+            ))
+        )
+    raise SystemExit(1 if problematicRecipes else 0)
+
+
+versionsFixer: typing.Optional[VersionsFixer] = (
+    VersionsFixer(registryChecker) if fixMode else None
+)
+# in ndjson mode results are not collected, unless something needs them all
+collectRecipes: bool = outputFormat != "ndjson" or validateSchema
+
+try:
+    for recipe in registryChecker.verifyRecipes(recipesToVerify, jobsCnt):
+        if versionsFixer is not None and recipe.isProblematic:
+            versionsFixer.fix(recipe)
+        if recipe.isProblematic:
+            problematicRecipes.add(recipe.name)
+        if outputFormat == "ndjson":
+            print(json.dumps(recipe.toDict()), flush=True)
+        if collectRecipes:
+            recipes.append(recipe)
+# in staged mode the index is written as a tree, which fails on conflicts
+except OSError as ex:
+    logging.error(ex)
+    raise SystemExit(5)
+
+if versionsFixer is not None:
+    try:
+        versionsFixer.write()
+    except OSError as ex:
+        logging.error(f"Could not write fixed versions files: {ex}")
+        raise SystemExit(6)
+
+if validateSchema:
+    with profiler.phase("validating schema"):
+        validateRecipesSchema(recipes)
+
+with profiler.phase("rendering"):
+    printResults(recipes, problematicRecipes)
+
+if problematicRecipes:
     raise SystemExit(1)
@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime
+import pathlib
+import argparse
+import sys
+import json
+import shlex
+
+import typing
+
+# all the actual work is done there, this is only the command line interface
+from registry_builder import RegistryBuilder
+
+loggingLevel: int = logging.INFO
+loggingFormat: str = "[%(levelname)s] %(message)s"
+
+argParser = argparse.ArgumentParser(
+    prog="plan-rebuild",
+    description="".join((
+        "-= %(prog)s =-\n",
+        "Prints the recipes that have changed since their last ",
+        "successful build, along with all the recipes that depend on them, ",
+        "in the order they need to be built.\n\n",
+        "The list can be given to build-recipes as is:\n",
+        "$ python ./plan-rebuild.py | python ./build-recipes.py --recipes-from -\n\n",
+        f"Copyright (C) 2026-{datetime.now().year} ",
+        "Declaration of VAR\n",
+        "License: GPLv3"
+    )),
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    allow_abbrev=False
+)
+argParser.add_argument(
+    "repositoryPath",
+    type=pathlib.Path,
+    nargs="?",
+    default=pathlib.Path("."),
+    metavar="/path/to/conan-recipes/",
+    help="path to the repository with Conan recipes"
+)
+argParser.add_argument(
+    "--conan-args",
+    default="",
+    metavar="\"ARGS\"",
+    help=" ".join((
+        "the same additional arguments as for build-recipes,",
+        "as every configuration is built separately"
+    ))
+)
+argParser.add_argument(
+    "--build-state",
+    type=pathlib.Path,
+    metavar="/path/to/build-state.json",
+    help=" ".join((
+        "where the successful builds are recorded",
+        "(default: .cache/build-state.json in the registry)"
+    ))
+)
+argParser.add_argument(
+    "--format",
+    choices=["list", "json"],
+    default="list",
+    help=" ".join((
+        "output format: recipe names one per line,",
+        "or JSON with the reason for every recipe (default: %(default)s)"
+    ))
+)
+argParser.add_argument(
+    "--debug",
+    action='store_true',
+    help="enable debug/dev mode (default: %(default)s)"
+)
+cliArgs = argParser.parse_args()
+
+repositoryPath: pathlib.Path = cliArgs.repositoryPath
+conanArgs: typing.List[str] = shlex.split(cliArgs.conan_args)
+buildStateFile: typing.Optional[pathlib.Path] = cliArgs.build_state
+outputFormat: str = cliArgs.format
+debugMode: bool = cliArgs.debug
+
+if debugMode:
+    loggingLevel = logging.DEBUG
+    # 8 is the length of "CRITICAL" - the longest log level name
+    loggingFormat = "%(asctime)s | %(levelname)-8s | %(message)s"
+
+# stdout is only for the results, so they could be piped
+logging.basicConfig(
+    format=loggingFormat,
+    level=loggingLevel,
+    stream=sys.stderr
+)
+
+logging.debug(f"CLI arguments: {cliArgs}")
+logging.debug("-")
+
+# --- do some checks first
+
+if not repositoryPath.is_dir():
+    logging.error(f"Registry path [{repositoryPath.resolve()}] doesn't exist")
+    raise SystemExit(2)
+
+if not (repositoryPath / "recipes").is_dir():
+    logging.error(
+        " ".join((
+            "There is no [recipes] folder inside the registry,",
+            "you might have provided a wrong path to the registry"
+        ))
+    )
+    raise SystemExit(3)
+
+# ---
+
+registryBuilder: RegistryBuilder = RegistryBuilder(
+    repositoryPath,
+    conanArgs=conanArgs,
+    buildStateFile=buildStateFile
+)
+try:
+    rebuildPlan = registryBuilder.planRebuild()
+except ValueError as ex:
+    logging.error(ex)
+    raise SystemExit(4)
+
+if outputFormat == "json":
+    print(json.dumps([r.toDict() for r in rebuildPlan], indent=4))
+else:
+    for r in rebuildPlan:
+        print(r.name)
+
+logging.info(
+    " ".join((
+        f"{len(rebuildPlan)} of {len(registryBuilder.getRecipes())}",
+        "recipes need to be rebuilt"
+    ))
+)
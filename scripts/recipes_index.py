@@ -0,0 +1,406 @@
+import logging
+from datetime import datetime
+import pathlib
+import argparse
+import sys
+import json
+import os
+import ast
+import hashlib
+import time
+
+import typing
+
+# bump it whenever the index structure or the parsing logic changes
+recipesIndexFormat: int = 3
+
+# conanfiles that were modified less than this many nanoseconds before
+# indexing might still be changed within the same mtime tick (and size),
+# so their stat values are not stored, and they are hashed again next time
+# (the same as `worktreeCacheRacyInterval` in `registry_checker`)
+recipesIndexRacyInterval: int = 2 * 1000 * 1000 * 1000
+
+
+class RecipeMetadata:
+    __slots__ = (
+        "name",
+        "version",
+        "recipeVersion",
+        "packageType",
+        "pythonRequires",
+        "requires",
+        "options",
+        "defaultOptions",
+        "gitCheckout",
+        "commonCMakeExports",
+        "error"
+    )
+
+    def __init__(self):
+        self.name: typing.Optional[str] = None
+        self.version: typing.Optional[str] = None
+        self.recipeVersion: int = 0
+        self.packageType: typing.Optional[str] = None
+        self.pythonRequires: typing.List[str] = []
+        # all the `self.requires()` targets, as they are written
+        self.requires: typing.List[str] = []
+        self.options: typing.Dict[str, typing.Any] = {}
+        self.defaultOptions: typing.Dict[str, typing.Any] = {}
+        # the commit that `source()` checks out, if it is a literal
+        self.gitCheckout: typing.Optional[str] = None
+        # patterns of files that `export_sources()` copies from `common/cmake`
+        self.commonCMakeExports: typing.List[str] = []
+        # set if the conanfile could not be parsed
+        self.error: typing.Optional[str] = None
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    @classmethod
+    def fromDict(cls, d: typing.Dict[str, typing.Any]) -> "RecipeMetadata":
+        metadata = cls()
+        for s in cls.__slots__:
+            if s in d:
+                setattr(metadata, s, d[s])
+        return metadata
+
+    def getRequiredNames(self) -> typing.List[str]:
+        # `zlib/1.3.1@decovar/public` -> `zlib`
+        return [r.split("/", 1)[0] for r in self.requires]
+
+    def getPythonRequiredNames(self) -> typing.List[str]:
+        return [r.split("/", 1)[0] for r in self.pythonRequires]
+
+
+def getLiteral(node: ast.AST) -> typing.Any:
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+# in the order they are written, as `ast.walk()` goes breadth-first
+def getStringConstants(node: ast.AST) -> typing.List[str]:
+    return [
+        n.value
+        for n in sorted(
+            (
+                n
+                for n in ast.walk(node)
+                if isinstance(n, ast.Constant) and isinstance(n.value, str)
+            ),
+            key=lambda n: (n.lineno, n.col_offset)
+        )
+    ]
+
+
+def isSubsequence(
+    part: typing.Sequence[str],
+    whole: typing.Sequence[str]
+) -> bool:
+    for i in range(len(whole) - len(part) + 1):
+        if list(whole[i:i + len(part)]) == list(part):
+            return True
+    return False
+
+
+def getCallName(call: ast.Call) -> typing.Optional[str]:
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    elif isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return None
+
+
+def isSelfCall(call: ast.Call, methodName: str) -> bool:
+    return (
+        isinstance(call.func, ast.Attribute)
+        and
+        call.func.attr == methodName
+        and
+        isinstance(call.func.value, ast.Name)
+        and
+        call.func.value.id == "self"
+    )
+
+
+def getStringArgument(
+    call: ast.Call,
+    position: int,
+    keyword: str
+) -> typing.Optional[str]:
+    value: typing.Any = None
+    if len(call.args) > position:
+        value = getLiteral(call.args[position])
+    else:
+        for k in call.keywords:
+            if k.arg == keyword:
+                value = getLiteral(k.value)
+                break
+    return value if isinstance(value, str) else None
+
+
+def getRecipeClass(tree: ast.Module) -> typing.Optional[ast.ClassDef]:
+    classes = [n for n in tree.body if isinstance(n, ast.ClassDef)]
+    for c in classes:
+        for b in c.bases:
+            if (
+                (isinstance(b, ast.Name) and b.id == "ConanFile")
+                or
+                (isinstance(b, ast.Attribute) and b.attr == "ConanFile")
+            ):
+                return c
+    return classes[0] if classes else None
+
+
+# extracts recipe metadata without executing the conanfile
+def parseConanfile(conanfileContent: str) -> RecipeMetadata:
+    metadata = RecipeMetadata()
+    try:
+        tree = ast.parse(conanfileContent)
+    except SyntaxError as ex:
+        metadata.error = f"Could not parse the conanfile: {ex}"
+        return metadata
+
+    recipeClass = getRecipeClass(tree)
+    if recipeClass is None:
+        metadata.error = "There is no recipe class in the conanfile"
+        return metadata
+
+    methods: typing.Dict[str, ast.FunctionDef] = {}
+    for node in recipeClass.body:
+        if isinstance(node, ast.FunctionDef):
+            methods[node.name] = node
+            continue
+        elif isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets = [node.target]
+        else:
+            continue
+        value = getLiteral(node.value)
+        for t in targets:
+            if not isinstance(t, ast.Name):
+                continue
+            if t.id == "name" and isinstance(value, str):
+                metadata.name = value
+            elif t.id == "version" and isinstance(value, str):
+                metadata.version = value
+            elif t.id == "recipe_version" and isinstance(value, int):
+                metadata.recipeVersion = value
+            elif t.id == "package_type" and isinstance(value, str):
+                metadata.packageType = value
+            elif t.id == "python_requires":
+                if isinstance(value, str):
+                    metadata.pythonRequires = [
+                        r.strip() for r in value.split(",") if r.strip()
+                    ]
+                elif isinstance(value, (list, tuple)):
+                    metadata.pythonRequires = [str(r) for r in value]
+            elif t.id == "requires":
+                if isinstance(value, str):
+                    metadata.requires.append(value)
+                elif isinstance(value, (list, tuple)):
+                    metadata.requires.extend(str(r) for r in value)
+            elif t.id == "options" and isinstance(value, dict):
+                metadata.options = {
+                    str(k): v if isinstance(v, list) else list(v)
+                    for k, v in value.items()
+                    if isinstance(v, (list, tuple))
+                }
+            elif t.id == "default_options" and isinstance(value, dict):
+                metadata.defaultOptions = {str(k): v for k, v in value.items()}
+
+    if "requirements" in methods:
+        for n in ast.walk(methods["requirements"]):
+            if isinstance(n, ast.Call) and isSelfCall(n, "requires"):
+                r = getStringArgument(n, 0, "ref")
+                if r is not None:
+                    metadata.requires.append(r)
+
+    if "source" in methods:
+        for n in ast.walk(methods["source"]):
+            if not isinstance(n, ast.Call):
+                continue
+            callName = getCallName(n)
+            if callName == "checkout":
+                metadata.gitCheckout = getStringArgument(n, 0, "commit")
+            # the fetching helpers from `recipe-helpers`
+            elif callName in ("fetchGitCommit", "fetchSources"):
+                metadata.gitCheckout = getStringArgument(n, 2, "commit")
+
+    if "export_sources" in methods:
+        for n in ast.walk(methods["export_sources"]):
+            if not (isinstance(n, ast.Call) and getCallName(n) == "copy"):
+                continue
+            pattern = getStringArgument(n, 1, "pattern")
+            src = (
+                n.args[2]
+                if len(n.args) > 2
+                else next((k.value for k in n.keywords if k.arg == "src"), None)
+            )
+            if (
+                pattern is not None
+                and
+                src is not None
+                and
+                isSubsequence(["common", "cmake"], getStringConstants(src))
+            ):
+                metadata.commonCMakeExports.append(pattern)
+
+    return metadata
+
+
+# the index maps a recipe name to its metadata along with the conanfile
+# stat values and blob hash it was made from: if the stat values are the same,
+# the conanfile is not even read, and if only the stat values have changed
+# but not the content, then it is not parsed again; recently modified
+# conanfiles are always read, see `recipesIndexRacyInterval`
+def loadRecipesIndex(
+    repositoryPath: pathlib.Path,
+    indexFile: typing.Optional[pathlib.Path] = None,
+    recipes: typing.Optional[typing.Iterable[str]] = None
+) -> typing.Dict[str, RecipeMetadata]:
+    recipesPath: pathlib.Path = repositoryPath / "recipes"
+    indexEntries: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    if indexFile is not None and indexFile.is_file():
+        try:
+            with open(indexFile, "r") as f:
+                indexContent = json.load(f)
+            if indexContent.get("format") == recipesIndexFormat:
+                indexEntries = indexContent.get("recipes", {})
+        except (OSError, ValueError) as ex:
+            logging.warning(f"Could not load the recipes index: {ex}")
+    indexIsDirty: bool = False
+
+    if recipes is None:
+        recipes = [p.name for p in recipesPath.iterdir() if p.is_dir()]
+        # drop the recipes that are no longer there
+        for p in set(indexEntries) - set(recipes):
+            del indexEntries[p]
+            indexIsDirty = True
+
+    parsedCnt: int = 0
+    recipesIndex: typing.Dict[str, RecipeMetadata] = {}
+    for p in recipes:
+        conanfile: pathlib.Path = recipesPath / p / "conanfile.py"
+        try:
+            conanfileStat = conanfile.stat()
+        except OSError:
+            if indexEntries.pop(p, None) is not None:
+                indexIsDirty = True
+            continue
+        statKey = [conanfileStat.st_mtime_ns, conanfileStat.st_size]
+
+        indexEntry = indexEntries.get(p)
+        if indexEntry is None or indexEntry["stat"] != statKey:
+            conanfileContent = conanfile.read_bytes()
+            conanfileHash = hashlib.sha1(conanfileContent).hexdigest()
+            if indexEntry is None or indexEntry["hash"] != conanfileHash:
+                logging.debug(f"Parsing the conanfile of [{p}]")
+                parsedCnt += 1
+                indexEntry = {
+                    "hash": conanfileHash,
+                    "metadata": parseConanfile(
+                        conanfileContent.decode("utf-8", errors="replace")
+                    ).toDict()
+                }
+            indexEntry["stat"] = (
+                statKey
+                if time.time_ns() - conanfileStat.st_mtime_ns > recipesIndexRacyInterval
+                else None
+            )
+            indexEntries[p] = indexEntry
+            indexIsDirty = True
+
+        recipesIndex[p] = RecipeMetadata.fromDict(indexEntry["metadata"])
+
+    logging.debug(
+        " ".join((
+            f"Recipes index has {len(recipesIndex)} recipes,",
+            f"{parsedCnt} of them had to be parsed"
+        ))
+    )
+
+    if indexFile is not None and indexIsDirty:
+        try:
+            indexFile.parent.mkdir(parents=True, exist_ok=True)
+            indexFileTmp = indexFile.with_name(f"{indexFile.name}.tmp")
+            with open(indexFileTmp, "w") as f:
+                json.dump(
+                    {
+                        "format": recipesIndexFormat,
+                        "recipes": indexEntries
+                    },
+                    f,
+                    separators=(",", ":")
+                )
+            os.replace(indexFileTmp, indexFile)
+        except OSError as ex:
+            logging.warning(f"Could not save the recipes index: {ex}")
+
+    return recipesIndex
+
+
+def getDefaultIndexFile(repositoryPath: pathlib.Path) -> pathlib.Path:
+    return repositoryPath / ".cache" / "recipes-index.json"
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        prog="recipes-index",
+        description="".join((
+            "-= %(prog)s =-\n",
+            "Builds (or updates) the index of recipes metadata ",
+            "and prints it.\n\n",
+            f"Copyright (C) 2026-{datetime.now().year} ",
+            "Declaration of VAR\n",
+            "License: GPLv3"
+        )),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        allow_abbrev=False
+    )
+    argParser.add_argument(
+        "repositoryPath",
+        type=pathlib.Path,
+        nargs="?",
+        default=pathlib.Path("."),
+        metavar="/path/to/conan-recipes/",
+        help="path to the repository with Conan recipes"
+    )
+    argParser.add_argument(
+        "--debug",
+        action='store_true',
+        help="enable debug/dev mode (default: %(default)s)"
+    )
+    cliArgs = argParser.parse_args()
+
+    logging.basicConfig(
+        format=(
+            "%(asctime)s | %(levelname)-8s | %(message)s"
+            if cliArgs.debug
+            else "[%(levelname)s] %(message)s"
+        ),
+        level=logging.DEBUG if cliArgs.debug else logging.INFO,
+        stream=sys.stderr
+    )
+
+    if not (cliArgs.repositoryPath / "recipes").is_dir():
+        logging.error(
+            " ".join((
+                "There is no [recipes] folder inside the registry,",
+                "you might have provided a wrong path to the registry"
+            ))
+        )
+        raise SystemExit(3)
+
+    recipesIndex = loadRecipesIndex(
+        cliArgs.repositoryPath,
+        getDefaultIndexFile(cliArgs.repositoryPath)
+    )
+    print(
+        json.dumps(
+            {p: recipesIndex[p].toDict() for p in sorted(recipesIndex)},
+            indent=4
+        )
+    )
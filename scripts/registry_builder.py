@@ -0,0 +1,627 @@
+import time
+import logging
+import pathlib
+import subprocess
+import threading
+import concurrent.futures
+import os
+import signal
+import json
+import fnmatch
+import contextlib
+
+import typing
+
+from recipes_index import (
+    RecipeMetadata,
+    getDefaultIndexFile,
+    loadRecipesIndex
+)
+from registry_checker import WorktreeHasher
+
+# building recipes of the registry with `conan create` in the order
+# of their dependencies, running independent ones in parallel:
+#
+#     registryBuilder = registry_builder.RegistryBuilder(
+#         pathlib.Path("/path/to/registry"),
+#         jobsCnt=4
+#     )
+#     for r in registryBuilder.buildRecipes():
+#         print(r.name, r.status)
+#
+# a recipe that failed to build only causes its dependents to be skipped,
+# everything else is still built; successful builds are recorded in the build
+# state, so next time only the recipes that have changed since then
+# (and their dependents) could be rebuilt, see `planRebuild()`
+
+# bump it whenever the fingerprints or the state structure change
+buildStateFormat: int = 1
+
+# what the builds are scheduled by: recipe names, or something
+# more specific, such as a recipe and a configuration
+TaskKey = typing.TypeVar("TaskKey", bound=typing.Hashable)
+
+
+class BuildResult:
+    __slots__ = (
+        "name",
+        "status",
+        "returnCode",
+        "duration",
+        "logFile",
+        "failedDependency"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        status: str,
+        returnCode: typing.Optional[int] = None,
+        duration: float = 0.0,
+        logFile: typing.Optional[pathlib.Path] = None,
+        failedDependency: typing.Optional[str] = None
+    ):
+        self.name: str = name
+        # built, failed or skipped
+        self.status: str = status
+        self.returnCode: typing.Optional[int] = returnCode
+        self.duration: float = duration
+        self.logFile: typing.Optional[pathlib.Path] = logFile
+        # for skipped recipes, which dependency has failed
+        self.failedDependency: typing.Optional[str] = failedDependency
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "recipe": self.name,
+            "status": self.status,
+            "returnCode": self.returnCode,
+            "duration": round(self.duration, 3),
+            "logFile": str(self.logFile) if self.logFile is not None else None,
+            "failedDependency": self.failedDependency
+        }
+
+
+# maps every recipe to the recipes of this registry it depends on,
+# either via `requires()` or via `python_requires`; dependencies
+# from elsewhere (such as ConanCenter) are not part of the graph
+def getDependencyGraph(
+    recipesIndex: typing.Dict[str, RecipeMetadata]
+) -> typing.Dict[str, typing.List[str]]:
+    # recipe folder names do not have to match package names
+    recipeFolders: typing.Dict[str, str] = {
+        (m.name or p): p for p, m in recipesIndex.items()
+    }
+    dependencyGraph: typing.Dict[str, typing.List[str]] = {}
+    for p, m in recipesIndex.items():
+        dependencyGraph[p] = sorted(set(
+            recipeFolders[d]
+            for d in m.getRequiredNames() + m.getPythonRequiredNames()
+            if d in recipeFolders and recipeFolders[d] != p
+        ))
+    return dependencyGraph
+
+
+def getReverseDependencyGraph(
+    dependencyGraph: typing.Dict[str, typing.List[str]]
+) -> typing.Dict[str, typing.List[str]]:
+    reverseGraph: typing.Dict[str, typing.List[str]] = {
+        p: [] for p in dependencyGraph
+    }
+    for p, dependencies in dependencyGraph.items():
+        for d in dependencies:
+            reverseGraph.setdefault(d, []).append(p)
+    return {p: sorted(dependents) for p, dependents in reverseGraph.items()}
+
+
+# groups recipes into levels, where every recipe depends only on recipes
+# from the previous levels, so recipes of one level can be built in parallel;
+# raises ValueError if there is a dependency cycle
+def getBuildLevels(
+    dependencyGraph: typing.Dict[str, typing.List[str]],
+    recipes: typing.Optional[typing.Iterable[str]] = None
+) -> typing.List[typing.List[str]]:
+    remaining: typing.Set[str] = set(
+        recipes if recipes is not None else dependencyGraph
+    )
+    levels: typing.List[typing.List[str]] = []
+    while remaining:
+        level = sorted(
+            p for p in remaining
+            if not any(d in remaining for d in dependencyGraph.get(p, []))
+        )
+        if not level:
+            raise ValueError(
+                f"There is a dependency cycle between recipes: {', '.join(map(str, sorted(remaining)))}"
+            )
+        levels.append(level)
+        remaining.difference_update(level)
+    return levels
+
+
+# what recipes need to be rebuilt and why
+class RebuildReason:
+    __slots__ = (
+        "name",
+        "reason",
+        "dependency"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        reason: str,
+        dependency: typing.Optional[str] = None
+    ):
+        self.name: str = name
+        # changed, new (never built), or dependency (one of them is rebuilt)
+        self.reason: str = reason
+        self.dependency: typing.Optional[str] = dependency
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "recipe": self.name,
+            "reason": self.reason,
+            "dependency": self.dependency
+        }
+
+
+# in megabytes, or `None` if it cannot be found out (such as on Windows)
+def getPhysicalMemory() -> typing.Optional[int]:
+    try:
+        return (
+            os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        ) // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# how many jobs (compilers, linkers) all the parallel builds may run
+# together: the given number, or the number of CPU cores, but no more
+# than fits into the memory, if it is known how much one job takes
+def getJobTokensBudget(
+    jobTokens: typing.Optional[int],
+    memoryPerJob: typing.Optional[int] = None
+) -> int:
+    budget = jobTokens or os.cpu_count() or 1
+    if memoryPerJob:
+        physicalMemory = getPhysicalMemory()
+        if physicalMemory is None:
+            logging.warning(
+                "Could not get the amount of memory, the jobs budget is not limited by it"
+            )
+        else:
+            budget = min(budget, physicalMemory // memoryPerJob)
+    return max(1, budget)
+
+
+def getDefaultBuildStateFile(repositoryPath: pathlib.Path) -> pathlib.Path:
+    return repositoryPath / ".cache" / "build-state.json"
+
+
+# the state maps a configuration (the additional Conan arguments)
+# to the fingerprints of the recipes that were successfully built with it
+def loadBuildState(
+    buildStateFile: pathlib.Path
+) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    if not buildStateFile.is_file():
+        return {}
+    try:
+        with open(buildStateFile, "r") as f:
+            buildState = json.load(f)
+    except (OSError, ValueError) as ex:
+        logging.warning(f"Could not load the build state: {ex}")
+        return {}
+    if buildState.get("format") != buildStateFormat:
+        return {}
+    return buildState.get("configurations", {})
+
+
+def saveBuildState(
+    buildStateFile: pathlib.Path,
+    configurations: typing.Dict[str, typing.Dict[str, typing.Any]]
+) -> None:
+    buildStateFile.parent.mkdir(parents=True, exist_ok=True)
+    buildStateFileTmp = buildStateFile.with_name(f"{buildStateFile.name}.tmp")
+    with open(buildStateFileTmp, "w") as f:
+        json.dump(
+            {
+                "format": buildStateFormat,
+                "configurations": configurations
+            },
+            f,
+            indent=4,
+            sort_keys=True
+        )
+    os.replace(buildStateFileTmp, buildStateFile)
+
+
+class RegistryBuilder:
+    def __init__(
+        self,
+        repositoryPath: pathlib.Path,
+        jobsCnt: int = 1,
+        logsFolder: typing.Optional[pathlib.Path] = None,
+        conanCommand: str = "conan",
+        conanArgs: typing.Optional[typing.List[str]] = None,
+        buildStateFile: typing.Optional[pathlib.Path] = None,
+        jobTokens: typing.Optional[int] = None
+    ):
+        self.repositoryPath: pathlib.Path = repositoryPath
+        self.jobsCnt: int = max(1, jobsCnt)
+        # the budget of jobs shared by all the parallel builds, so together
+        # they do not run more compilers than there are cores (or memory);
+        # without it every build runs as many jobs as there are cores
+        self.jobTokens: typing.Optional[int] = (
+            max(1, jobTokens) if jobTokens is not None else None
+        )
+        self.logsFolder: pathlib.Path = (
+            logsFolder
+            if logsFolder is not None
+            else repositoryPath / ".cache" / "build-logs"
+        )
+        self.conanCommand: str = conanCommand
+        self.conanArgs: typing.List[str] = conanArgs or []
+
+        self.recipesIndex: typing.Dict[str, RecipeMetadata] = loadRecipesIndex(
+            repositoryPath,
+            getDefaultIndexFile(repositoryPath)
+        )
+        self.dependencyGraph: typing.Dict[str, typing.List[str]] = (
+            getDependencyGraph(self.recipesIndex)
+        )
+
+        self.buildStateFile: pathlib.Path = (
+            buildStateFile
+            if buildStateFile is not None
+            else getDefaultBuildStateFile(repositoryPath)
+        )
+        # builds with different arguments (profiles, settings, options)
+        # produce different binaries, so they are tracked separately
+        self.configuration: str = " ".join(self.conanArgs)
+        # the same cache as the checker uses in working tree mode
+        self.worktreeHasher: WorktreeHasher = WorktreeHasher(
+            repositoryPath,
+            repositoryPath / ".cache" / "worktree-hashes.json"
+        )
+
+        self.processesLock: threading.Lock = threading.Lock()
+        self.processes: typing.Dict[str, subprocess.Popen] = {}
+        self.isCancelled: bool = False
+
+    def getRecipes(self) -> typing.List[str]:
+        return sorted(self.recipesIndex)
+
+    def getBuildLevels(
+        self,
+        recipes: typing.Optional[typing.Iterable[str]] = None
+    ) -> typing.List[typing.List[str]]:
+        return getBuildLevels(self.dependencyGraph, recipes)
+
+    # the working tree hash of the recipe folder and the hashes
+    # of the `common/cmake` files that its `export_sources()` copies
+    def getRecipeFingerprint(self, p: str) -> typing.Dict[str, typing.Any]:
+        commonCMakeHashes: typing.Dict[str, str] = {}
+        commonCMakePath = self.repositoryPath / "common" / "cmake"
+        patterns = self.recipesIndex[p].commonCMakeExports
+        if patterns and commonCMakePath.is_dir():
+            for f in sorted(commonCMakePath.rglob("*")):
+                relativePath = f.relative_to(commonCMakePath).as_posix()
+                if f.is_file() and any(
+                    fnmatch.fnmatchcase(relativePath, pattern)
+                    for pattern in patterns
+                ):
+                    commonCMakeHashes[relativePath] = self.worktreeHasher.getBlobHash(
+                        f"common/cmake/{relativePath}",
+                        f.stat()
+                    )
+        return {
+            "tree": self.worktreeHasher.getTreeHash(f"recipes/{p}"),
+            "commonCMake": commonCMakeHashes
+        }
+
+    # the minimal set of recipes to rebuild: the ones that have changed
+    # since their last successful build (or were never built), and all
+    # the recipes that depend on them, directly or not; in the build order
+    def planRebuild(
+        self,
+        recipes: typing.Optional[typing.Iterable[str]] = None
+    ) -> typing.List[RebuildReason]:
+        builtFingerprints = loadBuildState(self.buildStateFile).get(
+            self.configuration,
+            {}
+        )
+        candidates: typing.List[str] = sorted(
+            recipes if recipes is not None else self.recipesIndex
+        )
+
+        reasons: typing.Dict[str, RebuildReason] = {}
+        for p in candidates:
+            builtFingerprint = builtFingerprints.get(p)
+            if builtFingerprint is None:
+                reasons[p] = RebuildReason(p, "new")
+            elif builtFingerprint != self.getRecipeFingerprint(p):
+                reasons[p] = RebuildReason(p, "changed")
+        self.worktreeHasher.saveCache()
+
+        reverseGraph = getReverseDependencyGraph(self.dependencyGraph)
+        stack: typing.List[str] = sorted(reasons)
+        while stack:
+            d = stack.pop()
+            for p in reverseGraph.get(d, []):
+                if p not in reasons:
+                    reasons[p] = RebuildReason(p, "dependency", d)
+                    stack.append(p)
+
+        return [
+            reasons[p]
+            for level in getBuildLevels(self.dependencyGraph, reasons)
+            for p in level
+        ]
+
+    def getCreateCommand(
+        self,
+        p: str,
+        jobs: typing.Optional[int] = None
+    ) -> typing.List[str]:
+        return [
+            self.conanCommand,
+            "create",
+            str(self.repositoryPath / "recipes" / p),
+            *self.conanArgs,
+            *self.getJobsArgs(jobs)
+        ]
+
+    # `tools.build:jobs` is what Conan passes to the build tools as `-j`;
+    # it comes last, so it overrides the one from profiles and arguments
+    def getJobsArgs(self, jobs: typing.Optional[int]) -> typing.List[str]:
+        return ["-c", f"tools.build:jobs={jobs}"] if jobs is not None else []
+
+    # runs `conan create` for one recipe, writing its output to the log file
+    # and passing every line to `onOutput` as well, if it is set; instead
+    # of `conan create` it can also be several commands, which then run
+    # one after another until the first failure; the same recipe can be built
+    # with different arguments at the same time, so then every build needs
+    # its own `taskName` (the log file name and the prefix of the output lines)
+    def buildRecipe(
+        self,
+        p: str,
+        onOutput: typing.Optional[typing.Callable[[str, str], None]] = None,
+        commands: typing.Optional[typing.List[typing.List[str]]] = None,
+        taskName: typing.Optional[str] = None
+    ) -> BuildResult:
+        taskName = taskName or p
+        self.logsFolder.mkdir(parents=True, exist_ok=True)
+        logFile = self.logsFolder / f"{taskName}.log"
+        if commands is None:
+            commands = [self.getCreateCommand(p)]
+
+        startTime = time.perf_counter()
+        returnCode: typing.Optional[int] = None
+        with open(logFile, "w", encoding="utf-8", errors="replace") as log:
+            for command in commands:
+                logging.debug(f"Building [{taskName}]: {' '.join(command)}")
+                log.write(f"$ {' '.join(command)}\n")
+                try:
+                    process = subprocess.Popen(
+                        command,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        stdin=subprocess.DEVNULL,
+                        text=True,
+                        encoding="utf-8",
+                        errors="replace",
+                        bufsize=1,
+                        # so the whole tree of processes (CMake, Ninja, compilers)
+                        # could be terminated, and not just Conan itself
+                        start_new_session=(os.name != "nt")
+                    )
+                except OSError as ex:
+                    log.write(f"{ex}\n")
+                    logging.error(f"Could not run [{command[0]}]: {ex}")
+                    return BuildResult(
+                        p,
+                        "failed",
+                        duration=time.perf_counter() - startTime,
+                        logFile=logFile
+                    )
+                with self.processesLock:
+                    self.processes[taskName] = process
+                try:
+                    assert process.stdout is not None
+                    for line in process.stdout:
+                        log.write(line)
+                        if onOutput is not None:
+                            onOutput(taskName, line.rstrip("\n"))
+                    returnCode = process.wait()
+                finally:
+                    with self.processesLock:
+                        del self.processes[taskName]
+                if returnCode != 0 or self.isCancelled:
+                    break
+
+        return BuildResult(
+            p,
+            "built" if returnCode == 0 and not self.isCancelled else "failed",
+            returnCode,
+            time.perf_counter() - startTime,
+            logFile
+        )
+
+    # saved after every build, so an interrupted run does not lose anything
+    def recordBuild(
+        self,
+        p: str,
+        fingerprint: typing.Dict[str, typing.Any],
+        configuration: typing.Optional[str] = None
+    ) -> None:
+        configurations = loadBuildState(self.buildStateFile)
+        configurations.setdefault(
+            configuration if configuration is not None else self.configuration,
+            {}
+        )[p] = fingerprint
+        try:
+            saveBuildState(self.buildStateFile, configurations)
+        except OSError as ex:
+            logging.warning(f"Could not save the build state: {ex}")
+
+    # terminates the builds that are running, and no new ones will be started
+    def cancel(self) -> None:
+        self.isCancelled = True
+        with self.processesLock:
+            for process in self.processes.values():
+                try:
+                    if os.name == "nt":
+                        process.terminate()
+                    else:
+                        os.killpg(process.pid, signal.SIGTERM)
+                except OSError:
+                    # it has already exited
+                    pass
+
+    # runs the builds in the order of their dependencies and yields the results
+    # as soon as they are ready, `buildTask` is called for every task (in one
+    # of the worker threads) with the number of jobs it may run, and `skipTask`
+    # for the ones that cannot be built, because one of their dependencies
+    # has failed (or the builds are cancelled); the tasks which other tasks
+    # depend on the most are started first, so the longest chains
+    # are not left for last
+    #
+    # with the jobs budget, every build takes its share of the tokens when
+    # it starts and returns them when it finishes, and builds are not started
+    # while there are no free tokens; the share is fixed for the whole build,
+    # so it is the budget divided between the builds that can run at once,
+    # unless there are fewer tasks left than that, and then they get more
+    def scheduleBuilds(
+        self,
+        dependencies: typing.Dict[TaskKey, typing.List[TaskKey]],
+        buildTask: typing.Callable[[TaskKey, typing.Optional[int]], BuildResult],
+        skipTask: typing.Callable[[TaskKey, typing.Optional[TaskKey]], BuildResult]
+    ) -> typing.Iterator[typing.Tuple[TaskKey, BuildResult]]:
+        pending: typing.Set[TaskKey] = set(dependencies)
+        # fails early on cycles
+        getBuildLevels(dependencies)
+
+        dependentsCnt: typing.Dict[TaskKey, int] = {t: 0 for t in pending}
+        for t in pending:
+            visited: typing.Set[TaskKey] = set()
+            stack: typing.List[TaskKey] = list(dependencies[t])
+            while stack:
+                d = stack.pop()
+                if d not in visited:
+                    visited.add(d)
+                    dependentsCnt[d] += 1
+                    stack.extend(dependencies[d])
+
+        results: typing.Dict[TaskKey, BuildResult] = {}
+        running: typing.Dict[concurrent.futures.Future, TaskKey] = {}
+        freeTokens: int = self.jobTokens or 0
+        takenTokens: typing.Dict[TaskKey, int] = {}
+        self.isCancelled = False
+        with concurrent.futures.ThreadPoolExecutor(self.jobsCnt) as executor:
+            try:
+                while pending or running:
+                    # in a loop, as the skipped ones cause further skips
+                    skippedSomething = True
+                    while skippedSomething:
+                        skippedSomething = False
+                        for t in sorted(pending):
+                            failedDependency = next(
+                                (
+                                    d for d in dependencies[t]
+                                    if d in results and results[d].status != "built"
+                                ),
+                                None
+                            )
+                            if failedDependency is not None or self.isCancelled:
+                                pending.remove(t)
+                                results[t] = skipTask(t, failedDependency)
+                                skippedSomething = True
+                                yield t, results[t]
+
+                    ready: typing.List[TaskKey] = sorted(
+                        (
+                            t for t in pending
+                            if all(d in results for d in dependencies[t])
+                        ),
+                        key=lambda t: (-dependentsCnt[t], t)
+                    )
+                    startCnt = self.jobsCnt - len(running)
+                    fairShare: int = 0
+                    # after skipping there might be nothing left to start,
+                    # and nothing to divide the budget between
+                    if self.jobTokens is not None and pending:
+                        startCnt = min(startCnt, freeTokens)
+                        fairShare = self.jobTokens // min(
+                            self.jobsCnt,
+                            len(pending) + len(running)
+                        )
+                    toStart = ready[:startCnt]
+                    for n, t in enumerate(toStart):
+                        pending.remove(t)
+                        jobs: typing.Optional[int] = None
+                        if self.jobTokens is not None:
+                            jobs = max(
+                                1,
+                                min(freeTokens // (len(toStart) - n), fairShare)
+                            )
+                            freeTokens -= jobs
+                            takenTokens[t] = jobs
+                        running[executor.submit(buildTask, t, jobs)] = t
+
+                    if not running:
+                        continue
+                    done, _ = concurrent.futures.wait(
+                        running,
+                        return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for f in done:
+                        t = running.pop(f)
+                        freeTokens += takenTokens.pop(t, 0)
+                        results[t] = f.result()
+                        yield t, results[t]
+            finally:
+                # the generator might be closed before it is exhausted
+                if running:
+                    self.cancel()
+
+    # builds the recipes (all of them by default) and yields the results
+    # as soon as they are ready
+    def buildRecipes(
+        self,
+        recipes: typing.Optional[typing.Iterable[str]] = None,
+        onOutput: typing.Optional[typing.Callable[[str, str], None]] = None
+    ) -> typing.Iterator[BuildResult]:
+        pending: typing.Set[str] = set(
+            recipes if recipes is not None else self.recipesIndex
+        )
+        # only the dependencies that are being built now matter,
+        # others are expected to be already in the Conan cache
+        dependencies: typing.Dict[str, typing.List[str]] = {
+            p: [d for d in self.dependencyGraph.get(p, []) if d in pending]
+            for p in pending
+        }
+
+        # taken before the builds, so changes made during them
+        # would not be recorded as built
+        fingerprints: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+            p: self.getRecipeFingerprint(p) for p in pending
+        }
+        self.worktreeHasher.saveCache()
+
+        def buildTask(p: str, jobs: typing.Optional[int]) -> BuildResult:
+            logging.info(
+                f"Building [{p}]" + (f" (jobs: {jobs})" if jobs is not None else "")
+            )
+            return self.buildRecipe(p, onOutput, [self.getCreateCommand(p, jobs)])
+
+        with contextlib.closing(
+            self.scheduleBuilds(
+                dependencies,
+                buildTask,
+                lambda p, d: BuildResult(p, "skipped", failedDependency=d)
+            )
+        ) as builds:
+            for p, r in builds:
+                if r.status == "built":
+                    self.recordBuild(p, fingerprints[p])
+                yield r
@@ -0,0 +1,1805 @@
+import time
+import logging
+import pathlib
+import subprocess
+import json
+import re
+import os
+import stat
+import hashlib
+import fnmatch
+import threading
+import concurrent.futures
+import contextlib
+
+import typing
+
+import recipes_index
+from recipes_index import (
+    RecipeMetadata,
+    getDefaultIndexFile,
+    loadRecipesIndex
+)
+
+# verification of recipes versions and hashes, usable in-process,
+# so other tools don't need to spawn `check-versions-and-hashes.py`:
+#
+#     for r in registry_checker.verifyRegistry(pathlib.Path("/path/to/registry")):
+#         print(r.name, r.isProblematic)
+#
+# or, to keep the loaded state between checks, with a `RegistryChecker`
+# instance that is created once and then called as many times as needed
+
+
+class Profiler:
+    # collects wall and CPU time of phases (and of recipes, which are
+    # just phases of another category), along with the number
+    # of subprocesses spawned in them; CPU time is per thread,
+    # so it is correct with parallel jobs too
+    def __init__(
+        self,
+        isEnabled: bool = False,
+        startTime: typing.Optional[float] = None,
+        startCPUTime: typing.Optional[float] = None
+    ):
+        self.isEnabled: bool = isEnabled
+        self.startTime: float = (
+            startTime if startTime is not None else time.perf_counter()
+        )
+        self.startCPUTime: float = (
+            startCPUTime if startCPUTime is not None else time.process_time()
+        )
+        self.lock: threading.Lock = threading.Lock()
+        self.local: threading.local = threading.local()
+        # name, category, start, wall time, CPU time, subprocesses, thread
+        self.events: typing.List[
+            typing.Tuple[str, str, float, float, float, int, int]
+        ] = []
+        self.subprocessesCnt: int = 0
+
+    @contextlib.contextmanager
+    def phase(
+        self,
+        name: str,
+        category: str = "phase"
+    ) -> typing.Iterator[None]:
+        if not self.isEnabled:
+            yield
+            return
+        subprocessesCnt: int = getattr(self.local, "subprocessesCnt", 0)
+        startTime = time.perf_counter()
+        startCPUTime = time.thread_time()
+        try:
+            yield
+        finally:
+            self.addEvent(
+                name,
+                category,
+                startTime,
+                time.perf_counter() - startTime,
+                time.thread_time() - startCPUTime,
+                getattr(self.local, "subprocessesCnt", 0) - subprocessesCnt
+            )
+
+    def addEvent(
+        self,
+        name: str,
+        category: str,
+        startTime: float,
+        wallTime: float,
+        cpuTime: float,
+        subprocessesCnt: int = 0
+    ) -> None:
+        with self.lock:
+            self.events.append(
+                (
+                    name,
+                    category,
+                    startTime,
+                    wallTime,
+                    cpuTime,
+                    subprocessesCnt,
+                    threading.get_ident()
+                )
+            )
+
+    def countSubprocess(self) -> None:
+        if not self.isEnabled:
+            return
+        self.local.subprocessesCnt = getattr(self.local, "subprocessesCnt", 0) + 1
+        with self.lock:
+            self.subprocessesCnt += 1
+
+    def printReport(self, topCnt: int, stream: typing.TextIO) -> None:
+        phases: typing.Dict[str, typing.List[float]] = {}
+        recipeEvents = []
+        for e in self.events:
+            if e[1] == "recipe":
+                recipeEvents.append(e)
+                continue
+            phase = phases.setdefault(e[0], [0.0, 0.0, 0])
+            phase[0] += e[3]
+            phase[1] += e[4]
+            phase[2] += e[5]
+        print("Phases:", file=stream)
+        print(
+            renderTable(
+                ["phase", "wall, ms", "CPU, ms", "subprocesses"],
+                [
+                    [
+                        name,
+                        f"{v[0] * 1000:.1f}",
+                        f"{v[1] * 1000:.1f}",
+                        str(v[2])
+                    ]
+                    for name, v in phases.items()
+                ]
+            ),
+            file=stream
+        )
+        if recipeEvents:
+            print(f"Slowest recipes (out of {len(recipeEvents)}):", file=stream)
+            print(
+                renderTable(
+                    ["recipe", "wall, ms", "CPU, ms", "subprocesses"],
+                    [
+                        [e[0], f"{e[3] * 1000:.1f}", f"{e[4] * 1000:.1f}", str(e[5])]
+                        for e in sorted(
+                            recipeEvents,
+                            key=lambda e: e[3],
+                            reverse=True
+                        )[:topCnt]
+                    ]
+                ),
+                file=stream
+            )
+        print(
+            " ".join((
+                f"Total: {(time.perf_counter() - self.startTime) * 1000:.1f} ms",
+                f"wall, {(time.process_time() - self.startCPUTime) * 1000:.1f} ms",
+                f"CPU, {self.subprocessesCnt} subprocesses"
+            )),
+            file=stream
+        )
+
+    # https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+    def saveTrace(self, traceFile: pathlib.Path) -> None:
+        threadIDs: typing.Dict[int, int] = {}
+        traceEvents = []
+        for name, category, startTime, wallTime, cpuTime, subprocessesCnt, t in (
+            self.events
+        ):
+            traceEvents.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round((startTime - self.startTime) * 1000000),
+                    "dur": round(wallTime * 1000000),
+                    "pid": os.getpid(),
+                    "tid": threadIDs.setdefault(t, len(threadIDs)),
+                    "args": {
+                        "cpuMilliseconds": round(cpuTime * 1000, 3),
+                        "subprocesses": subprocessesCnt
+                    }
+                }
+            )
+        with open(traceFile, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": traceEvents,
+                    "displayTimeUnit": "ms"
+                },
+                f
+            )
+
+
+# disabled by default; to profile, replace it with an enabled one
+# (`registry_checker.profiler = Profiler(True)`) before doing anything else
+profiler: Profiler = Profiler()
+
+
+ansiEscapeRegEx = re.compile(r"\033\[[0-9;]*m")
+
+
+# renders the same table as `tabulate(..., tablefmt="psql")`,
+# but without importing it (and pandas along with it)
+def renderTable(
+    headers: typing.Sequence[str],
+    rows: typing.Iterable[typing.Sequence[str]]
+) -> str:
+    rows = list(rows)
+    widths: typing.List[int] = [
+        max(
+            [len(ansiEscapeRegEx.sub("", row[i])) for row in rows]
+            + [len(ansiEscapeRegEx.sub("", headers[i]))]
+        )
+        for i in range(len(headers))
+    ]
+
+    def renderRow(cells: typing.Sequence[str]) -> str:
+        return "".join((
+            "| ",
+            " | ".join(
+                c + " " * (w - len(ansiEscapeRegEx.sub("", c)))
+                for c, w in zip(cells, widths)
+            ),
+            " |"
+        ))
+
+    border: str = "+-" + "-+-".join("-" * w for w in widths) + "-+"
+    lines: typing.List[str] = [
+        border,
+        renderRow(headers),
+        "|-" + "-+-".join("-" * w for w in widths) + "-|"
+    ]
+    lines.extend(renderRow(row) for row in rows)
+    lines.append(border)
+    return "\n".join(lines)
+
+
+def getRevParseHash(
+    pathToRepository: pathlib.Path,
+    commitHash: str,
+    pathInRepository: str
+) -> str:
+    logging.debug(
+        f"- getting rev-parse hash value of [{pathInRepository}]"
+    )
+    profiler.countSubprocess()
+    cmdResult = subprocess.run(
+        [
+            "git",
+            "-C",
+            pathToRepository.as_posix(),
+            "rev-parse",
+            f"{commitHash}:{pathInRepository}"
+        ],
+        # check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT
+    )
+    if cmdResult.returncode != 0:
+        logging.error(
+            "".join((
+                f"The command was: {' '.join(cmdResult.args)}\n",
+                f"Output: {cmdResult.stdout.strip()}"
+            ))
+        )
+        raise OSError(
+            "Failed to get rev-parse hash"
+        )
+    else:
+        revParsedHash = cmdResult.stdout.strip()
+        if len(revParsedHash) != 40:
+            raise ValueError(
+                " ".join((
+                    "The rev-parsed value doesn't look like",
+                    f"a valid Git hash: [{revParsedHash}]",
+                    "(must be a string of 40 symbols length",
+                    "without newlines)"
+                ))
+            )
+        else:
+            logging.debug(f"- {revParsedHash}")
+            return revParsedHash
+
+
+# lists all the entries of the given folder with a single `git ls-tree` call,
+# so there is no need to spawn a `git rev-parse` for every one of them;
+# failing here is not fatal, as an empty (or incomplete) result just means
+# that the missing paths need to be looked up one by one with `getRevParseHash()`,
+# which will then report the errors for them
+def getRevParseHashes(
+    pathToRepository: pathlib.Path,
+    commitHash: str,
+    pathInRepository: str
+) -> typing.Dict[str, str]:
+    logging.debug(
+        f"Getting hash values of all the entries in [{pathInRepository}]"
+    )
+    revParsedHashes: typing.Dict[str, str] = {}
+    profiler.countSubprocess()
+    cmdResult = subprocess.run(
+        [
+            "git",
+            "-C",
+            pathToRepository.as_posix(),
+            "ls-tree",
+            # NUL-terminated entries, so paths are never quoted
+            "-z",
+            commitHash,
+            f"{pathInRepository.rstrip('/')}/"
+        ],
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if cmdResult.returncode != 0:
+        logging.debug(
+            "".join((
+                f"- the command failed: {' '.join(cmdResult.args)}\n",
+                f"- output: {cmdResult.stderr.strip()}"
+            ))
+        )
+        return revParsedHashes
+
+    # each entry is `<mode> SP <type> SP <object> TAB <path>`
+    for entry in cmdResult.stdout.split("\0"):
+        if not entry:
+            continue
+        entryInfo, _, entryPath = entry.partition("\t")
+        entryHash = entryInfo.split(" ")[-1]
+        if len(entryHash) != 40:
+            logging.debug(
+                f"- skipping an unexpected ls-tree entry: [{entry}]"
+            )
+            continue
+        revParsedHashes[entryPath] = entryHash
+    logging.debug(f"- got {len(revParsedHashes)} hash values")
+    return revParsedHashes
+
+
+# writes the current index as a tree object (the same way `git commit` would)
+# and returns its hash, so staged content can be looked up like any other tree
+def writeIndexTree(pathToRepository: pathlib.Path) -> str:
+    logging.debug("Writing the index as a tree")
+    profiler.countSubprocess()
+    cmdResult = subprocess.run(
+        [
+            "git",
+            "-C",
+            pathToRepository.as_posix(),
+            "write-tree"
+        ],
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if cmdResult.returncode != 0:
+        logging.error(
+            "".join((
+                f"The command was: {' '.join(cmdResult.args)}\n",
+                f"Output: {cmdResult.stderr.strip()}"
+            ))
+        )
+        # for example, when there are unresolved conflicts
+        raise OSError("Failed to write the index as a tree")
+    indexTreeHash = cmdResult.stdout.strip()
+    logging.debug(f"- {indexTreeHash}")
+    return indexTreeHash
+
+
+# tracked files along with all the folders that contain them, as Git keeps
+# tracked files in trees even if they match ignore rules (for example,
+# when they were added with `git add --force`)
+def getTrackedPaths(pathToRepository: pathlib.Path) -> typing.Set[str]:
+    logging.debug("Getting the tracked paths")
+    profiler.countSubprocess()
+    cmdResult = subprocess.run(
+        [
+            "git",
+            "-C",
+            pathToRepository.as_posix(),
+            "ls-files",
+            # NUL-terminated entries, so paths are never quoted
+            "-z",
+            "--cached"
+        ],
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if cmdResult.returncode != 0:
+        logging.error(
+            "".join((
+                f"The command was: {' '.join(cmdResult.args)}\n",
+                f"Output: {cmdResult.stderr.strip()}"
+            ))
+        )
+        raise OSError("Failed to get the list of tracked paths")
+    trackedPaths: typing.Set[str] = set()
+    for trackedFile in cmdResult.stdout.split("\0"):
+        if not trackedFile:
+            continue
+        trackedPaths.add(trackedFile)
+        # parent folders are added until the one that is already there
+        folderPath = trackedFile.rpartition("/")[0]
+        while folderPath and folderPath not in trackedPaths:
+            trackedPaths.add(folderPath)
+            folderPath = folderPath.rpartition("/")[0]
+    logging.debug(f"- {len(trackedPaths)} tracked paths")
+    return trackedPaths
+
+
+# without `untilRevision` the changes are taken from the index,
+# as in `git diff --cached`
+def getChangedPaths(
+    pathToRepository: pathlib.Path,
+    sinceRevision: str,
+    untilRevision: typing.Optional[str]
+) -> typing.List[str]:
+    logging.debug(
+        " ".join((
+            f"Getting paths changed between [{sinceRevision}]",
+            f"and [{untilRevision if untilRevision is not None else 'index'}]"
+        ))
+    )
+    profiler.countSubprocess()
+    cmdResult = subprocess.run(
+        [
+            "git",
+            "-C",
+            pathToRepository.as_posix(),
+            "diff",
+            "--name-only",
+            # a renamed file should affect both its old and new recipes
+            "--no-renames",
+            "-z"
+        ]
+        + (
+            [sinceRevision, untilRevision]
+            if untilRevision is not None
+            else ["--cached", sinceRevision]
+        )
+        + ["--"],
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if cmdResult.returncode != 0:
+        logging.error(
+            "".join((
+                f"The command was: {' '.join(cmdResult.args)}\n",
+                f"Output: {cmdResult.stderr.strip()}"
+            ))
+        )
+        raise OSError("Failed to get the list of changed paths")
+    changedPaths = [p for p in cmdResult.stdout.split("\0") if p]
+    logging.debug(f"- {len(changedPaths)} paths were changed")
+    return changedPaths
+
+
+# goes through the entire history with a single streaming `git log` and collects
+# every tree that was ever committed as `<pathInRepository>/<name>`, mapping
+# (name, tree hash) to the oldest commit that had it; with `-t` the raw output
+# has entries for trees too, and with `-c` merges report the trees that
+# differ from all their parents, so trees made by merge resolutions are there too;
+# `--full-history` keeps side branches that the default simplification would
+# drop for being the same as the main line at the merge (like when their
+# changes were cherry-picked there), as their trees are still in history
+def getHistoricalTrees(
+    pathToRepository: pathlib.Path,
+    revision: str,
+    pathInRepository: str
+) -> typing.Dict[typing.Tuple[str, str], str]:
+    logging.debug(
+        f"Collecting historical trees of [{pathInRepository}] from [{revision}]"
+    )
+    pathPrefix = f"{pathInRepository.rstrip('/')}/"
+    historicalTrees: typing.Dict[typing.Tuple[str, str], str] = {}
+    commitsCnt: int = 0
+    commitHash: str = ""
+    profiler.countSubprocess()
+    with subprocess.Popen(
+        [
+            "git",
+            "-c",
+            "core.quotePath=false",
+            "-C",
+            pathToRepository.as_posix(),
+            "log",
+            "--format=>%H",
+            "--raw",
+            "-t",
+            "-c",
+            "--full-history",
+            "--root",
+            "--no-abbrev",
+            "--no-renames",
+            revision,
+            "--",
+            pathPrefix
+        ],
+        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    ) as gitLog:
+        assert gitLog.stdout is not None
+        for line in gitLog.stdout:
+            if line.startswith(">"):
+                commitHash = line[1:].strip()
+                commitsCnt += 1
+                continue
+            elif not line.startswith(":"):
+                continue
+            entryInfo, _, entryPath = line.rstrip("\n").partition("\t")
+            if not entryPath.startswith(pathPrefix):
+                continue
+            entryName = entryPath[len(pathPrefix):]
+            if "/" in entryName:
+                continue
+            # `:<modes> <hashes> <status>` with one colon, mode and hash
+            # per parent, plus the mode and hash of the result itself
+            parentsCnt = len(entryInfo) - len(entryInfo.lstrip(":"))
+            entryFields = entryInfo.lstrip(":").split(" ")
+            # modes are zero-padded here (`040000`)
+            if entryFields[parentsCnt].lstrip("0") != gitModeTree:
+                continue
+            entryHash = entryFields[2 * parentsCnt + 1]
+            # log goes from newer commits to older ones
+            historicalTrees[(entryName, entryHash)] = commitHash
+        gitLogErrors = gitLog.stderr.read() if gitLog.stderr else ""
+    if gitLog.returncode != 0:
+        logging.error(
+            "".join((
+                f"The command was: {' '.join(gitLog.args)}\n",
+                f"Output: {gitLogErrors.strip()}"
+            ))
+        )
+        raise OSError("Failed to collect historical trees")
+    logging.debug(
+        " ".join((
+            f"- found {len(historicalTrees)} trees",
+            f"in {commitsCnt} commits"
+        ))
+    )
+    return historicalTrees
+
+
+class GitObjectsReader:
+    # a single long-lived `git cat-file --batch` process
+    # for reading any number of objects (from any number of threads)
+    def __init__(self, pathToRepository: pathlib.Path):
+        self.lock: threading.Lock = threading.Lock()
+        profiler.countSubprocess()
+        self.process = subprocess.Popen(
+            [
+                "git",
+                "-C",
+                pathToRepository.as_posix(),
+                "cat-file",
+                "--batch"
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+
+    def read(self, objectName: str) -> typing.Optional[bytes]:
+        assert self.process.stdin is not None
+        assert self.process.stdout is not None
+        with self.lock:
+            self.process.stdin.write(f"{objectName}\n".encode())
+            self.process.stdin.flush()
+            # `<object> <type> <size>` or `<object> missing`
+            header = self.process.stdout.readline().decode().split()
+            if len(header) != 3:
+                return None
+            content = self.process.stdout.read(int(header[2]))
+            self.process.stdout.read(1) # trailing newline
+        return content
+
+    def close(self) -> None:
+        if self.process.stdin is not None:
+            self.process.stdin.close()
+        self.process.wait()
+
+
+# maps changed paths to the recipes they affect:
+# - `recipes/<name>/...`
+# - `versions/<x>-/<name>.json`
+# - `common/cmake/<file>`, for every recipe that copies it in `export_sources()`
+def getAffectedRecipes(
+    changedPaths: typing.Iterable[str],
+    recipesIndex: typing.Dict[str, RecipeMetadata]
+) -> typing.Set[str]:
+    affectedRecipes: typing.Set[str] = set()
+    changedCommonCMakeFiles: typing.List[str] = []
+    for changedPath in changedPaths:
+        pathParts = changedPath.split("/")
+        if pathParts[0] == "recipes" and len(pathParts) > 2:
+            affectedRecipes.add(pathParts[1])
+        elif (
+            pathParts[0] == "versions"
+            and
+            len(pathParts) == 3
+            and
+            pathParts[2].endswith(".json")
+        ):
+            affectedRecipes.add(pathParts[2][:-len(".json")])
+        elif pathParts[:2] == ["common", "cmake"] and len(pathParts) > 2:
+            changedCommonCMakeFiles.append("/".join(pathParts[2:]))
+
+    if changedCommonCMakeFiles:
+        for p, recipeMetadata in recipesIndex.items():
+            if p in affectedRecipes:
+                continue
+            for pattern in recipeMetadata.commonCMakeExports:
+                if any(
+                    fnmatch.fnmatchcase(f, pattern)
+                    for f in changedCommonCMakeFiles
+                ):
+                    logging.debug(
+                        f"- recipe [{p}] is affected by [common/cmake]"
+                    )
+                    affectedRecipes.add(p)
+                    break
+    return affectedRecipes
+
+
+# dumps JSON the way versions files are formatted in this repository,
+# with every opening bracket of a nested object/array on its own line
+def dumpVersionsJson(value: typing.Any, indentLevel: int = 0) -> str:
+    indent = " " * 4 * indentLevel
+    nestedIndent = " " * 4 * (indentLevel + 1)
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        items: typing.List[str] = []
+        for k, v in value.items():
+            if isinstance(v, (dict, list)) and v:
+                items.append(
+                    "".join((
+                        f"{nestedIndent}{json.dumps(k)}:\n",
+                        nestedIndent,
+                        dumpVersionsJson(v, indentLevel + 1)
+                    ))
+                )
+            else:
+                items.append(
+                    f"{nestedIndent}{json.dumps(k)}: {dumpVersionsJson(v)}"
+                )
+        return "{\n" + ",\n".join(items) + f"\n{indent}}}"
+    elif isinstance(value, list):
+        if not value:
+            return "[]"
+        return "".join((
+            "[\n",
+            ",\n".join(
+                f"{nestedIndent}{dumpVersionsJson(v, indentLevel + 1)}"
+                for v in value
+            ),
+            f"\n{indent}]"
+        ))
+    else:
+        return json.dumps(value)
+
+
+# writes all the files or none of them: everything is written
+# to temporary files first, and only then they replace the originals
+def writeFilesAtomically(files: typing.Dict[pathlib.Path, str]) -> None:
+    tmpFiles: typing.List[typing.Tuple[pathlib.Path, pathlib.Path]] = []
+    try:
+        for f, content in files.items():
+            f.parent.mkdir(parents=True, exist_ok=True)
+            tmpFile = f.with_name(f".{f.name}.tmp")
+            with open(tmpFile, "w", newline="\n") as tf:
+                tf.write(content)
+            tmpFiles.append((tmpFile, f))
+    except OSError:
+        for tmpFile, _ in tmpFiles:
+            tmpFile.unlink(missing_ok=True)
+        raise
+    for tmpFile, f in tmpFiles:
+        os.replace(tmpFile, f)
+
+
+# Git object hashing, so the working tree can be hashed without calling Git;
+# see https://git-scm.com/book/en/v2/Git-Internals-Git-Objects
+
+gitModeFile: str = "100644"
+gitModeExecutable: str = "100755"
+gitModeSymlink: str = "120000"
+gitModeTree: str = "40000"
+
+# files that were modified less than this many nanoseconds before hashing
+# are not cached, because they might still be changed within the same
+# mtime tick (the same thing Git calls "racily clean" entries)
+worktreeCacheRacyInterval: int = 2 * 1000 * 1000 * 1000
+
+
+def hashGitObject(objectType: str, content: bytes) -> str:
+    h = hashlib.sha1(f"{objectType} {len(content)}\0".encode())
+    h.update(content)
+    return h.hexdigest()
+
+
+class GitIgnoreRules:
+    # a simplified version of .gitignore matching: patterns with a slash
+    # are anchored to the folder of their .gitignore, the rest are matched
+    # against the entry name at any depth, trailing slash means "folders only",
+    # and the last matching pattern wins, so `!` negation works too
+    def __init__(
+        self,
+        rules: typing.Optional[
+            typing.List[typing.Tuple[str, str, bool, bool, bool]]
+        ] = None
+    ):
+        self.rules: typing.List[
+            # base folder, pattern, negated, anchored, folders only
+            typing.Tuple[str, str, bool, bool, bool]
+        ] = rules if rules is not None else []
+
+    def extended(
+        self,
+        ignoreFile: pathlib.Path,
+        baseFolder: str
+    ) -> "GitIgnoreRules":
+        if not ignoreFile.is_file():
+            return self
+        rules = list(self.rules)
+        with open(ignoreFile, "r", encoding="utf-8", errors="replace") as f:
+            for line in f.read().splitlines():
+                line = line.rstrip()
+                if not line or line.startswith("#"):
+                    continue
+                negated = line.startswith("!")
+                if negated:
+                    line = line[1:]
+                foldersOnly = line.endswith("/")
+                line = line.rstrip("/")
+                anchored = "/" in line
+                rules.append(
+                    (baseFolder, line.lstrip("/"), negated, anchored, foldersOnly)
+                )
+        return GitIgnoreRules(rules)
+
+    def isIgnored(self, entryPath: str, isFolder: bool) -> bool:
+        ignored = False
+        entryName = entryPath.rsplit("/", 1)[-1]
+        for baseFolder, pattern, negated, anchored, foldersOnly in self.rules:
+            if foldersOnly and not isFolder:
+                continue
+            if anchored:
+                if baseFolder:
+                    if not entryPath.startswith(f"{baseFolder}/"):
+                        continue
+                    matched = fnmatch.fnmatchcase(
+                        entryPath[len(baseFolder) + 1:],
+                        pattern
+                    )
+                else:
+                    matched = fnmatch.fnmatchcase(entryPath, pattern)
+            else:
+                matched = fnmatch.fnmatchcase(entryName, pattern)
+            if matched:
+                ignored = not negated
+        return ignored
+
+
+class WorktreeHasher:
+    # the cache maps a file path inside the repository to its
+    # [mtime, size, inode, blob hash], so unchanged files
+    # are never read and hashed again
+    def __init__(
+        self,
+        pathToRepository: pathlib.Path,
+        cacheFile: typing.Optional[pathlib.Path] = None
+    ):
+        self.pathToRepository: pathlib.Path = pathToRepository
+        self.cacheFile: typing.Optional[pathlib.Path] = cacheFile
+        self.cache: typing.Dict[str, typing.List[typing.Any]] = {}
+        self.cacheIsDirty: bool = False
+        self.hashedFilesCnt: int = 0
+        self.lock: threading.Lock = threading.Lock()
+        # only loaded when something matches ignore rules, see `isTracked()`
+        self.trackedPaths: typing.Optional[typing.Set[str]] = None
+        self.rootIgnoreRules: GitIgnoreRules = GitIgnoreRules()
+        self.reloadIgnoreRules()
+        if self.cacheFile is not None and self.cacheFile.is_file():
+            try:
+                with open(self.cacheFile, "r") as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError) as ex:
+                logging.warning(
+                    f"Could not load the working tree hashes cache: {ex}"
+                )
+                self.cache = {}
+
+    # the root ignore files are only read once, so long-running tools
+    # need to call this when they change; the tracked paths are dropped too,
+    # as there might be new files matching the new rules
+    def reloadIgnoreRules(self) -> None:
+        with self.lock:
+            self.trackedPaths = None
+            self.rootIgnoreRules = GitIgnoreRules().extended(
+                self.pathToRepository / ".git" / "info" / "exclude",
+                ""
+            ).extended(
+                self.pathToRepository / ".gitignore",
+                ""
+            )
+
+    def saveCache(self) -> None:
+        if self.cacheFile is None or not self.cacheIsDirty:
+            return
+        self.cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        cacheFileTmp = self.cacheFile.with_name(f"{self.cacheFile.name}.tmp")
+        with open(cacheFileTmp, "w") as f:
+            json.dump(self.cache, f, separators=(",", ":"))
+        os.replace(cacheFileTmp, self.cacheFile)
+        self.cacheIsDirty = False
+
+    def getBlobHash(
+        self,
+        entryPath: str,
+        entryStat: os.stat_result
+    ) -> str:
+        statKey = [entryStat.st_mtime_ns, entryStat.st_size, entryStat.st_ino]
+        cached = self.cache.get(entryPath)
+        if cached is not None and cached[:3] == statKey:
+            return cached[3]
+
+        fullPath = self.pathToRepository / entryPath
+        if stat.S_ISLNK(entryStat.st_mode):
+            content = os.fsencode(os.readlink(fullPath))
+        else:
+            with open(fullPath, "rb") as f:
+                content = f.read()
+        blobHash = hashGitObject("blob", content)
+
+        # recipes might be hashed from several threads
+        with self.lock:
+            self.hashedFilesCnt += 1
+            if (
+                time.time_ns() - entryStat.st_mtime_ns
+                > worktreeCacheRacyInterval
+            ):
+                self.cache[entryPath] = statKey + [blobHash]
+                self.cacheIsDirty = True
+        return blobHash
+
+    # ignore rules apply only to untracked paths, tracked files (and folders
+    # with tracked files) are in the tree no matter what; raises OSError
+    # if the tracked paths could not be gotten
+    def isTracked(self, entryPath: str) -> bool:
+        with self.lock:
+            if self.trackedPaths is None:
+                self.trackedPaths = getTrackedPaths(self.pathToRepository)
+            return entryPath in self.trackedPaths
+
+    def getIgnoreRules(self, folderPath: str) -> GitIgnoreRules:
+        # collect .gitignore files from the root down to the given folder
+        ignoreRules = self.rootIgnoreRules
+        currentPath = ""
+        for part in folderPath.split("/"):
+            currentPath = f"{currentPath}/{part}" if currentPath else part
+            ignoreRules = ignoreRules.extended(
+                self.pathToRepository / currentPath / ".gitignore",
+                currentPath
+            )
+        return ignoreRules
+
+    # inside an ignored folder (`isIgnored`) only tracked entries are hashed
+    def getTreeHash(
+        self,
+        pathInRepository: str,
+        ignoreRules: typing.Optional[GitIgnoreRules] = None,
+        isIgnored: bool = False
+    ) -> typing.Optional[str]:
+        pathInRepository = pathInRepository.strip("/")
+        if ignoreRules is None:
+            ignoreRules = self.getIgnoreRules(pathInRepository)
+
+        # Git sorts tree entries by name bytes, but compares folders
+        # as if they had a trailing slash
+        entries: typing.List[typing.Tuple[bytes, str, bytes, str]] = []
+        with os.scandir(self.pathToRepository / pathInRepository) as it:
+            for entry in it:
+                if entry.name == ".git":
+                    continue
+                entryPath = f"{pathInRepository}/{entry.name}"
+                entryStat = entry.stat(follow_symlinks=False)
+                isFolder = stat.S_ISDIR(entryStat.st_mode)
+                entryIsIgnored = isIgnored or ignoreRules.isIgnored(entryPath, isFolder)
+                if entryIsIgnored and not self.isTracked(entryPath):
+                    continue
+                entryName = os.fsencode(entry.name)
+                if isFolder:
+                    treeHash = self.getTreeHash(
+                        entryPath,
+                        ignoreRules.extended(
+                            pathlib.Path(entry.path) / ".gitignore",
+                            entryPath
+                        ),
+                        entryIsIgnored
+                    )
+                    # Git does not store empty folders
+                    if treeHash is not None:
+                        entries.append(
+                            (entryName + b"/", gitModeTree, entryName, treeHash)
+                        )
+                elif (
+                    stat.S_ISREG(entryStat.st_mode)
+                    or
+                    stat.S_ISLNK(entryStat.st_mode)
+                ):
+                    if stat.S_ISLNK(entryStat.st_mode):
+                        entryMode = gitModeSymlink
+                    elif entryStat.st_mode & stat.S_IXUSR:
+                        entryMode = gitModeExecutable
+                    else:
+                        entryMode = gitModeFile
+                    entries.append(
+                        (
+                            entryName,
+                            entryMode,
+                            entryName,
+                            self.getBlobHash(entryPath, entryStat)
+                        )
+                    )
+        if not entries:
+            return None
+
+        treeContent = bytearray()
+        for _, entryMode, entryName, entryHash in sorted(entries):
+            treeContent += entryMode.encode()
+            treeContent += b" "
+            treeContent += entryName
+            treeContent += b"\0"
+            treeContent += bytes.fromhex(entryHash)
+        return hashGitObject("tree", bytes(treeContent))
+
+
+class ThreadLogBuffer(logging.Filter):
+    # while a function runs via `collect()`, log records from its thread
+    # are not emitted but stashed, so they can be emitted later in order
+    def __init__(self):
+        super().__init__()
+        self.local: threading.local = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = getattr(self.local, "records", None)
+        if records is None:
+            return True
+        # the same record gets here once per handler
+        if not records or records[-1] is not record:
+            records.append(record)
+        return False
+
+    def collect(
+        self,
+        func: typing.Callable[..., typing.Any],
+        *args: typing.Any
+    ) -> typing.Tuple[typing.Any, typing.List[logging.LogRecord]]:
+        self.local.records = []
+        try:
+            return (func(*args), self.local.records)
+        finally:
+            self.local.records = None
+
+
+class RecipeResult:
+    # one result per recipe, and there might be thousands of them,
+    # hence the slots instead of a dictionary per instance
+    __slots__ = (
+        "name",
+        "version",
+        "statedHash",
+        "actualHash",
+        "hashIsValid",
+        "isProblematic",
+        "errors",
+        "warnings"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        version: typing.Optional[str],
+        statedHash: typing.Optional[str],
+        actualHash: typing.Optional[str],
+        hashIsValid: bool,
+        isProblematic: bool,
+        errors: typing.Optional[typing.List[str]] = None,
+        warnings: typing.Optional[typing.List[str]] = None
+    ):
+        self.name: str = name
+        # with the recipe version, if there is one: `1.2.3#4`
+        self.version: typing.Optional[str] = version
+        self.statedHash: typing.Optional[str] = statedHash
+        self.actualHash: typing.Optional[str] = actualHash
+        self.hashIsValid: bool = hashIsValid
+        self.isProblematic: bool = isProblematic
+        self.errors: typing.List[str] = errors if errors is not None else []
+        self.warnings: typing.List[str] = warnings if warnings is not None else []
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "recipe": self.name,
+            "version": self.version,
+            "statedHash": self.statedHash,
+            "actualHash": self.actualHash,
+            "hashIsValid": self.hashIsValid,
+            "isProblematic": self.isProblematic,
+            "errors": self.errors,
+            "warnings": self.warnings
+        }
+
+
+class HistoryAuditResult:
+    __slots__ = (
+        "name",
+        "version",
+        "gitTree",
+        "commit",
+        "error"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        version: typing.Optional[str],
+        gitTree: typing.Optional[str],
+        commit: typing.Optional[str],
+        error: typing.Optional[str]
+    ):
+        self.name: str = name
+        self.version: typing.Optional[str] = version
+        self.gitTree: typing.Optional[str] = gitTree
+        self.commit: typing.Optional[str] = commit
+        self.error: typing.Optional[str] = error
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "recipe": self.name,
+            "version": self.version,
+            "gitTree": self.gitTree,
+            "commit": self.commit,
+            "error": self.error
+        }
+
+
+# bump it whenever the cache file structure changes
+resultsCacheFormat: int = 2
+
+
+class ResultsCache:
+    # results of previous runs per recipe, each stored together with
+    # the key it was calculated for and with the messages it reported,
+    # so those can be shown again
+    def __init__(
+        self,
+        cacheFile: typing.Optional[pathlib.Path],
+        checkerVersion: str
+    ):
+        self.cacheFile: typing.Optional[pathlib.Path] = cacheFile
+        self.checkerVersion: str = checkerVersion
+        self.recipes: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        self.isDirty: bool = False
+        self.lock: threading.Lock = threading.Lock()
+        if self.cacheFile is None or not self.cacheFile.is_file():
+            return
+        try:
+            with open(self.cacheFile, "r") as f:
+                cacheContent = json.load(f)
+        except (OSError, ValueError) as ex:
+            logging.warning(f"Could not load the results cache: {ex}")
+            return
+        if cacheContent.get("checker") != self.checkerVersion:
+            logging.debug("Results cache is outdated, discarding it")
+            self.isDirty = True
+            return
+        self.recipes = cacheContent.get("recipes", {})
+
+    @property
+    def isEnabled(self) -> bool:
+        return self.cacheFile is not None
+
+    def get(
+        self,
+        name: str,
+        key: typing.List[str]
+    ) -> typing.Optional[RecipeResult]:
+        cached = self.recipes.get(name)
+        if cached is None or cached.get("key") != key:
+            return None
+        recipe = RecipeResult(name, *cached["result"])
+        for message in recipe.warnings:
+            logging.warning(message)
+        for message in recipe.errors:
+            logging.error(message)
+        return recipe
+
+    def put(
+        self,
+        name: str,
+        key: typing.List[str],
+        recipe: RecipeResult
+    ) -> None:
+        with self.lock:
+            self.recipes[name] = {
+                "key": key,
+                "result": [
+                    recipe.version,
+                    recipe.statedHash,
+                    recipe.actualHash,
+                    recipe.hashIsValid,
+                    recipe.isProblematic,
+                    recipe.errors,
+                    recipe.warnings
+                ]
+            }
+            self.isDirty = True
+
+    def save(self) -> None:
+        if self.cacheFile is None or not self.isDirty:
+            return
+        self.cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        cacheFileTmp = self.cacheFile.with_name(f"{self.cacheFile.name}.tmp")
+        with open(cacheFileTmp, "w") as f:
+            json.dump(
+                {
+                    "checker": self.checkerVersion,
+                    "recipes": self.recipes
+                },
+                f,
+                separators=(",", ":")
+            )
+        os.replace(cacheFileTmp, self.cacheFile)
+        self.isDirty = False
+
+
+def getCheckerVersion() -> str:
+    # any change in the verification code invalidates all the cached results
+    return ":".join(
+        [str(resultsCacheFormat)]
+        + [
+            hashGitObject("blob", pathlib.Path(f).read_bytes())
+            for f in (__file__, recipes_index.__file__)
+        ]
+    )
+
+
+class RegistryChecker:
+    # keeps everything that can be reused between checks of the same registry
+    # (the recipes index, the working tree hashes and the cached results),
+    # so a long-running tool can create it once and check as often as it needs;
+    # actual hashes are taken from HEAD, from the working tree (`worktreeMode`)
+    # or from the index (`stagedMode`), and in the latter case
+    # conanfiles and versions files are read from the index too
+    def __init__(
+        self,
+        repositoryPath: pathlib.Path,
+        worktreeMode: bool = False,
+        useCache: bool = True,
+        stagedMode: bool = False
+    ):
+        self.repositoryPath: pathlib.Path = repositoryPath
+        self.recipesPath: pathlib.Path = repositoryPath / "recipes"
+        if not self.recipesPath.is_dir():
+            raise FileNotFoundError(
+                f"There is no [recipes] folder inside [{repositoryPath}]"
+            )
+        if worktreeMode and stagedMode:
+            raise ValueError("Working tree and staged modes are exclusive")
+        self.worktreeMode: bool = worktreeMode
+        self.stagedMode: bool = stagedMode
+        self.useCache: bool = useCache
+        # HEAD, or the tree that was written from the index in staged mode
+        self.revision: str = "HEAD"
+        # only needed in staged mode
+        self.gitObjectsReader: typing.Optional[GitObjectsReader] = None
+        # the hasher is needed in HEAD mode too, as it hashes (and caches)
+        # blobs that are used for keying the results cache
+        self.worktreeHasher: WorktreeHasher = WorktreeHasher(
+            repositoryPath,
+            (
+                repositoryPath / ".cache" / "worktree-hashes.json"
+                if useCache
+                else None
+            )
+        )
+        # staged checks are small enough to not need the results cache,
+        # and its keys are made from the working tree files anyway
+        self.resultsCache: ResultsCache = ResultsCache(
+            (
+                repositoryPath / ".cache" / "check-versions-and-hashes.json"
+                if useCache and not stagedMode
+                else None
+            ),
+            getCheckerVersion()
+        )
+        self.recipesIndex: typing.Dict[str, RecipeMetadata] = {}
+        self.actualHashes: typing.Dict[str, str] = {}
+
+    def getRecipes(self) -> typing.List[str]:
+        return sorted([p.name for p in self.recipesPath.iterdir() if p.is_dir()])
+
+    def getVersionsFile(self, p: str) -> pathlib.Path:
+        return self.repositoryPath / "versions" / f"{p[0]}-" / f"{p}.json"
+
+    def getGitObjectsReader(self) -> GitObjectsReader:
+        if self.gitObjectsReader is None:
+            self.gitObjectsReader = GitObjectsReader(self.repositoryPath)
+        return self.gitObjectsReader
+
+    def closeGitObjectsReader(self) -> None:
+        if self.gitObjectsReader is not None:
+            self.gitObjectsReader.close()
+            self.gitObjectsReader = None
+
+    # returns None if there is no such versions file
+    def loadVersionsFile(
+        self,
+        p: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        if self.stagedMode:
+            # `:<path>` is the stage 0 (not conflicted) entry in the index
+            versionsFileContent = self.getGitObjectsReader().read(
+                f":versions/{p[0]}-/{p}.json"
+            )
+            if versionsFileContent is None:
+                return None
+            return json.loads(versionsFileContent)
+        versionsFile: pathlib.Path = self.getVersionsFile(p)
+        if not versionsFile.is_file():
+            return None
+        with open(versionsFile, "r") as f:
+            return json.load(f)
+
+    def loadRecipesIndex(
+        self,
+        recipes: typing.Optional[typing.List[str]] = None
+    ) -> typing.Dict[str, RecipeMetadata]:
+        if recipes is None:
+            recipes = self.getRecipes()
+        with profiler.phase("parsing conanfiles"):
+            if self.stagedMode:
+                # staged conanfiles are not in the working tree,
+                # but there are only a few of them
+                self.recipesIndex = {}
+                for p in recipes:
+                    conanfileContent = self.getGitObjectsReader().read(
+                        f":recipes/{p}/conanfile.py"
+                    )
+                    if conanfileContent is not None:
+                        self.recipesIndex[p] = recipes_index.parseConanfile(
+                            conanfileContent.decode("utf-8", errors="replace")
+                        )
+            else:
+                # conanfiles are parsed (once) into the index,
+                # so they don't need to be read during verification
+                self.recipesIndex = loadRecipesIndex(
+                    self.repositoryPath,
+                    getDefaultIndexFile(self.repositoryPath) if self.useCache else None,
+                    recipes
+                )
+        return self.recipesIndex
+
+    # raises OSError if Git fails
+    def getChangedRecipes(
+        self,
+        sinceRevision: str,
+        recipes: typing.Optional[typing.List[str]] = None
+    ) -> typing.List[str]:
+        if recipes is None:
+            recipes = self.getRecipes()
+        if not self.recipesIndex:
+            self.loadRecipesIndex(recipes)
+        with profiler.phase("getting changed recipes"):
+            affectedRecipes = getAffectedRecipes(
+                getChangedPaths(self.repositoryPath, sinceRevision, "HEAD"),
+                self.recipesIndex
+            )
+        return [p for p in recipes if p in affectedRecipes]
+
+    # the recipes that have staged changes (including their versions files
+    # and `common/cmake` files they use), no matter if there are such folders
+    # in the working tree; raises OSError if Git fails
+    def getStagedRecipes(self) -> typing.List[str]:
+        with profiler.phase("getting changed recipes"):
+            affectedRecipes = getAffectedRecipes(
+                getChangedPaths(self.repositoryPath, "HEAD", None),
+                # `export_sources()` patterns are taken from the working tree,
+                # as they are needed for all the recipes and rarely change
+                loadRecipesIndex(
+                    self.repositoryPath,
+                    getDefaultIndexFile(self.repositoryPath) if self.useCache else None
+                )
+            )
+        return sorted(affectedRecipes)
+
+    # raises OSError if the index could not be written as a tree
+    def resolveActualHashes(self) -> None:
+        if self.worktreeMode:
+            return
+        if self.stagedMode:
+            with profiler.phase("writing the index tree"):
+                self.revision = writeIndexTree(self.repositoryPath)
+        # resolve all the recipes hashes at once; whatever is missing here
+        # will be resolved (or fail) individually later, and since HEAD
+        # might have moved since the previous check, this is done every time
+        with profiler.phase(
+            f"resolving hashes from {'index' if self.stagedMode else 'HEAD'}"
+        ):
+            self.actualHashes = getRevParseHashes(
+                self.repositoryPath,
+                self.revision,
+                "recipes"
+            )
+
+    def getActualHash(self, p: str) -> typing.Optional[str]:
+        if self.worktreeMode:
+            return self.worktreeHasher.getTreeHash(f"recipes/{p}")
+        actualHash = self.actualHashes.get(f"recipes/{p}")
+        if actualHash is None:
+            actualHash = getRevParseHash(
+                self.repositoryPath,
+                self.revision,
+                f"recipes/{p}"
+            )
+        return actualHash
+
+    def verifyRecipe(self, p: str) -> RecipeResult:
+        version: typing.Optional[str] = None
+        statedHash: typing.Optional[str] = None
+        actualHash: typing.Optional[str] = None
+        hashIsValid: bool = False
+        isProblematic: bool = False
+        recipeVersion: int = 0
+        errors: typing.List[str] = []
+        warnings: typing.List[str] = []
+
+        def reportError(message: str) -> None:
+            logging.error(message)
+            errors.append(message)
+
+        def reportWarning(message: str) -> None:
+            logging.warning(message)
+            warnings.append(message)
+
+        logging.debug(f"Processing recipe [{p}]")
+
+        recipeMetadata: typing.Optional[RecipeMetadata] = self.recipesIndex.get(p)
+        if recipeMetadata is None:
+            isProblematic = True
+            reportError(f"Recipe [{p}] has no conanfile")
+        else:
+            if recipeMetadata.error is not None:
+                reportError(recipeMetadata.error)
+
+            if recipeMetadata.version is not None:
+                version = recipeMetadata.version
+                logging.debug(f"- found version value: {version}")
+            else:
+                isProblematic = True
+                reportError("Could not find a version value")
+
+            if recipeMetadata.recipeVersion != 0:
+                recipeVersion = recipeMetadata.recipeVersion
+                logging.debug(f"- also found recipe version value: {recipeVersion}")
+
+        if version is not None:
+            with profiler.phase("loading versions files"):
+                versionsFileContent = self.loadVersionsFile(p)
+            if versionsFileContent is None:
+                isProblematic = True
+                reportError(f"Recipe [{p}] has no versions file")
+            else:
+                for v in versionsFileContent["versions"]:
+                    versionsFileVersion: str = v.get("version")
+                    versionsFilerecipeVersion: typing.Optional[int] = 0
+                    foundMatchingVersion: bool = False
+                    if versionsFileVersion is None:
+                        reportWarning(
+                            " ".join((
+                                f"Recipe [{p}] is missing one of the version values",
+                                "in its versions file"
+                            ))
+                        )
+                    else:
+                        versionsFilerecipeVersion = v.get("recipe-version", 0)
+                    if (
+                        version == versionsFileVersion
+                        and
+                        recipeVersion == versionsFilerecipeVersion
+                    ):
+                        foundMatchingVersion = True
+
+                        # stated hash is read from the recipe versions file
+                        statedHash = v.get("git-tree", statedHash)
+
+                        # actual hash is taken from HEAD or calculated
+                        # from the working tree
+                        try:
+                            with profiler.phase("getting actual hashes"):
+                                actualHash = self.getActualHash(p)
+                            # both stated and actual hash values can be None,
+                            # so comparing them not only will be useless
+                            # but also incorrect, as None == None
+                            if actualHash is None:
+                                isProblematic = True
+                            elif (
+                                actualHash != statedHash
+                            ):
+                                isProblematic = True
+                            else:
+                                hashIsValid = True
+                        except Exception as ex:
+                            isProblematic = True
+                            reportError(str(ex))
+
+                        break
+                if not foundMatchingVersion:
+                    isProblematic = True
+                    reportError(
+                        " ".join((
+                            f"Version [{version}#{recipeVersion}] for the recipe",
+                            f"[{p}] is not present in its versions file"
+                        ))
+                    )
+
+        if version is not None and recipeVersion != 0:
+            version = f"{version}#{recipeVersion}"
+        return RecipeResult(
+            p,
+            version,
+            statedHash,
+            actualHash,
+            hashIsValid,
+            isProblematic,
+            errors,
+            warnings
+        )
+
+    def getRecipeCacheKey(self, p: str) -> typing.Optional[typing.List[str]]:
+        # a recipe result can be reused only if its tree, its versions file
+        # and the baseline are exactly the same as they were at that time,
+        # plus in HEAD mode the conanfile is read from the working tree,
+        # so it needs to be the same too; all of that is decided by stat
+        # where possible, so unchanged files are not even read
+        keyParts: typing.List[typing.Optional[str]] = [
+            "worktree" if self.worktreeMode else "HEAD"
+        ]
+        try:
+            if self.worktreeMode:
+                keyParts.append(self.worktreeHasher.getTreeHash(f"recipes/{p}"))
+            else:
+                keyParts.append(self.actualHashes.get(f"recipes/{p}"))
+            for f in (
+                f"recipes/{p}/conanfile.py",
+                f"versions/{p[0]}-/{p}.json",
+                "versions/baseline.json"
+            ):
+                fStat = os.stat(self.repositoryPath / f)
+                keyParts.append(
+                    self.worktreeHasher.getBlobHash(f, fStat)
+                    if stat.S_ISREG(fStat.st_mode)
+                    else None
+                )
+        except OSError:
+            return None
+        if None in keyParts:
+            return None
+        return typing.cast(typing.List[str], keyParts)
+
+    def verifyRecipeCached(self, p: str) -> RecipeResult:
+        with profiler.phase(p, "recipe"):
+            with profiler.phase("getting cache keys"):
+                recipeCacheKey = (
+                    self.getRecipeCacheKey(p)
+                    if self.resultsCache.isEnabled
+                    else None
+                )
+            if recipeCacheKey is not None:
+                cachedRecipe = self.resultsCache.get(p, recipeCacheKey)
+                if cachedRecipe is not None:
+                    logging.debug(
+                        f"Recipe [{p}] has not changed, reusing its previous result"
+                    )
+                    return cachedRecipe
+
+            recipe = self.verifyRecipe(p)
+            if recipeCacheKey is not None:
+                self.resultsCache.put(p, recipeCacheKey, recipe)
+            return recipe
+
+    def verifyRecipes(
+        self,
+        recipes: typing.Optional[typing.List[str]] = None,
+        jobsCnt: int = 1
+    ) -> typing.Iterator[RecipeResult]:
+        if recipes is not None and not recipes:
+            return
+        self.resolveActualHashes()
+        if self.stagedMode:
+            # a recipe that is staged for deletion has nothing to verify
+            recipes = [
+                p for p in (recipes if recipes is not None else self.getRecipes())
+                if f"recipes/{p}" in self.actualHashes
+            ]
+        elif recipes is None:
+            recipes = self.getRecipes()
+        self.loadRecipesIndex(recipes)
+
+        try:
+            if jobsCnt == 1 or len(recipes) < 2:
+                for p in recipes:
+                    yield self.verifyRecipeCached(p)
+                return
+
+            logging.debug(f"Verifying recipes with {jobsCnt} parallel jobs")
+            recipesLogBuffer = ThreadLogBuffer()
+            for h in logging.getLogger().handlers:
+                h.addFilter(recipesLogBuffer)
+            try:
+                # threads are enough here, as most of the time is spent
+                # either in Git subprocesses or in hashing (which releases GIL),
+                # and `map()` yields results in the same order as recipes were given
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=jobsCnt
+                ) as pool:
+                    for recipe, recipeLogRecords in pool.map(
+                        lambda p: recipesLogBuffer.collect(
+                            self.verifyRecipeCached,
+                            p
+                        ),
+                        recipes
+                    ):
+                        # log records are replayed from the consuming thread,
+                        # so they come in the same order as with a single job
+                        for r in recipeLogRecords:
+                            logging.getLogger().handle(r)
+                        yield recipe
+            finally:
+                for h in logging.getLogger().handlers:
+                    h.removeFilter(recipesLogBuffer)
+        finally:
+            self.closeGitObjectsReader()
+            self.saveCaches()
+
+    def saveCaches(self) -> None:
+        logging.debug(
+            f"Hashed {self.worktreeHasher.hashedFilesCnt} files from the working tree"
+        )
+        try:
+            with profiler.phase("saving caches"):
+                self.worktreeHasher.saveCache()
+                self.resultsCache.save()
+        except OSError as ex:
+            logging.warning(f"Could not save the cache: {ex}")
+
+    def auditRecipeHistory(
+        self,
+        p: str,
+        historicalTrees: typing.Dict[typing.Tuple[str, str], str],
+        gitObjectsReader: GitObjectsReader
+    ) -> typing.List[HistoryAuditResult]:
+        auditResults: typing.List[HistoryAuditResult] = []
+        versionsFile: pathlib.Path = self.getVersionsFile(p)
+        if not versionsFile.is_file():
+            logging.error(f"Recipe [{p}] has no versions file")
+            return [HistoryAuditResult(p, None, None, None, "no versions file")]
+        with open(versionsFile, "r") as f:
+            versionsFileContent = json.load(f)
+
+        for v in versionsFileContent["versions"]:
+            version: typing.Optional[str] = v.get("version")
+            recipeVersion: int = v.get("recipe-version", 0)
+            gitTree: typing.Optional[str] = v.get("git-tree")
+            versionString = (
+                f"{version}#{recipeVersion}"
+                if version is not None and recipeVersion != 0
+                else version
+            )
+            if version is None or gitTree is None:
+                auditResults.append(
+                    HistoryAuditResult(
+                        p,
+                        versionString,
+                        gitTree,
+                        None,
+                        "incomplete entry"
+                    )
+                )
+                continue
+
+            commit = historicalTrees.get((p, gitTree))
+            if commit is None:
+                auditResults.append(
+                    HistoryAuditResult(
+                        p,
+                        versionString,
+                        gitTree,
+                        None,
+                        "not found in history"
+                    )
+                )
+                continue
+
+            # the tree is there, but it should also be that very version
+            conanfileContent = gitObjectsReader.read(f"{gitTree}:conanfile.py")
+            if conanfileContent is None:
+                auditResults.append(
+                    HistoryAuditResult(
+                        p,
+                        versionString,
+                        gitTree,
+                        commit,
+                        "no conanfile"
+                    )
+                )
+                continue
+            recipeMetadata = recipes_index.parseConanfile(
+                conanfileContent.decode("utf-8", errors="replace")
+            )
+            if (
+                recipeMetadata.version != version
+                or
+                recipeMetadata.recipeVersion != recipeVersion
+            ):
+                auditResults.append(
+                    HistoryAuditResult(
+                        p,
+                        versionString,
+                        gitTree,
+                        commit,
+                        " ".join((
+                            "tree has version",
+                            f"{recipeMetadata.version}#{recipeMetadata.recipeVersion}"
+                        ))
+                    )
+                )
+                continue
+
+            auditResults.append(
+                HistoryAuditResult(p, versionString, gitTree, commit, None)
+            )
+        return auditResults
+
+    # the history is collected right away (and raises OSError if Git fails),
+    # while the versions are audited lazily, one recipe at a time
+    def auditHistory(
+        self,
+        recipes: typing.Optional[typing.List[str]] = None
+    ) -> typing.Iterator[HistoryAuditResult]:
+        if recipes is None:
+            recipes = self.getRecipes()
+        with profiler.phase("collecting historical trees"):
+            historicalTrees = getHistoricalTrees(
+                self.repositoryPath,
+                "HEAD",
+                "recipes"
+            )
+
+        def auditRecipes() -> typing.Iterator[HistoryAuditResult]:
+            gitObjectsReader = GitObjectsReader(self.repositoryPath)
+            try:
+                for p in recipes:
+                    with profiler.phase(p, "recipe"):
+                        recipeAuditResults = self.auditRecipeHistory(
+                            p,
+                            historicalTrees,
+                            gitObjectsReader
+                        )
+                    yield from recipeAuditResults
+            finally:
+                gitObjectsReader.close()
+
+        return auditRecipes()
+
+
+class VersionsFixer:
+    # fixes are prepared per recipe, but all the files
+    # are written only in the end, and all at once
+    def __init__(self, registryChecker: RegistryChecker):
+        self.registryChecker: RegistryChecker = registryChecker
+        self.fixedVersionsFiles: typing.Dict[pathlib.Path, str] = {}
+        self.baselineFile: pathlib.Path = (
+            registryChecker.repositoryPath / "versions" / "baseline.json"
+        )
+        with open(self.baselineFile, "r") as f:
+            self.baseline: typing.Dict[str, typing.Any] = json.load(f)
+        self.baselineIsChanged: bool = False
+
+    # the version has to be taken from the same tree as the hash,
+    # otherwise a changed but not committed conanfile would get
+    # its version paired with the tree from HEAD (or from the index)
+    def getRecipeMetadata(
+        self,
+        p: str,
+        actualHash: str
+    ) -> typing.Optional[RecipeMetadata]:
+        if self.registryChecker.worktreeMode:
+            return self.registryChecker.recipesIndex.get(p)
+        conanfileContent = self.registryChecker.getGitObjectsReader().read(
+            f"{actualHash}:conanfile.py"
+        )
+        if conanfileContent is None:
+            return None
+        return recipes_index.parseConanfile(
+            conanfileContent.decode("utf-8", errors="replace")
+        )
+
+    def fix(self, r: RecipeResult) -> bool:
+        if r.name not in self.registryChecker.recipesIndex:
+            return False
+        # the recipe might not even have gotten to the hash calculation
+        try:
+            actualHash = r.actualHash or self.registryChecker.getActualHash(r.name)
+        except Exception as ex:
+            logging.error(ex)
+            return False
+        if actualHash is None:
+            return False
+        try:
+            recipeMetadata = self.getRecipeMetadata(r.name, actualHash)
+        except Exception as ex:
+            logging.error(ex)
+            return False
+        if recipeMetadata is None or recipeMetadata.version is None:
+            return False
+
+        versionsFile = self.registryChecker.getVersionsFile(r.name)
+        versionsFileContent: typing.Dict[str, typing.Any] = {"versions": []}
+        if versionsFile.is_file():
+            with open(versionsFile, "r") as f:
+                versionsFileContent = json.load(f)
+        versionsFileEntry: typing.Optional[typing.Dict[str, typing.Any]] = next(
+            (
+                v for v in versionsFileContent["versions"]
+                if v.get("version") == recipeMetadata.version
+                and
+                v.get("recipe-version", 0) == recipeMetadata.recipeVersion
+            ),
+            None
+        )
+        if versionsFileEntry is None:
+            versionsFileEntry = {"version": recipeMetadata.version}
+            if recipeMetadata.recipeVersion != 0:
+                versionsFileEntry["recipe-version"] = recipeMetadata.recipeVersion
+            versionsFileContent["versions"].append(versionsFileEntry)
+        versionsFileEntry["git-tree"] = actualHash
+        self.fixedVersionsFiles[versionsFile] = (
+            f"{dumpVersionsJson(versionsFileContent)}\n"
+        )
+
+        baselineEntry = {
+            "baseline": recipeMetadata.version,
+            "recipe-version": recipeMetadata.recipeVersion
+        }
+        baselineRecipes = self.baseline.setdefault("default", {})
+        if baselineRecipes.get(r.name) != baselineEntry:
+            baselineRecipes[r.name] = baselineEntry
+            self.baseline["default"] = dict(sorted(baselineRecipes.items()))
+            self.baselineIsChanged = True
+
+        r.statedHash = actualHash
+        r.actualHash = actualHash
+        r.hashIsValid = True
+        r.isProblematic = False
+        logging.info(f"Fixing versions file of the recipe [{r.name}]")
+        return True
+
+    # raises OSError if the files could not be written
+    def write(self) -> None:
+        if self.baselineIsChanged:
+            self.fixedVersionsFiles[self.baselineFile] = (
+                f"{dumpVersionsJson(self.baseline)}\n"
+            )
+            self.baselineIsChanged = False
+        if self.fixedVersionsFiles:
+            writeFilesAtomically(self.fixedVersionsFiles)
+            self.fixedVersionsFiles = {}
+
+
+# the simplest way to use this module: verifies the given recipes
+# (or all of them) and yields the results as soon as they are ready;
+# raises FileNotFoundError if the path is not a registry
+def verifyRegistry(
+    repositoryPath: pathlib.Path,
+    recipes: typing.Optional[typing.List[str]] = None,
+    worktreeMode: bool = False,
+    useCache: bool = True,
+    jobsCnt: int = 1,
+    stagedMode: bool = False
+) -> typing.Iterator[RecipeResult]:
+    registryChecker = RegistryChecker(
+        repositoryPath,
+        worktreeMode,
+        useCache,
+        stagedMode
+    )
+    return registryChecker.verifyRecipes(recipes, jobsCnt)
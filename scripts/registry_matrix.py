@@ -0,0 +1,684 @@
+import time
+import logging
+import pathlib
+import subprocess
+import concurrent.futures
+import os
+import json
+import itertools
+import contextlib
+
+import typing
+
+from registry_builder import (
+    BuildResult,
+    RegistryBuilder,
+    getBuildLevels
+)
+
+# building recipes of the registry across a matrix of configurations
+# (profiles, settings and options), skipping the combinations that already
+# have a binary in the local Conan cache:
+#
+#     matrixBuilder = registry_matrix.MatrixBuilder(
+#         pathlib.Path("/path/to/registry"),
+#         registry_matrix.getMatrixConfigurations(
+#             ["default"],
+#             [("build_type", ["Debug", "Release"])],
+#             [("*:shared", ["True", "False"])]
+#         ),
+#         jobsCnt=4
+#     )
+#     for r in matrixBuilder.buildMatrix():
+#         print(r.name, r.configuration, r.status)
+#
+# every combination is looked up in two places before building it:
+#
+# 1. the matrix store, which remembers the package reference and ID
+#    of every combination that was built (or found) before, along with
+#    the fingerprints of the recipe and all its dependencies from the registry;
+#    if those have not changed, it only takes one `conan list` per recipe
+#    to make sure that the package is still in the cache;
+# 2. the Conan cache itself, for which the recipes are exported
+#    and `conan graph info` resolves the package ID of every combination
+#
+# only the combinations that are still missing after that are built,
+# in parallel and in the order of their dependencies
+
+# bump it whenever the fingerprints or the store structure change
+matrixStoreFormat: int = 1
+
+
+class MatrixResult:
+    __slots__ = (
+        "name",
+        "configuration",
+        "status",
+        "cacheHit",
+        "reference",
+        "packageId",
+        "duration",
+        "logFile",
+        "failedDependency"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        configuration: str,
+        status: str,
+        cacheHit: typing.Optional[str] = None,
+        reference: typing.Optional[str] = None,
+        packageId: typing.Optional[str] = None,
+        duration: float = 0.0,
+        logFile: typing.Optional[pathlib.Path] = None,
+        failedDependency: typing.Optional[str] = None
+    ):
+        self.name: str = name
+        self.configuration: str = configuration
+        # cached, built, failed, skipped, or invalid (the recipe
+        # does not support this configuration)
+        self.status: str = status
+        # for cached ones, where the package was found: store or conan
+        self.cacheHit: typing.Optional[str] = cacheHit
+        self.reference: typing.Optional[str] = reference
+        self.packageId: typing.Optional[str] = packageId
+        self.duration: float = duration
+        self.logFile: typing.Optional[pathlib.Path] = logFile
+        # for skipped recipes, which dependency has failed
+        self.failedDependency: typing.Optional[str] = failedDependency
+
+    def toDict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "recipe": self.name,
+            "configuration": self.configuration,
+            "status": self.status,
+            "cacheHit": self.cacheHit,
+            "reference": self.reference,
+            "packageId": self.packageId,
+            "duration": round(self.duration, 3),
+            "logFile": str(self.logFile) if self.logFile is not None else None,
+            "failedDependency": self.failedDependency
+        }
+
+
+# expands the grid into the list of Conan arguments for every combination;
+# settings and options are pairs of a name and its values, such as
+# ("build_type", ["Debug", "Release"]) or ("*:shared", ["True", "False"])
+def getMatrixConfigurations(
+    profiles: typing.List[str],
+    settings: typing.List[typing.Tuple[str, typing.List[str]]],
+    options: typing.List[typing.Tuple[str, typing.List[str]]],
+    commonArgs: typing.Optional[typing.List[str]] = None
+) -> typing.List[typing.List[str]]:
+    axes: typing.List[typing.List[typing.List[str]]] = []
+    if profiles:
+        axes.append([["-pr:h", pr] for pr in profiles])
+    for name, values in settings:
+        axes.append([["-s", f"{name}={v}"] for v in values])
+    for name, values in options:
+        axes.append([["-o", f"{name}={v}"] for v in values])
+    return [
+        [a for args in combination for a in args] + (commonArgs or [])
+        for combination in itertools.product(*axes)
+    ]
+
+
+def getDefaultMatrixStoreFile(repositoryPath: pathlib.Path) -> pathlib.Path:
+    return repositoryPath / ".cache" / "matrix-store.json"
+
+
+# the store maps a configuration (its Conan arguments) to the packages
+# of the recipes that were built or found with it
+def loadMatrixStore(
+    matrixStoreFile: pathlib.Path
+) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    if not matrixStoreFile.is_file():
+        return {}
+    try:
+        with open(matrixStoreFile, "r") as f:
+            matrixStore = json.load(f)
+    except (OSError, ValueError) as ex:
+        logging.warning(f"Could not load the matrix store: {ex}")
+        return {}
+    if matrixStore.get("format") != matrixStoreFormat:
+        return {}
+    return matrixStore.get("configurations", {})
+
+
+def saveMatrixStore(
+    matrixStoreFile: pathlib.Path,
+    configurations: typing.Dict[str, typing.Dict[str, typing.Any]]
+) -> None:
+    matrixStoreFile.parent.mkdir(parents=True, exist_ok=True)
+    matrixStoreFileTmp = matrixStoreFile.with_name(f"{matrixStoreFile.name}.tmp")
+    with open(matrixStoreFileTmp, "w") as f:
+        json.dump(
+            {
+                "format": matrixStoreFormat,
+                "configurations": configurations
+            },
+            f,
+            indent=4,
+            sort_keys=True
+        )
+    os.replace(matrixStoreFileTmp, matrixStoreFile)
+
+
+class MatrixBuilder(RegistryBuilder):
+    def __init__(
+        self,
+        repositoryPath: pathlib.Path,
+        configurations: typing.List[typing.List[str]],
+        jobsCnt: int = 1,
+        logsFolder: typing.Optional[pathlib.Path] = None,
+        conanCommand: str = "conan",
+        buildStateFile: typing.Optional[pathlib.Path] = None,
+        matrixStoreFile: typing.Optional[pathlib.Path] = None,
+        jobTokens: typing.Optional[int] = None
+    ):
+        super().__init__(
+            repositoryPath,
+            jobsCnt,
+            logsFolder,
+            conanCommand,
+            None,
+            buildStateFile,
+            jobTokens
+        )
+        self.configurations: typing.List[typing.List[str]] = configurations
+        self.matrixStoreFile: pathlib.Path = (
+            matrixStoreFile
+            if matrixStoreFile is not None
+            else getDefaultMatrixStoreFile(repositoryPath)
+        )
+        self.matrixStore: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        # how long every stage of the last `buildMatrix()` took
+        self.stageDurations: typing.Dict[str, float] = {}
+
+    # the same as the configurations of build-recipes and plan-rebuild,
+    # so the builds of the matrix are recorded in the same build state
+    def getConfigurationName(self, i: int) -> str:
+        return " ".join(self.configurations[i])
+
+    # numbered, so the log files and output prefixes stay short
+    def getTaskName(self, p: str, i: int) -> str:
+        return f"{p}-{i + 1}"
+
+    # for the failures that happen before the build, as the log
+    # is where failures are looked at
+    def writeTaskLog(self, p: str, i: int, text: str) -> pathlib.Path:
+        self.logsFolder.mkdir(parents=True, exist_ok=True)
+        logFile = self.logsFolder / f"{self.getTaskName(p, i)}.log"
+        logFile.write_text(f"{text}\n", encoding="utf-8")
+        return logFile
+
+    # the recipe and all the recipes of the registry it depends on
+    def getClosure(self, p: str) -> typing.List[str]:
+        closure: typing.Set[str] = set()
+        stack: typing.List[str] = [p]
+        while stack:
+            d = stack.pop()
+            if d not in closure:
+                closure.add(d)
+                stack.extend(self.dependencyGraph.get(d, []))
+        return sorted(closure)
+
+    def runConan(self, args: typing.List[str]) -> typing.Any:
+        cmdResult = subprocess.run(
+            [self.conanCommand, *args, "--format", "json"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace"
+        )
+        if cmdResult.returncode != 0:
+            raise OSError(
+                "".join((
+                    f"The command was: {' '.join(cmdResult.args)}\n",
+                    f"Output: {cmdResult.stderr.strip()}"
+                ))
+            )
+        return json.loads(cmdResult.stdout)
+
+    # exports the recipes in the order of their dependencies, as recipes
+    # with `python_requires` cannot be loaded until those are exported;
+    # returns the references with revisions and the errors
+    def exportRecipes(
+        self,
+        recipes: typing.Iterable[str]
+    ) -> typing.Tuple[typing.Dict[str, str], typing.Dict[str, str]]:
+        references: typing.Dict[str, str] = {}
+        errors: typing.Dict[str, str] = {}
+
+        def exportRecipe(p: str) -> str:
+            failedDependency = next(
+                (d for d in self.dependencyGraph.get(p, []) if d in errors),
+                None
+            )
+            if failedDependency is not None:
+                raise OSError(f"Dependency [{failedDependency}] has failed to export")
+            logging.debug(f"Exporting [{p}]")
+            return self.runConan(
+                ["export", str(self.repositoryPath / "recipes" / p)]
+            )["reference"]
+
+        with concurrent.futures.ThreadPoolExecutor(self.jobsCnt) as executor:
+            for level in getBuildLevels(self.dependencyGraph, recipes):
+                futures = {executor.submit(exportRecipe, p): p for p in level}
+                for f in concurrent.futures.as_completed(futures):
+                    p = futures[f]
+                    try:
+                        references[p] = f.result()
+                    except (OSError, ValueError, KeyError) as ex:
+                        errors[p] = str(ex)
+        return references, errors
+
+    # the binary status of the package in the graph (Cache, Missing,
+    # Download, Invalid and so on) and its package ID
+    def getPackageBinary(
+        self,
+        reference: str,
+        conanArgs: typing.List[str]
+    ) -> typing.Tuple[str, typing.Optional[str]]:
+        graph = self.runConan(
+            ["graph", "info", f"--requires={reference}", *conanArgs]
+        )
+        for node in graph["graph"]["nodes"].values():
+            if node.get("ref") == reference and node.get("context") == "host":
+                return node.get("binary") or "Missing", node.get("package_id")
+        raise ValueError(f"There is no [{reference}] in the dependency graph")
+
+    # the same as `getPackageBinary()`, but never raises, and also
+    # returns the error (if any) and how long it took
+    def checkPackage(
+        self,
+        reference: str,
+        conanArgs: typing.List[str]
+    ) -> typing.Tuple[typing.Optional[str], typing.Optional[str], typing.Optional[str], float]:
+        startTime = time.perf_counter()
+        try:
+            binary, packageId = self.getPackageBinary(reference, conanArgs)
+        except (OSError, ValueError, KeyError) as ex:
+            return None, None, str(ex), time.perf_counter() - startTime
+        return binary, packageId, None, time.perf_counter() - startTime
+
+    # the same as `conan create`, but without exporting the recipe again,
+    # as Conan does not like the same recipe being exported by several
+    # processes at once, and that is what parallel combinations would do
+    def getBuildCommands(
+        self,
+        p: str,
+        reference: str,
+        conanArgs: typing.List[str],
+        jobs: typing.Optional[int] = None
+    ) -> typing.List[typing.List[str]]:
+        commands: typing.List[typing.List[str]] = [
+            [
+                self.conanCommand,
+                "install",
+                f"--requires={reference}",
+                *conanArgs,
+                # dependencies from outside the registry might be missing too
+                "--build=missing",
+                # otherwise they would be written to the current folder
+                "--envs-generation=false",
+                *self.getJobsArgs(jobs)
+            ]
+        ]
+        testPackagePath = self.repositoryPath / "recipes" / p / "test_package"
+        if testPackagePath.is_dir():
+            commands.append(
+                [
+                    self.conanCommand,
+                    "test",
+                    str(testPackagePath),
+                    reference,
+                    *conanArgs
+                ]
+            )
+        return commands
+
+    # IDs of the packages of this recipe revision that are in the Conan cache
+    def getCachedPackages(self, reference: str) -> typing.Set[str]:
+        name, _, revision = reference.partition("#")
+        listing = self.runConan(["list", f"{reference}:*"])
+        return set(
+            listing.get("Local Cache", {})
+            .get(name, {})
+            .get("revisions", {})
+            .get(revision, {})
+            .get("packages", {})
+        )
+
+    def recordPackage(
+        self,
+        p: str,
+        i: int,
+        fingerprint: typing.Dict[str, typing.Any],
+        reference: str,
+        packageId: str,
+        isInvalid: bool = False
+    ) -> None:
+        self.matrixStore.setdefault(self.getConfigurationName(i), {})[p] = {
+            "fingerprint": fingerprint,
+            "reference": reference,
+            "packageId": packageId,
+            # the recipe does not support this configuration, and that
+            # will not change until the recipe itself does
+            "invalid": isInvalid
+        }
+        try:
+            saveMatrixStore(self.matrixStoreFile, self.matrixStore)
+        except OSError as ex:
+            logging.warning(f"Could not save the matrix store: {ex}")
+
+    # builds the missing combinations of the recipes (all of them by default)
+    # and yields the results as soon as they are ready, starting
+    # with the combinations that are already in the cache
+    def buildMatrix(
+        self,
+        recipes: typing.Optional[typing.Iterable[str]] = None,
+        onOutput: typing.Optional[typing.Callable[[str, str], None]] = None
+    ) -> typing.Iterator[MatrixResult]:
+        # packages of python_requires have no binaries, they only
+        # need to be exported, which is done for their dependents anyway
+        matrixRecipes: typing.List[str] = [
+            p for p in sorted(recipes if recipes is not None else self.recipesIndex)
+            if self.recipesIndex[p].packageType != "python-require"
+        ]
+        # fails early on cycles
+        buildLevels = getBuildLevels(self.dependencyGraph, matrixRecipes)
+        self.stageDurations = {"store": 0.0, "conan": 0.0, "build": 0.0}
+
+        # a package needs to be rebuilt when its recipe changes,
+        # and also when any of the recipes it depends on does
+        fingerprints: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+            p: self.getRecipeFingerprint(p) for p in self.recipesIndex
+        }
+        self.worktreeHasher.saveCache()
+        closureFingerprints: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+            p: {d: fingerprints[d] for d in self.getClosure(p)}
+            for p in matrixRecipes
+        }
+
+        results: typing.Dict[typing.Tuple[str, int], MatrixResult] = {}
+        tasks: typing.List[typing.Tuple[str, int]] = [
+            (p, i)
+            for i in range(len(self.configurations))
+            for p in matrixRecipes
+        ]
+
+        # --- 1. the matrix store
+
+        startTime = time.perf_counter()
+        self.matrixStore = loadMatrixStore(self.matrixStoreFile)
+        storedPackages: typing.Dict[typing.Tuple[str, int], typing.Dict[str, str]] = {}
+        for p, i in tasks:
+            stored = self.matrixStore.get(self.getConfigurationName(i), {}).get(p)
+            if stored is not None and stored.get("fingerprint") == closureFingerprints[p]:
+                storedPackages[(p, i)] = stored
+
+        cachedPackages: typing.Dict[str, typing.Set[str]] = {}
+        for reference in sorted(set(
+            s["reference"] for s in storedPackages.values() if not s.get("invalid")
+        )):
+            try:
+                cachedPackages[reference] = self.getCachedPackages(reference)
+            except (OSError, ValueError) as ex:
+                logging.warning(f"Could not list the packages of [{reference}]: {ex}")
+        self.stageDurations["store"] = time.perf_counter() - startTime
+
+        for (p, i), stored in sorted(storedPackages.items()):
+            if stored.get("invalid"):
+                results[(p, i)] = MatrixResult(
+                    p,
+                    self.getConfigurationName(i),
+                    "invalid",
+                    reference=stored["reference"],
+                    packageId=stored["packageId"]
+                )
+                yield results[(p, i)]
+            elif stored["packageId"] in cachedPackages.get(stored["reference"], set()):
+                results[(p, i)] = MatrixResult(
+                    p,
+                    self.getConfigurationName(i),
+                    "cached",
+                    "store",
+                    stored["reference"],
+                    stored["packageId"]
+                )
+                yield results[(p, i)]
+
+        # --- 2. the Conan cache
+
+        startTime = time.perf_counter()
+        unresolved: typing.List[typing.Tuple[str, int]] = [
+            t for t in tasks if t not in results
+        ]
+        references: typing.Dict[str, str] = {}
+        exportErrors: typing.Dict[str, str] = {}
+        if unresolved:
+            references, exportErrors = self.exportRecipes(
+                set(d for p, _ in unresolved for d in self.getClosure(p))
+            )
+            for p, error in sorted(exportErrors.items()):
+                logging.error(f"Could not export [{p}]: {error}")
+
+        missingPackages: typing.Dict[typing.Tuple[str, int], typing.Optional[str]] = {}
+        with concurrent.futures.ThreadPoolExecutor(self.jobsCnt) as executor:
+            futures: typing.Dict[concurrent.futures.Future, typing.Tuple[str, int]] = {}
+            for p, i in unresolved:
+                if p in exportErrors:
+                    results[(p, i)] = MatrixResult(
+                        p,
+                        self.getConfigurationName(i),
+                        "failed",
+                        logFile=self.writeTaskLog(p, i, exportErrors[p])
+                    )
+                    yield results[(p, i)]
+                elif any(d in exportErrors for d in self.getClosure(p)):
+                    results[(p, i)] = MatrixResult(
+                        p,
+                        self.getConfigurationName(i),
+                        "skipped",
+                        failedDependency=next(
+                            d for d in self.getClosure(p) if d in exportErrors
+                        )
+                    )
+                    yield results[(p, i)]
+                else:
+                    futures[
+                        executor.submit(
+                            self.checkPackage,
+                            references[p],
+                            self.configurations[i]
+                        )
+                    ] = (p, i)
+            for f in concurrent.futures.as_completed(futures):
+                p, i = futures[f]
+                binary, packageId, error, duration = f.result()
+                if error is not None:
+                    results[(p, i)] = MatrixResult(
+                        p,
+                        self.getConfigurationName(i),
+                        "failed",
+                        reference=references[p],
+                        duration=duration,
+                        logFile=self.writeTaskLog(p, i, error)
+                    )
+                    yield results[(p, i)]
+                    continue
+                logging.debug(
+                    f"[{p}] with [{self.getConfigurationName(i)}]: {binary} {packageId}"
+                )
+                if binary == "Cache" and packageId is not None:
+                    self.recordPackage(
+                        p,
+                        i,
+                        closureFingerprints[p],
+                        references[p],
+                        packageId
+                    )
+                    results[(p, i)] = MatrixResult(
+                        p,
+                        self.getConfigurationName(i),
+                        "cached",
+                        "conan",
+                        references[p],
+                        packageId,
+                        duration
+                    )
+                    yield results[(p, i)]
+                elif binary == "Invalid":
+                    if packageId is not None:
+                        self.recordPackage(
+                            p,
+                            i,
+                            closureFingerprints[p],
+                            references[p],
+                            packageId,
+                            True
+                        )
+                    results[(p, i)] = MatrixResult(
+                        p,
+                        self.getConfigurationName(i),
+                        "invalid",
+                        reference=references[p],
+                        packageId=packageId,
+                        duration=duration
+                    )
+                    yield results[(p, i)]
+                else:
+                    missingPackages[(p, i)] = packageId
+        self.stageDurations["conan"] = time.perf_counter() - startTime
+
+        # --- 3. the builds
+
+        startTime = time.perf_counter()
+        # combinations whose dependencies could not be resolved
+        # will not build either
+        for level in buildLevels:
+            for p in level:
+                for i in range(len(self.configurations)):
+                    if (p, i) not in missingPackages:
+                        continue
+                    failedDependency = next(
+                        (
+                            d for d in self.dependencyGraph.get(p, [])
+                            if (d, i) in results
+                            and results[(d, i)].status not in ("cached", "built")
+                        ),
+                        None
+                    )
+                    if failedDependency is not None:
+                        del missingPackages[(p, i)]
+                        results[(p, i)] = MatrixResult(
+                            p,
+                            self.getConfigurationName(i),
+                            "skipped",
+                            reference=references[p],
+                            failedDependency=failedDependency
+                        )
+                        yield results[(p, i)]
+
+        dependencies: typing.Dict[typing.Tuple[str, int], typing.List[typing.Tuple[str, int]]] = {
+            (p, i): [
+                (d, i) for d in self.dependencyGraph.get(p, [])
+                if (d, i) in missingPackages
+            ]
+            for p, i in missingPackages
+        }
+
+        def buildTask(
+            t: typing.Tuple[str, int],
+            jobs: typing.Optional[int]
+        ) -> BuildResult:
+            p, i = t
+            logging.info(
+                f"Building [{p}] with [{self.getConfigurationName(i)}]"
+                + (f" (jobs: {jobs})" if jobs is not None else "")
+            )
+            return self.buildRecipe(
+                p,
+                onOutput,
+                self.getBuildCommands(
+                    p,
+                    references[p],
+                    self.configurations[i],
+                    jobs
+                ),
+                self.getTaskName(p, i)
+            )
+
+        with contextlib.closing(
+            self.scheduleBuilds(
+                dependencies,
+                buildTask,
+                lambda t, d: BuildResult(
+                    t[0],
+                    "skipped",
+                    failedDependency=d[0] if d is not None else None
+                )
+            )
+        ) as builds:
+            for (p, i), r in builds:
+                packageId = missingPackages[(p, i)]
+                if r.status == "built":
+                    if packageId is not None:
+                        self.recordPackage(
+                            p,
+                            i,
+                            closureFingerprints[p],
+                            references[p],
+                            packageId
+                        )
+                    self.recordBuild(p, fingerprints[p], self.getConfigurationName(i))
+                results[(p, i)] = MatrixResult(
+                    p,
+                    self.getConfigurationName(i),
+                    r.status,
+                    reference=references[p],
+                    packageId=packageId,
+                    duration=r.duration,
+                    logFile=r.logFile,
+                    failedDependency=r.failedDependency
+                )
+                yield results[(p, i)]
+        self.stageDurations["build"] = time.perf_counter() - startTime
+
+
+# totals of the matrix run, for the summary file
+def getMatrixSummary(
+    results: typing.List[MatrixResult],
+    configurations: typing.List[typing.List[str]],
+    duration: float,
+    stageDurations: typing.Dict[str, float]
+) -> typing.Dict[str, typing.Any]:
+    statuses: typing.Dict[str, int] = {
+        s: 0 for s in ("cached", "built", "failed", "skipped", "invalid")
+    }
+    cacheHits: typing.Dict[str, int] = {"store": 0, "conan": 0}
+    for r in results:
+        statuses[r.status] += 1
+        if r.cacheHit is not None:
+            cacheHits[r.cacheHit] += 1
+    # unsupported combinations are neither hits nor misses
+    checkedCnt = len(results) - statuses["invalid"]
+    return {
+        "configurations": [" ".join(c) for c in configurations],
+        "combinations": len(results),
+        "statuses": statuses,
+        "cacheHits": cacheHits,
+        "hitRate": round(sum(cacheHits.values()) / checkedCnt, 3) if checkedCnt else None,
+        "duration": round(duration, 3),
+        "stageDurations": {s: round(d, 3) for s, d in stageDurations.items()},
+        # how long the builds would have taken one after another
+        "buildDuration": round(
+            sum(r.duration for r in results if r.logFile is not None),
+            3
+        ),
+        "results": [r.toDict() for r in results]
+    }
@@ -0,0 +1,520 @@
+import logging
+import pathlib
+import json
+import os
+import sys
+import stat
+import struct
+import select
+import socket
+import socketserver
+import threading
+import time
+import errno
+
+import typing
+
+from recipes_index import RecipeMetadata
+from registry_checker import (
+    RecipeResult,
+    RegistryChecker,
+    getAffectedRecipes
+)
+
+# keeps verifying the working tree as it changes: file system events
+# (inotify on Linux, or periodic scanning elsewhere) are collected
+# until things calm down, mapped to the recipes they affect, and only
+# those recipes are verified again; the latest results are served
+# over a Unix socket, so editor plugins can get them at any time
+
+# folders (relative to the registry root) that affect verification
+watchedFolders: typing.Tuple[str, ...] = (
+    "recipes",
+    "versions",
+    "common/cmake"
+)
+# ignore files that affect the working tree hashes of all the recipes;
+# the ones outside of the watched folders are watched on their own
+ignoreFiles: typing.Tuple[str, ...] = (
+    ".git/info/exclude",
+    ".gitignore",
+    "recipes/.gitignore"
+)
+
+# events are collected until there were none for this long (in seconds),
+# as editors and Git tend to produce bursts of them
+watchDebounceInterval: float = 0.2
+# how often to scan the folders, when inotify is not available
+watchPollingInterval: float = 1.0
+
+
+class InotifyWatcher:
+    # https://man7.org/linux/man-pages/man7/inotify.7.html
+    IN_MODIFY: int = 0x00000002
+    IN_ATTRIB: int = 0x00000004
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_FROM: int = 0x00000040
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_DELETE_SELF: int = 0x00000400
+    IN_MOVE_SELF: int = 0x00000800
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+    IN_ONLYDIR: int = 0x01000000
+    IN_ISDIR: int = 0x40000000
+    IN_NONBLOCK: int = os.O_NONBLOCK
+    IN_CLOEXEC: int = os.O_CLOEXEC
+
+    watchMask: int = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+        | IN_ONLYDIR
+    )
+
+    # `struct inotify_event` without the name that follows it
+    eventHeader: struct.Struct = struct.Struct("iIII")
+
+    # raises OSError if inotify is not available (or if there are
+    # not enough watches allowed for all the folders)
+    def __init__(self, repositoryPath: pathlib.Path):
+        # imported here, so that other platforms do not pay for it
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6",
+            use_errno=True
+        )
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_init1.restype = ctypes.c_int
+        self.libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32
+        ]
+        self.libc.inotify_add_watch.restype = ctypes.c_int
+
+        self.repositoryPath: pathlib.Path = repositoryPath
+        self.fd: int = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            self.raiseError("Could not initialize inotify")
+        # watch descriptor to the folder path inside the repository
+        self.watches: typing.Dict[int, str] = {}
+        # folders that are watched only for the ignore files in them
+        self.ignoreFilesWatches: typing.Set[int] = set()
+        try:
+            for f in watchedFolders:
+                if (repositoryPath / f).is_dir():
+                    self.addWatches(f)
+            self.addIgnoreFilesWatches()
+        except OSError:
+            self.close()
+            raise
+
+    def raiseError(self, message: str) -> typing.NoReturn:
+        import ctypes
+
+        errorCode = ctypes.get_errno()
+        raise OSError(errorCode, f"{message}: {os.strerror(errorCode)}")
+
+    # watches are not recursive, so every folder needs its own;
+    # returns the paths of everything that is already there
+    def addWatches(self, folderPath: str) -> typing.List[str]:
+        existingPaths: typing.List[str] = []
+        folders: typing.List[str] = [folderPath]
+        while folders:
+            f = folders.pop()
+            wd = self.libc.inotify_add_watch(
+                self.fd,
+                os.fsencode(self.repositoryPath / f),
+                self.watchMask
+            )
+            if wd < 0:
+                import ctypes
+
+                # the folder might be gone already
+                if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                self.raiseError(f"Could not watch [{f}]")
+            self.watches[wd] = f
+            try:
+                with os.scandir(self.repositoryPath / f) as it:
+                    for entry in it:
+                        entryPath = f"{f}/{entry.name}"
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append(entryPath)
+                            existingPaths.append(f"{entryPath}/")
+                        else:
+                            existingPaths.append(entryPath)
+            except OSError:
+                continue
+        return existingPaths
+
+    # these folders are not watched recursively, as everything else
+    # in them is of no interest (and the root one is the whole repository)
+    def addIgnoreFilesWatches(self) -> None:
+        for f in sorted(set(os.path.dirname(p) for p in ignoreFiles)):
+            if not (self.repositoryPath / f).is_dir() or f.startswith(watchedFolders):
+                continue
+            wd = self.libc.inotify_add_watch(
+                self.fd,
+                os.fsencode(self.repositoryPath / f),
+                self.watchMask
+            )
+            if wd < 0:
+                self.raiseError(f"Could not watch [{f or '.'}]")
+            self.watches[wd] = f
+            self.ignoreFilesWatches.add(wd)
+
+    # returns changed paths (folders with a trailing slash), an empty set
+    # if nothing happened within the timeout, or None if events were lost
+    # and anything could have changed
+    def waitForChanges(
+        self,
+        timeout: typing.Optional[float]
+    ) -> typing.Optional[typing.Set[str]]:
+        readyFds, _, _ = select.select([self.fd], [], [], timeout)
+        if not readyFds:
+            return set()
+        changedPaths: typing.Set[str] = set()
+        eventsLost: bool = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, nameLength = self.eventHeader.unpack_from(
+                    buffer,
+                    offset
+                )
+                offset += self.eventHeader.size
+                name = os.fsdecode(
+                    buffer[offset:offset + nameLength].rstrip(b"\0")
+                )
+                offset += nameLength
+
+                if mask & self.IN_Q_OVERFLOW:
+                    eventsLost = True
+                    continue
+                folderPath = self.watches.get(wd)
+                if folderPath is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    # the folder was deleted (or moved away)
+                    del self.watches[wd]
+                    self.ignoreFilesWatches.discard(wd)
+                    continue
+                if wd in self.ignoreFilesWatches:
+                    entryPath = f"{folderPath}/{name}" if folderPath else name
+                    if entryPath in ignoreFiles:
+                        changedPaths.add(entryPath)
+                    continue
+                if not name:
+                    # an event about the watched folder itself
+                    changedPaths.add(f"{folderPath}/")
+                    continue
+                entryPath = f"{folderPath}/{name}"
+                if mask & self.IN_ISDIR:
+                    changedPaths.add(f"{entryPath}/")
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        # files might have been created in the new folder
+                        # before the watch was there
+                        changedPaths.update(self.addWatches(entryPath))
+                else:
+                    changedPaths.add(entryPath)
+        return None if eventsLost else changedPaths
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    # compares stat values of all the files between scans,
+    # which is slower, but works everywhere
+    def __init__(self, repositoryPath: pathlib.Path):
+        self.repositoryPath: pathlib.Path = repositoryPath
+        self.snapshot: typing.Dict[str, typing.Tuple[int, int, int]] = (
+            self.scan()
+        )
+
+    def scan(self) -> typing.Dict[str, typing.Tuple[int, int, int]]:
+        snapshot: typing.Dict[str, typing.Tuple[int, int, int]] = {}
+        folders: typing.List[str] = [
+            f for f in watchedFolders if (self.repositoryPath / f).is_dir()
+        ]
+        while folders:
+            f = folders.pop()
+            try:
+                with os.scandir(self.repositoryPath / f) as it:
+                    for entry in it:
+                        entryPath = f"{f}/{entry.name}"
+                        entryStat = entry.stat(follow_symlinks=False)
+                        if stat.S_ISDIR(entryStat.st_mode):
+                            folders.append(entryPath)
+                            # only presence matters for folders
+                            snapshot[f"{entryPath}/"] = (0, 0, entryStat.st_ino)
+                        else:
+                            snapshot[entryPath] = (
+                                entryStat.st_mtime_ns,
+                                entryStat.st_size,
+                                entryStat.st_ino
+                            )
+            except OSError:
+                continue
+        for p in ignoreFiles:
+            try:
+                entryStat = os.stat(self.repositoryPath / p)
+            except OSError:
+                continue
+            snapshot[p] = (
+                entryStat.st_mtime_ns,
+                entryStat.st_size,
+                entryStat.st_ino
+            )
+        return snapshot
+
+    def waitForChanges(
+        self,
+        timeout: typing.Optional[float]
+    ) -> typing.Optional[typing.Set[str]]:
+        while True:
+            time.sleep(
+                watchPollingInterval
+                if timeout is None
+                else min(timeout, watchPollingInterval)
+            )
+            snapshot = self.scan()
+            changedPaths: typing.Set[str] = set(
+                p for p in snapshot.keys() ^ self.snapshot.keys()
+            )
+            changedPaths.update(
+                p for p, v in snapshot.items()
+                if p in self.snapshot and self.snapshot[p] != v
+            )
+            self.snapshot = snapshot
+            if changedPaths or timeout is not None:
+                return changedPaths
+
+    def close(self) -> None:
+        pass
+
+
+class ResultsRequestHandler(socketserver.StreamRequestHandler):
+    # a request is a single line with names of the recipes to get results for
+    # (separated by spaces), and an empty line means all of them; the response
+    # is a single JSON document, after which the connection is closed
+    timeout = 5
+
+    def handle(self) -> None:
+        try:
+            requestLine = self.rfile.readline(64 * 1024)
+        except OSError:
+            return
+        requestedRecipes = requestLine.decode("utf-8", errors="replace").split()
+        registryWatcher: RegistryWatcher = getattr(self.server, "registryWatcher")
+        # the client might be gone already, which is not a reason
+        # for the server thread to fail with a traceback
+        try:
+            self.wfile.write(
+                json.dumps(
+                    registryWatcher.getStatus(requestedRecipes or None)
+                ).encode()
+            )
+            self.wfile.write(b"\n")
+        except OSError as ex:
+            logging.debug(f"Could not send the results: {ex}")
+            return
+
+
+class ResultsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socketPath: pathlib.Path, registryWatcher: "RegistryWatcher"):
+        self.registryWatcher: RegistryWatcher = registryWatcher
+        super().__init__(socketPath.as_posix(), ResultsRequestHandler)
+
+
+class RegistryWatcher:
+    def __init__(
+        self,
+        registryChecker: RegistryChecker,
+        socketPath: typing.Optional[pathlib.Path],
+        jobsCnt: int = 1
+    ):
+        self.registryChecker: RegistryChecker = registryChecker
+        self.socketPath: typing.Optional[pathlib.Path] = socketPath
+        self.jobsCnt: int = jobsCnt
+        self.lock: threading.Lock = threading.Lock()
+        self.results: typing.Dict[str, RecipeResult] = {}
+        # incremented after every verification, so clients can tell
+        # if anything has been verified since they asked last time
+        self.generation: int = 0
+        self.isVerifying: bool = False
+        self.resultsServer: typing.Optional[ResultsServer] = None
+        self.watcher: typing.Union[InotifyWatcher, PollingWatcher]
+
+        try:
+            self.watcher = InotifyWatcher(registryChecker.repositoryPath)
+            logging.debug(
+                f"Watching {len(self.watcher.watches)} folders with inotify"
+            )
+        except OSError as ex:
+            logging.warning(
+                " ".join((
+                    f"Could not use inotify ({ex}), will be scanning",
+                    f"for changes every {watchPollingInterval} s instead"
+                ))
+            )
+            self.watcher = PollingWatcher(registryChecker.repositoryPath)
+
+        if self.socketPath is not None:
+            try:
+                self.startServer(self.socketPath)
+            except OSError:
+                self.watcher.close()
+                raise
+
+    # raises OSError if the socket is taken by another running watcher
+    def startServer(self, socketPath: pathlib.Path) -> None:
+        if socketPath.exists():
+            # it might be left from a watcher that was killed
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socketPath.as_posix())
+            except OSError:
+                socketPath.unlink()
+            else:
+                raise OSError(
+                    errno.EADDRINUSE,
+                    f"Another watcher is already serving at [{socketPath}]"
+                )
+            finally:
+                probe.close()
+        socketPath.parent.mkdir(parents=True, exist_ok=True)
+        self.resultsServer = ResultsServer(socketPath, self)
+        threading.Thread(
+            target=self.resultsServer.serve_forever,
+            name="results-server",
+            daemon=True
+        ).start()
+        logging.info(f"Serving results at [{socketPath}]")
+
+    def getStatus(
+        self,
+        recipes: typing.Optional[typing.List[str]] = None
+    ) -> typing.Dict[str, typing.Any]:
+        with self.lock:
+            results = (
+                [self.results[p] for p in sorted(self.results)]
+                if recipes is None
+                else [self.results[p] for p in recipes if p in self.results]
+            )
+            return {
+                "generation": self.generation,
+                "isVerifying": self.isVerifying,
+                "recipes": [r.toDict() for r in results],
+                "problematicRecipes": [r.name for r in results if r.isProblematic]
+            }
+
+    # `changedPaths` as returned by watchers, with None meaning everything
+    def verify(
+        self,
+        changedPaths: typing.Optional[typing.Set[str]]
+    ) -> typing.Tuple[typing.List[RecipeResult], typing.List[str]]:
+        existingRecipes: typing.Set[str] = set(self.registryChecker.getRecipes())
+        # changed ignore rules might change the hash of any recipe
+        if changedPaths is not None and not changedPaths.isdisjoint(ignoreFiles):
+            changedPaths = None
+        if changedPaths is None:
+            self.registryChecker.worktreeHasher.reloadIgnoreRules()
+            affectedRecipes = existingRecipes | set(self.results)
+        else:
+            # the whole index is only needed to map `common/cmake` files
+            recipesIndex: typing.Dict[str, RecipeMetadata] = (
+                self.registryChecker.loadRecipesIndex()
+                if any(p.startswith("common/") for p in changedPaths)
+                else {}
+            )
+            affectedRecipes = getAffectedRecipes(changedPaths, recipesIndex)
+        removedRecipes: typing.List[str] = sorted(
+            p for p in affectedRecipes - existingRecipes if p in self.results
+        )
+
+        results: typing.List[RecipeResult] = []
+        with self.lock:
+            self.isVerifying = True
+        try:
+            results = list(
+                self.registryChecker.verifyRecipes(
+                    sorted(affectedRecipes & existingRecipes),
+                    self.jobsCnt
+                )
+            )
+        finally:
+            with self.lock:
+                for r in results:
+                    self.results[r.name] = r
+                for p in removedRecipes:
+                    del self.results[p]
+                self.generation += 1
+                self.isVerifying = False
+        return (results, removedRecipes)
+
+    def waitForChanges(self) -> typing.Optional[typing.Set[str]]:
+        changedPaths = self.watcher.waitForChanges(None)
+        while True:
+            morePaths = self.watcher.waitForChanges(watchDebounceInterval)
+            if morePaths is not None and not morePaths:
+                return changedPaths
+            if changedPaths is None or morePaths is None:
+                changedPaths = None
+            else:
+                changedPaths |= morePaths
+
+    # verifies everything, and then only what changes, until interrupted;
+    # the callback gets the results of every verification
+    # along with the recipes that are no longer there
+    def run(
+        self,
+        onResults: typing.Callable[
+            [typing.List[RecipeResult], typing.List[str]],
+            None
+        ]
+    ) -> None:
+        onResults(*self.verify(None))
+        while True:
+            changedPaths = self.waitForChanges()
+            # events about files that do not matter, like in the root folder
+            if changedPaths is not None and not changedPaths:
+                continue
+            logging.debug(
+                "Everything might have changed"
+                if changedPaths is None
+                else f"Changed paths: {sorted(changedPaths)}"
+            )
+            results, removedRecipes = self.verify(changedPaths)
+            if results or removedRecipes:
+                onResults(results, removedRecipes)
+
+    def close(self) -> None:
+        self.watcher.close()
+        if self.resultsServer is not None:
+            self.resultsServer.shutdown()
+            self.resultsServer.server_close()
+            self.resultsServer = None
+            if self.socketPath is not None:
+                self.socketPath.unlink(missing_ok=True)
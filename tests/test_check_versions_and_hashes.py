@@ -0,0 +1,160 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+import unittest
+
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+from test_registry_checker import (
+    GitRepositoryTestCase,
+    makeConanfile,
+    runGit,
+    writeFiles
+)
+
+checkerScript: pathlib.Path = (
+    pathlib.Path(__file__).resolve().parent.parent
+    / "scripts"
+    / "check-versions-and-hashes.py"
+)
+
+# the one from `check-versions-and-hashes.py`
+startupTargetMilliseconds: float = 50
+# wall-clock limits are too noisy for shared machines (such as CI runners),
+# so the startup time is only checked when asked for, otherwise
+# it is only checked that heavy modules are not imported;
+# `scripts/benchmark-checker.py` measures it too
+startupTimingEnvVar: str = "CHECKER_TEST_STARTUP_TIME"
+
+
+def getBestWallTimes(cmds, runsCnt: int = 10) -> typing.List[float]:
+    # the startup is measured with the bytecode cached, as it is for users,
+    # so it should not be disabled by the environment, and the first run
+    # (which compiles and caches it) is not counted
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    for cmd in cmds:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+    # commands take turns, so a slow period affects all of them alike
+    best: typing.List[float] = [float("inf")] * len(cmds)
+    for _ in range(runsCnt):
+        for i, cmd in enumerate(cmds):
+            startTime = time.perf_counter()
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+            best[i] = min(best[i], time.perf_counter() - startTime)
+    return best
+
+
+class StartupTests(unittest.TestCase):
+    def test_heavy_modules_are_not_imported_by_default(self):
+        # every imported module is reported as `import time: ... | ... | name`
+        importTimes = subprocess.run(
+            [sys.executable, "-X", "importtime", str(checkerScript), "--help"],
+            check=True,
+            text=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        ).stderr
+        importedModules = {
+            line.rsplit("|", 1)[-1].strip().split(".")[0]
+            for line in importTimes.splitlines()
+            if line.startswith("import time:")
+        }
+        self.assertIn("registry_checker", importedModules)
+        for m in ("pandas", "pandera", "tabulate", "colorama"):
+            self.assertNotIn(m, importedModules)
+
+    @unittest.skipUnless(
+        os.environ.get(startupTimingEnvVar),
+        f"set {startupTimingEnvVar}=1 to check the startup time"
+    )
+    def test_help_is_within_startup_target(self):
+        bareWallTime, checkerWallTime = getBestWallTimes([
+            [sys.executable, "-c", "pass"],
+            [sys.executable, str(checkerScript), "--help"]
+        ])
+        self.assertLessEqual(
+            (checkerWallTime - bareWallTime) * 1000,
+            startupTargetMilliseconds
+        )
+
+
+
+# recipes of a registry, some of which are problematic
+class RegistryTestCase(GitRepositoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipes: typing.List[str] = [f"recipe-{i}" for i in range(8)]
+        writeFiles(
+            self.repositoryPath,
+            {
+                f"recipes/{p}/conanfile.py": makeConanfile("1.0", i).replace(
+                    "\"zlib\"",
+                    f"\"{p}\""
+                )
+                for i, p in enumerate(self.recipes)
+            }
+        )
+        writeFiles(self.repositoryPath, {"versions/baseline.json": "{}\n"})
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipes")
+
+    def writeVersionsFile(self, p: str, gitTree: str) -> None:
+        recipeVersion = self.recipes.index(p)
+        versionsFileEntry: typing.Dict[str, typing.Any] = {"version": "1.0"}
+        if recipeVersion != 0:
+            versionsFileEntry["recipe-version"] = recipeVersion
+        versionsFileEntry["git-tree"] = gitTree
+        writeFiles(
+            self.repositoryPath,
+            {
+                f"versions/{p[0]}-/{p}.json": json.dumps(
+                    {"versions": [versionsFileEntry]}
+                )
+            }
+        )
+
+    def runChecker(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(checkerScript), str(self.repositoryPath), *args],
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+
+class JobsTests(RegistryTestCase):
+    def test_parallel_results_are_the_same(self):
+        for p in self.recipes:
+            self.writeVersionsFile(
+                p,
+                runGit(self.repositoryPath, "rev-parse", f"HEAD:recipes/{p}")
+            )
+        # a wrong tree, and no versions file at all
+        self.writeVersionsFile("recipe-2", "0" * 40)
+        (self.repositoryPath / "versions" / "r-" / "recipe-5.json").unlink()
+
+        for outputFormat in ("table", "json", "ndjson"):
+            with self.subTest(outputFormat):
+                sequential = self.runChecker(
+                    "--no-cache", "--format", outputFormat, "--jobs", "1"
+                )
+                self.assertEqual(sequential.returncode, 1)
+                self.assertIn("recipe-2", sequential.stdout)
+                self.assertIn("recipe-5", sequential.stdout)
+                for jobsCnt in ("2", "8"):
+                    parallel = self.runChecker(
+                        "--no-cache", "--format", outputFormat, "--jobs", jobsCnt
+                    )
+                    self.assertEqual(parallel.returncode, sequential.returncode)
+                    self.assertEqual(parallel.stdout, sequential.stdout)
+                    self.assertEqual(parallel.stderr, sequential.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
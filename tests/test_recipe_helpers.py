@@ -0,0 +1,489 @@
+import concurrent.futures
+import importlib.util
+import json
+import multiprocessing
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+import types
+import unittest
+import unittest.mock
+
+import typing
+
+import yaml
+
+repositoryRoot: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repositoryRoot / "scripts"))
+
+import recipes_index
+
+from test_registry_checker import (
+    runGit,
+    writeFiles
+)
+
+
+# the module is what recipes get with `python_requires`
+def loadRecipeHelpers() -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location(
+        "recipe_helpers",
+        repositoryRoot / "recipes" / "recipe-helpers" / "conanfile.py"
+    )
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+recipeHelpers: types.ModuleType = loadRecipeHelpers()
+
+
+class FakeConf:
+    def __init__(self, values: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        self.values: typing.Dict[str, typing.Any] = values or {}
+
+    def get(self, name, default=None, check_type=None, choices=None):
+        return self.values.get(name, default)
+
+
+class FakeOutput:
+    def __init__(self):
+        self.messages: typing.List[typing.Tuple[str, str]] = []
+
+    def info(self, message, *args, **kwargs):
+        self.messages.append(("info", message))
+
+    def warning(self, message, *args, **kwargs):
+        self.messages.append(("warning", message))
+
+    def getWarnings(self) -> typing.List[str]:
+        return [m for level, m in self.messages if level == "warning"]
+
+
+# only what the helpers (and `conan.tools.scm.Git`) use in `source()`
+class FakeConanfile:
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        exportSourcesFolder: pathlib.Path,
+        conanData: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        conf: typing.Optional[typing.Dict[str, typing.Any]] = None
+    ):
+        self.name: str = name
+        self.version: str = version
+        self.export_sources_folder: str = str(exportSourcesFolder)
+        self.conan_data: typing.Optional[typing.Dict[str, typing.Any]] = conanData
+        self.conf: FakeConf = FakeConf(conf)
+        self.output: FakeOutput = FakeOutput()
+        self._conan_helpers = types.SimpleNamespace(global_conf=FakeConf())
+
+
+class RecipeHelpersTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpFolder = tempfile.TemporaryDirectory()
+        self.tmpPath = pathlib.Path(self.tmpFolder.name)
+
+    def tearDown(self):
+        self.tmpFolder.cleanup()
+
+    # the export sources folder of a real recipe from this registry
+    def exportRecipeSources(self, p: str) -> FakeConanfile:
+        recipePath = repositoryRoot / "recipes" / p
+        with open(recipePath / "conandata.yml", "r") as f:
+            conanData = yaml.safe_load(f)
+        exportSourcesFolder = self.tmpPath / "export-sources"
+        shutil.copytree(recipePath / "patches", exportSourcesFolder / "patches")
+        recipeMetadata = recipes_index.parseConanfile(
+            (recipePath / "conanfile.py").read_text()
+        )
+        return FakeConanfile(
+            p,
+            recipeMetadata.version,
+            exportSourcesFolder,
+            conanData
+        )
+
+
+class GitTestCase(RecipeHelpersTestCase):
+    def setUp(self):
+        super().setUp()
+        # sources are fetched relative to the current folder, as in `source()`
+        self.previousFolder = os.getcwd()
+        self.sourceFolder = self.tmpPath / "source"
+        self.sourceFolder.mkdir()
+        os.chdir(self.sourceFolder)
+
+    def tearDown(self):
+        os.chdir(self.previousFolder)
+        super().tearDown()
+
+    # a bare repository with a few commits, as an upstream server would have,
+    # returns its URL and the commits, the oldest first
+    def makeUpstream(self, name: str = "upstream") -> typing.Tuple[str, typing.List[str]]:
+        worktreePath = self.tmpPath / f"{name}-worktree"
+        worktreePath.mkdir()
+        runGit(worktreePath, "init", "--quiet", "--initial-branch=main")
+        commits: typing.List[str] = []
+        for i in range(3):
+            writeFiles(worktreePath, {"version.txt": f"{i}\n"})
+            runGit(worktreePath, "add", "--all")
+            runGit(worktreePath, "commit", "--quiet", "-m", f"Version {i}")
+            commits.append(runGit(worktreePath, "rev-parse", "HEAD"))
+        bareRepositoryPath = self.tmpPath / f"{name}.git"
+        runGit(
+            self.tmpPath,
+            "clone",
+            "--quiet",
+            "--bare",
+            worktreePath.as_posix(),
+            bareRepositoryPath.as_posix()
+        )
+        # `file://`, so it goes through the same transport as a remote would
+        return (bareRepositoryPath.as_uri(), commits)
+
+    def assertCheckedOut(self, target: str, commit: str, version: int):
+        targetPath = self.sourceFolder / target
+        self.assertEqual(runGit(targetPath, "rev-parse", "HEAD"), commit)
+        self.assertEqual((targetPath / "version.txt").read_text(), f"{version}\n")
+
+
+class FetchGitCommitTests(GitTestCase):
+    def test_only_the_commit_is_fetched(self):
+        url, commits = self.makeUpstream()
+        conanfile = FakeConanfile("zlib", "1.0", self.tmpPath)
+
+        recipeHelpers.fetchGitCommit(conanfile, url, commits[1])
+
+        self.assertCheckedOut("src", commits[1], 1)
+        self.assertEqual(
+            runGit(self.sourceFolder / "src", "rev-parse", "--is-shallow-repository"),
+            "true"
+        )
+        self.assertEqual(
+            runGit(self.sourceFolder / "src", "rev-list", "--count", "--all"),
+            "1"
+        )
+        self.assertEqual(conanfile.output.getWarnings(), [])
+
+    def test_full_fetch_when_commit_cannot_be_fetched(self):
+        url, commits = self.makeUpstream()
+        conanfile = FakeConanfile("zlib", "1.0", self.tmpPath)
+        # protocol v2 lets any commit be fetched, but a server
+        # with the older protocol refuses the ones that are not advertised
+        upstreamPath = self.tmpPath / "upstream.git"
+        runGit(upstreamPath, "config", "uploadpack.allowReachableSHA1InWant", "false")
+        runGit(upstreamPath, "config", "uploadpack.allowAnySHA1InWant", "false")
+        with unittest.mock.patch.dict(
+            os.environ,
+            {
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "protocol.version",
+                "GIT_CONFIG_VALUE_0": "0"
+            }
+        ):
+            recipeHelpers.fetchGitCommit(conanfile, url, commits[1])
+
+        self.assertCheckedOut("src", commits[1], 1)
+        self.assertEqual(
+            runGit(self.sourceFolder / "src", "rev-parse", "--is-shallow-repository"),
+            "false"
+        )
+        self.assertEqual(len(conanfile.output.getWarnings()), 1)
+        self.assertIn(
+            "will fetch the entire repository instead",
+            conanfile.output.getWarnings()[0]
+        )
+
+
+# these run in separate processes, as Conan's `Git` changes the current folder
+def updateGitMirrorInProcess(
+    gitMirrorFolder: pathlib.Path,
+    url: str,
+    commit: str
+) -> str:
+    conanfile = FakeConanfile("zlib", "1.0", gitMirrorFolder)
+    return str(
+        recipeHelpers.updateGitMirror(
+            conanfile,
+            gitMirrorFolder,
+            url,
+            commit,
+            False,
+            False
+        )
+    )
+
+
+def holdLockInProcess(lockPath: pathlib.Path) -> typing.Tuple[float, float]:
+    with recipeHelpers.lockFile(lockPath, exclusive=True):
+        startTime = time.monotonic()
+        time.sleep(0.2)
+        return (startTime, time.monotonic())
+
+
+class GitMirrorTests(GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gitMirrorFolder = self.tmpPath / "git-mirror"
+
+    def makeConanfile(self, offline: bool = False) -> FakeConanfile:
+        return FakeConanfile(
+            "zlib",
+            "1.0",
+            self.tmpPath,
+            conf={
+                "user.recipe-helpers:git_mirror": str(self.gitMirrorFolder),
+                "user.recipe-helpers:git_offline": offline
+            }
+        )
+
+    def getInfoMessages(self, conanfile: FakeConanfile) -> typing.List[str]:
+        return [m for level, m in conanfile.output.messages if level == "info"]
+
+    def test_clone_uses_mirror(self):
+        url, commits = self.makeUpstream()
+
+        conanfile = self.makeConanfile()
+        recipeHelpers.fetchGitCommit(conanfile, url, commits[1], target="first")
+        self.assertCheckedOut("first", commits[1], 1)
+        self.assertTrue(
+            any(
+                "--reference" in m and "--dissociate" in m
+                for m in self.getInfoMessages(conanfile)
+            )
+        )
+        # dissociated, so it does not depend on the mirror
+        self.assertFalse(
+            (self.sourceFolder / "first" / ".git" / "objects" / "info" / "alternates").exists()
+        )
+        self.assertEqual(
+            runGit(self.sourceFolder / "first", "remote", "get-url", "origin"),
+            url
+        )
+
+        # the mirror already has the commit, so it is not updated again
+        conanfile = self.makeConanfile()
+        recipeHelpers.fetchGitCommit(conanfile, url, commits[2], target="second")
+        self.assertCheckedOut("second", commits[2], 2)
+        self.assertFalse(
+            any(m.startswith("Updating git mirror") for m in self.getInfoMessages(conanfile))
+        )
+
+    def test_offline_clone_from_mirror(self):
+        url, commits = self.makeUpstream()
+        recipeHelpers.fetchGitCommit(self.makeConanfile(), url, commits[0], target="online")
+        # the upstream is gone, but the mirror has everything
+        shutil.rmtree(self.tmpPath / "upstream.git")
+
+        recipeHelpers.fetchGitCommit(
+            self.makeConanfile(offline=True),
+            url,
+            commits[1],
+            target="offline"
+        )
+        self.assertCheckedOut("offline", commits[1], 1)
+        self.assertEqual(
+            runGit(self.sourceFolder / "offline", "remote", "get-url", "origin"),
+            url
+        )
+
+    def test_offline_without_mirror(self):
+        url, commits = self.makeUpstream()
+        with self.assertRaises(recipeHelpers.ConanException):
+            recipeHelpers.fetchGitCommit(
+                self.makeConanfile(offline=True),
+                url,
+                commits[0]
+            )
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_concurrent_mirror_updates(self):
+        url, commits = self.makeUpstream()
+        with concurrent.futures.ProcessPoolExecutor(
+            4,
+            mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            mirrorPaths = list(
+                executor.map(
+                    updateGitMirrorInProcess,
+                    [self.gitMirrorFolder] * 4,
+                    [url] * 4,
+                    [commits[2]] * 4
+                )
+            )
+
+        self.assertEqual(len(set(mirrorPaths)), 1)
+        mirrorPath = pathlib.Path(mirrorPaths[0])
+        runGit(mirrorPath, "fsck", "--no-progress")
+        self.assertEqual(runGit(mirrorPath, "rev-parse", "main"), commits[2])
+        self.assertEqual(runGit(mirrorPath, "remote"), "origin")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_lock_is_exclusive(self):
+        lockPath = self.tmpPath / "mirror.lock"
+        with concurrent.futures.ProcessPoolExecutor(
+            3,
+            mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            intervals = sorted(executor.map(holdLockInProcess, [lockPath] * 3))
+        for (_, previousEnd), (nextStart, _) in zip(intervals, intervals[1:]):
+            self.assertGreaterEqual(nextStart, previousEnd)
+
+
+class SourcesCacheKeyTests(RecipeHelpersTestCase):
+    def test_flat_list_of_patches(self):
+        # ryu lists its patches without versions
+        conanfile = self.exportRecipeSources("ryu")
+        self.assertIsInstance(conanfile.conan_data["patches"], list)
+
+        key = recipeHelpers.getSourcesCacheKey(conanfile, "1" * 40, None)
+        # the patch is a part of the key
+        with open(
+            pathlib.Path(conanfile.export_sources_folder)
+            / "patches"
+            / "001-installation.patch",
+            "a"
+        ) as f:
+            f.write("\n")
+        self.assertNotEqual(
+            recipeHelpers.getSourcesCacheKey(conanfile, "1" * 40, None),
+            key
+        )
+
+    def test_patches_per_version(self):
+        conanfile = self.exportRecipeSources("ryu")
+        conanfile.conan_data = {
+            "patches": {
+                conanfile.version: conanfile.conan_data["patches"],
+                "0.1": []
+            }
+        }
+        versionKey = recipeHelpers.getSourcesCacheKey(conanfile, "1" * 40, None)
+        conanfile.version = "0.1"
+        self.assertNotEqual(
+            recipeHelpers.getSourcesCacheKey(conanfile, "1" * 40, None),
+            versionKey
+        )
+
+
+
+class SourcesCacheTests(GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sourcesCacheFolder = self.tmpPath / "sources-cache"
+        self.exportSourcesFolder = self.tmpPath / "export-sources"
+        writeFiles(
+            self.exportSourcesFolder,
+            {"patches/001-fix.patch": "the first fix\n"}
+        )
+        self.preparedCnt: int = 0
+
+    def makeConanfile(self) -> FakeConanfile:
+        return FakeConanfile(
+            "zlib",
+            "1.0",
+            self.exportSourcesFolder,
+            {"patches": [{"patch_file": "patches/001-fix.patch"}]},
+            {"user.recipe-helpers:sources_cache": str(self.sourcesCacheFolder)}
+        )
+
+    def fetchSources(self, url: str, commit: str, target: str) -> FakeConanfile:
+        conanfile = self.makeConanfile()
+
+        # stands for applying the patches and such
+        def prepare():
+            self.preparedCnt += 1
+            writeFiles(self.sourceFolder / target, {"prepared.txt": "prepared\n"})
+
+        recipeHelpers.fetchSources(conanfile, url, commit, target, prepare)
+        return conanfile
+
+    def getStats(self) -> typing.Dict[str, int]:
+        with open(self.sourcesCacheFolder / "stats.json", "r") as f:
+            return json.load(f)
+
+    def test_miss_and_then_hit(self):
+        url, commits = self.makeUpstream()
+        self.fetchSources(url, commits[1], "first")
+        self.assertEqual(self.preparedCnt, 1)
+        self.assertEqual(len(list(self.sourcesCacheFolder.glob("*.tar"))), 1)
+        self.assertEqual(self.getStats(), {"hits": 0, "misses": 1, "evictions": 0})
+
+        # a hit does not go to the upstream, and does not prepare anything
+        shutil.rmtree(self.tmpPath / "upstream.git")
+        self.fetchSources(url, commits[1], "second")
+        self.assertEqual(self.preparedCnt, 1)
+        self.assertEqual(self.getStats(), {"hits": 1, "misses": 1, "evictions": 0})
+        secondPath = self.sourceFolder / "second"
+        self.assertEqual((secondPath / "version.txt").read_text(), "1\n")
+        self.assertEqual((secondPath / "prepared.txt").read_text(), "prepared\n")
+        # the history is not cached
+        self.assertFalse((secondPath / ".git").exists())
+
+    def test_changed_patch_is_a_miss(self):
+        url, commits = self.makeUpstream()
+        self.fetchSources(url, commits[1], "first")
+        writeFiles(
+            self.exportSourcesFolder,
+            {"patches/001-fix.patch": "the second fix\n"}
+        )
+        self.fetchSources(url, commits[1], "second")
+        self.assertEqual(self.preparedCnt, 2)
+        self.assertEqual(self.getStats(), {"hits": 0, "misses": 2, "evictions": 0})
+        self.assertEqual(len(list(self.sourcesCacheFolder.glob("*.tar"))), 2)
+
+    def test_least_recently_used_are_evicted(self):
+        self.sourcesCacheFolder.mkdir()
+        archives: typing.List[pathlib.Path] = []
+        for i, key in enumerate(("oldest", "older", "newer", "newest")):
+            archive = self.sourcesCacheFolder / f"{key}.tar"
+            archive.write_bytes(b"\0" * 1000)
+            os.utime(archive, (1000000 + i, 1000000 + i))
+            archives.append(archive)
+
+        # the one that has just been stored is kept, even if it is the oldest
+        evictedCnt = recipeHelpers.evictCachedSources(
+            self.sourcesCacheFolder,
+            2500,
+            archives[0]
+        )
+        self.assertEqual(evictedCnt, 2)
+        self.assertEqual(
+            sorted(a.name for a in self.sourcesCacheFolder.glob("*.tar")),
+            ["newest.tar", "oldest.tar"]
+        )
+        # nothing to evict, when it fits
+        self.assertEqual(
+            recipeHelpers.evictCachedSources(self.sourcesCacheFolder, 2500, archives[0]),
+            0
+        )
+
+    def test_hit_makes_sources_recently_used(self):
+        url, commits = self.makeUpstream()
+        self.fetchSources(url, commits[0], "first")
+        self.fetchSources(url, commits[1], "second")
+        firstArchive, secondArchive = sorted(
+            self.sourcesCacheFolder.glob("*.tar"),
+            key=lambda a: a.stat().st_mtime
+        )
+        os.utime(firstArchive, (1000000, 1000000))
+        os.utime(secondArchive, (2000000, 2000000))
+
+        # a hit of the older one, and then there is only room for one of them
+        self.fetchSources(url, commits[0], "third")
+        recipeHelpers.evictCachedSources(
+            self.sourcesCacheFolder,
+            firstArchive.stat().st_size,
+            self.sourcesCacheFolder / "none.tar"
+        )
+        self.assertTrue(firstArchive.is_file())
+        self.assertFalse(secondArchive.is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+from recipes_index import (
+    getDefaultIndexFile,
+    loadRecipesIndex,
+    recipesIndexRacyInterval
+)
+
+from test_registry_checker import (
+    makeConanfile,
+    writeFiles
+)
+
+
+class RecipesIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpFolder = tempfile.TemporaryDirectory()
+        self.repositoryPath = pathlib.Path(self.tmpFolder.name)
+        self.indexFile = getDefaultIndexFile(self.repositoryPath)
+        self.conanfile = self.repositoryPath / "recipes" / "zlib" / "conanfile.py"
+
+    def tearDown(self):
+        self.tmpFolder.cleanup()
+
+    # the same size and the same mtime, as an edit within one mtime tick would be
+    def editInPlace(self, content: str) -> None:
+        conanfileStat = self.conanfile.stat()
+        self.assertEqual(len(content), conanfileStat.st_size)
+        self.conanfile.write_text(content)
+        os.utime(
+            self.conanfile,
+            ns=(conanfileStat.st_atime_ns, conanfileStat.st_mtime_ns)
+        )
+
+    def test_recently_modified_conanfile_is_read_again(self):
+        writeFiles(self.repositoryPath, {"recipes/zlib/conanfile.py": makeConanfile("1.3.1", 1)})
+        self.assertEqual(
+            loadRecipesIndex(self.repositoryPath, self.indexFile)["zlib"].recipeVersion,
+            1
+        )
+
+        self.editInPlace(makeConanfile("1.3.1", 2))
+        self.assertEqual(
+            loadRecipesIndex(self.repositoryPath, self.indexFile)["zlib"].recipeVersion,
+            2
+        )
+
+    def test_old_conanfile_is_trusted_by_stat(self):
+        writeFiles(self.repositoryPath, {"recipes/zlib/conanfile.py": makeConanfile("1.3.1", 1)})
+        oldTime = time.time_ns() - 2 * recipesIndexRacyInterval
+        os.utime(self.conanfile, ns=(oldTime, oldTime))
+        loadRecipesIndex(self.repositoryPath, self.indexFile)
+
+        # such an edit is not noticed, but that is what the stat values are for
+        self.editInPlace(makeConanfile("1.3.1", 2))
+        self.assertEqual(
+            loadRecipesIndex(self.repositoryPath, self.indexFile)["zlib"].recipeVersion,
+            1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import unittest
+
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+from registry_builder import (
+    BuildResult,
+    RegistryBuilder,
+    getBuildLevels
+)
+
+from test_registry_checker import (
+    GitRepositoryTestCase,
+    writeFiles
+)
+
+
+def makeRecipe(name: str, requires: typing.List[str]) -> str:
+    return "".join((
+        "from conan import ConanFile\n\n\n",
+        "class pkgConan(ConanFile):\n",
+        f"    name = \"{name}\"\n",
+        "    version = \"1.0\"\n\n",
+        "    def requirements(self):\n",
+        *(f"        self.requires(\"{r}/1.0@decovar/public\")\n" for r in requires),
+        "        pass\n"
+    ))
+
+
+class RegistryBuilderTestCase(GitRepositoryTestCase):
+    # the same chains as in the registry itself, plus an independent recipe
+    recipes: typing.Dict[str, typing.List[str]] = {
+        "zlib": [],
+        "png": ["zlib"],
+        "ryu": [],
+        "ryu-stupid-wrapper": ["ryu"],
+        "recipe-helpers": []
+    }
+
+    def setUp(self):
+        super().setUp()
+        writeFiles(
+            self.repositoryPath,
+            {
+                f"recipes/{p}/conanfile.py": makeRecipe(p, requires)
+                for p, requires in self.recipes.items()
+            }
+        )
+
+    # a `conan` that only fails to create the given recipes
+    def makeConanCommand(self, failingRecipes: typing.Set[str]) -> str:
+        conanCommand = self.repositoryPath / ".cache" / "conan"
+        writeFiles(
+            self.repositoryPath,
+            {
+                ".cache/conan": "".join((
+                    f"#!{sys.executable}\n",
+                    "import pathlib\n",
+                    "import sys\n",
+                    "recipe = pathlib.Path(sys.argv[2]).name\n",
+                    "print(f'Creating {recipe}')\n",
+                    f"sys.exit(1 if recipe in {sorted(failingRecipes)!r} else 0)\n"
+                ))
+            }
+        )
+        os.chmod(conanCommand, 0o755)
+        return str(conanCommand)
+
+    # builds nothing, only reports the given recipes as failed
+    def scheduleBuilds(
+        self,
+        registryBuilder: RegistryBuilder,
+        failingRecipes: typing.Set[str],
+        recipes: typing.Optional[typing.List[str]] = None
+    ) -> typing.Dict[str, BuildResult]:
+        return dict(
+            registryBuilder.scheduleBuilds(
+                {
+                    p: dependencies
+                    for p, dependencies in registryBuilder.dependencyGraph.items()
+                    if recipes is None or p in recipes
+                },
+                lambda p, jobs: BuildResult(
+                    p,
+                    "failed" if p in failingRecipes else "built"
+                ),
+                lambda p, d: BuildResult(p, "skipped", failedDependency=d)
+            )
+        )
+
+
+class ScheduleBuildsTests(RegistryBuilderTestCase):
+    def test_failed_dependency_with_jobs_budget(self):
+        registryBuilder = RegistryBuilder(
+            self.repositoryPath,
+            jobsCnt=2,
+            jobTokens=4
+        )
+        # once zlib fails, there is nothing left to divide the budget between
+        results = self.scheduleBuilds(registryBuilder, {"zlib"}, ["zlib", "png"])
+
+        self.assertEqual(results["zlib"].status, "failed")
+        self.assertEqual(results["png"].status, "skipped")
+        self.assertEqual(results["png"].failedDependency, "zlib")
+
+
+
+class BuildRecipesTests(RegistryBuilderTestCase):
+    def test_dependents_of_failed_recipe_are_skipped(self):
+        registryBuilder = RegistryBuilder(
+            self.repositoryPath,
+            jobsCnt=2,
+            conanCommand=self.makeConanCommand({"zlib"})
+        )
+        results = {r.name: r for r in registryBuilder.buildRecipes()}
+
+        self.assertEqual(results["zlib"].status, "failed")
+        self.assertEqual(results["zlib"].returnCode, 1)
+        self.assertEqual(results["png"].status, "skipped")
+        self.assertEqual(results["png"].failedDependency, "zlib")
+        for p in ("ryu", "ryu-stupid-wrapper", "recipe-helpers"):
+            self.assertEqual(results[p].status, "built")
+        assert results["ryu"].logFile is not None
+        self.assertIn("Creating ryu", results["ryu"].logFile.read_text())
+
+        # only the successful builds are recorded, so the rest are still to be built
+        self.assertEqual(
+            [(r.name, r.reason) for r in registryBuilder.planRebuild()],
+            [("zlib", "new"), ("png", "new")]
+        )
+
+
+
+class RebuildPlanTests(RegistryBuilderTestCase):
+    def test_build_levels(self):
+        registryBuilder = RegistryBuilder(self.repositoryPath)
+        self.assertEqual(
+            registryBuilder.dependencyGraph,
+            {
+                "png": ["zlib"],
+                "recipe-helpers": [],
+                "ryu": [],
+                "ryu-stupid-wrapper": ["ryu"],
+                "zlib": []
+            }
+        )
+        self.assertEqual(
+            registryBuilder.getBuildLevels(),
+            [["recipe-helpers", "ryu", "zlib"], ["png", "ryu-stupid-wrapper"]]
+        )
+        # dependencies that are not being built do not hold anything back
+        self.assertEqual(
+            registryBuilder.getBuildLevels(["png", "ryu-stupid-wrapper"]),
+            [["png", "ryu-stupid-wrapper"]]
+        )
+        with self.assertRaises(ValueError):
+            getBuildLevels({"png": ["zlib"], "zlib": ["png"]})
+
+    def test_rebuild_plan(self):
+        registryBuilder = RegistryBuilder(
+            self.repositoryPath,
+            conanCommand=self.makeConanCommand(set())
+        )
+        self.assertEqual(len(registryBuilder.planRebuild()), len(self.recipes))
+        for r in registryBuilder.buildRecipes():
+            self.assertEqual(r.status, "built")
+        self.assertEqual(registryBuilder.planRebuild(), [])
+
+        writeFiles(self.repositoryPath, {"recipes/zlib/patches/001-fix.patch": "fix\n"})
+        self.assertEqual(
+            [r.toDict() for r in registryBuilder.planRebuild()],
+            [
+                {"recipe": "zlib", "reason": "changed", "dependency": None},
+                {"recipe": "png", "reason": "dependency", "dependency": "zlib"}
+            ]
+        )
+
+        writeFiles(self.repositoryPath, {"recipes/ryu/patches/001-fix.patch": "fix\n"})
+        rebuildPlan = [r.toDict() for r in registryBuilder.planRebuild()]
+        self.assertEqual(
+            rebuildPlan,
+            [
+                {"recipe": "ryu", "reason": "changed", "dependency": None},
+                {"recipe": "zlib", "reason": "changed", "dependency": None},
+                {"recipe": "png", "reason": "dependency", "dependency": "zlib"},
+                {"recipe": "ryu-stupid-wrapper", "reason": "dependency", "dependency": "ryu"}
+            ]
+        )
+
+        # and the same from the command line
+        planRebuildScript = pathlib.Path(__file__).resolve().parent.parent / "scripts" / "plan-rebuild.py"
+        planned = subprocess.run(
+            [sys.executable, str(planRebuildScript), str(self.repositoryPath), "--format", "json"],
+            check=True,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.assertEqual(json.loads(planned.stdout), rebuildPlan)
+        # every configuration is built separately
+        planned = subprocess.run(
+            [
+                sys.executable,
+                str(planRebuildScript),
+                str(self.repositoryPath),
+                "--conan-args",
+                "-s build_type=Debug"
+            ],
+            check=True,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.assertEqual(
+            planned.stdout.splitlines(),
+            ["recipe-helpers", "ryu", "zlib", "png", "ryu-stupid-wrapper"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,408 @@
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+from registry_checker import (
+    RegistryChecker,
+    VersionsFixer,
+    WorktreeHasher,
+    getHistoricalTrees
+)
+
+
+def runGit(repositoryPath: pathlib.Path, *args: str) -> str:
+    return subprocess.run(
+        [
+            "git",
+            "-c", "user.name=test",
+            "-c", "user.email=test@localhost",
+            "-c", "commit.gpgsign=false",
+            "-C", repositoryPath.as_posix(),
+            *args
+        ],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE
+    ).stdout.strip()
+
+
+def writeFiles(repositoryPath: pathlib.Path, files: typing.Dict[str, str]) -> None:
+    for filePath, content in files.items():
+        (repositoryPath / filePath).parent.mkdir(parents=True, exist_ok=True)
+        (repositoryPath / filePath).write_text(content)
+
+
+class GitRepositoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpFolder = tempfile.TemporaryDirectory()
+        self.repositoryPath = pathlib.Path(self.tmpFolder.name)
+        runGit(self.repositoryPath, "init", "--quiet", "--initial-branch=main")
+
+    def tearDown(self):
+        self.tmpFolder.cleanup()
+
+
+class WorktreeHasherTests(GitRepositoryTestCase):
+    def test_tracked_file_matching_ignore_rules_is_hashed(self):
+        writeFiles(
+            self.repositoryPath,
+            {
+                ".gitignore": "*.so\nbuild/\n",
+                "recipes/ryu/conanfile.py": "pass\n",
+                "recipes/ryu/lib/prebuilt.so": "binary\n",
+                "recipes/ryu/build/kept.txt": "kept\n"
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(
+            self.repositoryPath,
+            "add",
+            "--force",
+            "recipes/ryu/lib/prebuilt.so",
+            "recipes/ryu/build/kept.txt"
+        )
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Prebuilt")
+        # and these are not tracked, so they are still ignored
+        writeFiles(
+            self.repositoryPath,
+            {
+                "recipes/ryu/lib/other.so": "other\n",
+                "recipes/ryu/build/output.txt": "output\n",
+                "recipes/ryu/local.so": "local\n"
+            }
+        )
+
+        self.assertEqual(
+            WorktreeHasher(self.repositoryPath).getTreeHash("recipes/ryu"),
+            runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/ryu")
+        )
+
+
+class HistoricalTreesTests(GitRepositoryTestCase):
+    def commit(self, files: typing.Dict[str, str], message: str) -> str:
+        writeFiles(self.repositoryPath, files)
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", message)
+        return runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/zlib")
+
+    def test_trees_of_merged_side_branch_are_found(self):
+        self.commit({"recipes/zlib/conanfile.py": "version = 1\n"}, "Version 1")
+        runGit(self.repositoryPath, "checkout", "--quiet", "-b", "side")
+        sideOnlyTree = self.commit({"recipes/zlib/conanfile.py": "version = 2\n"}, "Version 2")
+        self.commit({"recipes/zlib/conanfile.py": "version = 3\n"}, "Version 3")
+        # the main line gets the end result of the side branch on its own,
+        # so the merge does not change anything there
+        runGit(self.repositoryPath, "checkout", "--quiet", "main")
+        self.commit({"recipes/zlib/conanfile.py": "version = 3\n"}, "Version 3 again")
+        self.commit({"README.md": "registry\n"}, "Readme")
+        runGit(self.repositoryPath, "merge", "--quiet", "--no-edit", "--no-ff", "side")
+
+        historicalTrees = getHistoricalTrees(self.repositoryPath, "HEAD", "recipes")
+        self.assertIn(("zlib", sideOnlyTree), historicalTrees)
+
+
+
+def makeConanfile(version: str, recipeVersion: int) -> str:
+    return "".join((
+        "from conan import ConanFile\n\n\n",
+        "class pkgConan(ConanFile):\n",
+        "    name = \"zlib\"\n",
+        f"    version = \"{version}\"\n",
+        f"    recipe_version = {recipeVersion}\n"
+    ))
+
+
+# a recipe that copies the given files from `common/cmake` in `export_sources()`
+def makeConanfileWithExports(name: str, patterns: typing.List[str]) -> str:
+    return "".join((
+        "import pathlib\n\n",
+        "from conan import ConanFile\n",
+        "from conan.tools.files import copy\n\n\n",
+        "class pkgConan(ConanFile):\n",
+        f"    name = \"{name}\"\n",
+        "    version = \"1.0\"\n\n",
+        "    def export_sources(self):\n",
+        *(
+            "".join((
+                "        copy(\n",
+                "            self,\n",
+                f"            \"{pattern}\",\n",
+                "            src=pathlib.Path(self.recipe_folder) / \"..\" / \"..\" / \"common\" / \"cmake\",\n",
+                "            dst=pathlib.Path(self.export_sources_folder) / \"_additional-files\"\n",
+                "        )\n"
+            ))
+            for pattern in patterns
+        ),
+        "        pass\n"
+    ))
+
+
+class ChangedRecipesTests(GitRepositoryTestCase):
+    def test_common_cmake_change_affects_recipes_using_it(self):
+        writeFiles(
+            self.repositoryPath,
+            {
+                "common/cmake/Installing.cmake": "install()\n",
+                "common/cmake/Config.cmake.in": "@PACKAGE_INIT@\n",
+                "recipes/zlib/conanfile.py": makeConanfileWithExports(
+                    "zlib",
+                    ["Installing.cmake", "Config.cmake.in"]
+                ),
+                "recipes/png/conanfile.py": makeConanfileWithExports("png", ["*.cmake"]),
+                "recipes/ryu/conanfile.py": makeConanfileWithExports("ryu", ["Config.cmake.in"]),
+                "recipes/ryu-stupid-wrapper/conanfile.py": makeConanfileWithExports(
+                    "ryu-stupid-wrapper",
+                    []
+                )
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipes")
+        writeFiles(self.repositoryPath, {"common/cmake/Installing.cmake": "install(TARGETS)\n"})
+        runGit(self.repositoryPath, "commit", "--quiet", "--all", "-m", "Installing")
+
+        registryChecker = RegistryChecker(self.repositoryPath, useCache=False)
+        self.assertEqual(
+            registryChecker.getChangedRecipes("HEAD~1"),
+            ["png", "zlib"]
+        )
+
+        writeFiles(self.repositoryPath, {"common/cmake/Config.cmake.in": "@PACKAGE_INIT@\n\n"})
+        runGit(self.repositoryPath, "commit", "--quiet", "--all", "-m", "Config")
+        self.assertEqual(
+            registryChecker.getChangedRecipes("HEAD~1"),
+            ["ryu", "zlib"]
+        )
+        self.assertEqual(
+            registryChecker.getChangedRecipes("HEAD~2"),
+            ["png", "ryu", "zlib"]
+        )
+
+
+class StagedModeTests(GitRepositoryTestCase):
+    def setUp(self):
+        super().setUp()
+        writeFiles(
+            self.repositoryPath,
+            {
+                "recipes/zlib/conanfile.py": makeConanfile("1.3.1", 1),
+                "recipes/png/conanfile.py": makeConanfile("1.6.53", 1).replace(
+                    "\"zlib\"",
+                    "\"png\""
+                ),
+                "versions/baseline.json": "{}\n"
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipes")
+        for p, version in (("zlib", "1.3.1"), ("png", "1.6.53")):
+            self.writeVersionsFile(
+                p,
+                version,
+                1,
+                runGit(self.repositoryPath, "rev-parse", f"HEAD:recipes/{p}")
+            )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Versions")
+
+    def writeVersionsFile(
+        self,
+        p: str,
+        version: str,
+        recipeVersion: int,
+        gitTree: str
+    ) -> None:
+        versionsFile = self.repositoryPath / "versions" / f"{p[0]}-" / f"{p}.json"
+        versionsFileContent = (
+            json.loads(versionsFile.read_text())
+            if versionsFile.is_file()
+            else {"versions": []}
+        )
+        versionsFileContent["versions"].append({
+            "version": version,
+            "recipe-version": recipeVersion,
+            "git-tree": gitTree
+        })
+        writeFiles(
+            self.repositoryPath,
+            {versionsFile.relative_to(self.repositoryPath).as_posix(): json.dumps(versionsFileContent)}
+        )
+
+    def verifyStaged(self) -> typing.Dict[str, typing.Any]:
+        registryChecker = RegistryChecker(self.repositoryPath, stagedMode=True)
+        return {
+            r.name: r
+            for r in registryChecker.verifyRecipes(registryChecker.getStagedRecipes())
+        }
+
+    def test_staged_recipe_version_bump_is_detected(self):
+        writeFiles(self.repositoryPath, {"recipes/zlib/conanfile.py": makeConanfile("1.3.1", 2)})
+        runGit(self.repositoryPath, "add", "recipes/zlib/conanfile.py")
+
+        results = self.verifyStaged()
+        self.assertEqual(list(results), ["zlib"])
+        self.assertTrue(results["zlib"].isProblematic)
+        self.assertEqual(results["zlib"].version, "1.3.1#2")
+
+        # staging the versions file entry for it makes it fine
+        self.writeVersionsFile(
+            "zlib",
+            "1.3.1",
+            2,
+            runGit(self.repositoryPath, "write-tree", "--prefix=recipes/zlib/")
+        )
+        runGit(self.repositoryPath, "add", "versions")
+        results = self.verifyStaged()
+        self.assertEqual(list(results), ["zlib"])
+        self.assertFalse(results["zlib"].isProblematic)
+
+    def test_unstaged_changes_are_ignored(self):
+        # a staged bump with its versions file entry
+        writeFiles(self.repositoryPath, {"recipes/zlib/conanfile.py": makeConanfile("1.3.1", 2)})
+        runGit(self.repositoryPath, "add", "recipes/zlib/conanfile.py")
+        self.writeVersionsFile(
+            "zlib",
+            "1.3.1",
+            2,
+            runGit(self.repositoryPath, "write-tree", "--prefix=recipes/zlib/")
+        )
+        runGit(self.repositoryPath, "add", "versions")
+        # and then more changes, which are not staged
+        writeFiles(
+            self.repositoryPath,
+            {
+                "recipes/zlib/conanfile.py": makeConanfile("1.3.1", 3),
+                "recipes/zlib/patches/001-fix.patch": "fix\n",
+                "recipes/png/conanfile.py": makeConanfile("1.6.53", 2).replace(
+                    "\"zlib\"",
+                    "\"png\""
+                )
+            }
+        )
+
+        results = self.verifyStaged()
+        self.assertEqual(list(results), ["zlib"])
+        self.assertFalse(results["zlib"].isProblematic)
+        self.assertEqual(results["zlib"].version, "1.3.1#2")
+
+
+class VersionsFixerTests(GitRepositoryTestCase):
+    def test_head_mode_takes_version_from_head(self):
+        writeFiles(
+            self.repositoryPath,
+            {
+                "recipes/zlib/conanfile.py": makeConanfile("1.3.1", 1),
+                "versions/baseline.json": "{}\n"
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipe")
+        headTree = runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/zlib")
+        # a new recipe version that is not committed yet
+        writeFiles(
+            self.repositoryPath,
+            {"recipes/zlib/conanfile.py": makeConanfile("1.3.1", 2)}
+        )
+
+        registryChecker = RegistryChecker(self.repositoryPath, useCache=False)
+        versionsFixer = VersionsFixer(registryChecker)
+        for r in registryChecker.verifyRecipes():
+            self.assertTrue(r.isProblematic)
+            self.assertTrue(versionsFixer.fix(r))
+        versionsFixer.write()
+
+        self.assertEqual(
+            json.loads(
+                (self.repositoryPath / "versions" / "z-" / "zlib.json").read_text()
+            ),
+            {
+                "versions":
+                [
+                    {
+                        "version": "1.3.1",
+                        "recipe-version": 1,
+                        "git-tree": headTree
+                    }
+                ]
+            }
+        )
+
+
+
+class ResultsCacheTests(GitRepositoryTestCase):
+    def setUp(self):
+        super().setUp()
+        writeFiles(
+            self.repositoryPath,
+            {
+                "recipes/zlib/conanfile.py": makeConanfile("1.3.1", 1),
+                "versions/baseline.json": "{}\n"
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipe")
+        writeFiles(
+            self.repositoryPath,
+            {
+                "versions/z-/zlib.json": json.dumps({
+                    "versions": [{
+                        "version": "1.3.1",
+                        "recipe-version": 1,
+                        "git-tree": runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/zlib")
+                    }]
+                })
+            }
+        )
+
+    # returns the results and how many of them were actually verified
+    def verify(self) -> typing.Tuple[typing.List[typing.Any], int]:
+        with unittest.mock.patch.object(
+            RegistryChecker,
+            "verifyRecipe",
+            autospec=True,
+            side_effect=RegistryChecker.verifyRecipe
+        ) as verifyRecipe:
+            results = list(RegistryChecker(self.repositoryPath, worktreeMode=True).verifyRecipes())
+        return (results, verifyRecipe.call_count)
+
+    def test_unchanged_recipe_is_reused(self):
+        results, verifiedCnt = self.verify()
+        self.assertEqual(verifiedCnt, 1)
+        self.assertFalse(results[0].isProblematic)
+
+        results, verifiedCnt = self.verify()
+        self.assertEqual(verifiedCnt, 0)
+        self.assertFalse(results[0].isProblematic)
+
+    def test_changed_tree_is_verified_again(self):
+        self.verify()
+        writeFiles(self.repositoryPath, {"recipes/zlib/patches/001-fix.patch": "fix\n"})
+
+        results, verifiedCnt = self.verify()
+        self.assertEqual(verifiedCnt, 1)
+        self.assertTrue(results[0].isProblematic)
+        self.assertNotEqual(results[0].actualHash, results[0].statedHash)
+
+    def test_changed_checker_is_verified_again(self):
+        self.verify()
+        with unittest.mock.patch(
+            "registry_checker.getCheckerVersion",
+            return_value="another checker"
+        ):
+            _, verifiedCnt = self.verify()
+        self.assertEqual(verifiedCnt, 1)
+        # and the other way around too
+        _, verifiedCnt = self.verify()
+        self.assertEqual(verifiedCnt, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+
+from registry_checker import RegistryChecker
+from registry_watcher import RegistryWatcher
+
+from test_registry_checker import (
+    GitRepositoryTestCase,
+    makeConanfile,
+    runGit,
+    writeFiles
+)
+
+
+class RegistryWatcherTests(GitRepositoryTestCase):
+    def test_root_gitignore_change_is_applied(self):
+        writeFiles(
+            self.repositoryPath,
+            {
+                ".gitignore": "",
+                "recipes/zlib/conanfile.py": makeConanfile("1.3.1", 0),
+                "versions/baseline.json": "{}\n",
+                "versions/z-/zlib.json": json.dumps(
+                    {"versions": [{"version": "1.3.1", "git-tree": "0" * 40}]}
+                )
+            }
+        )
+        runGit(self.repositoryPath, "add", "--all")
+        runGit(self.repositoryPath, "commit", "--quiet", "-m", "Recipe")
+        writeFiles(self.repositoryPath, {"recipes/zlib/build.log": "log\n"})
+
+        registryWatcher = RegistryWatcher(
+            RegistryChecker(self.repositoryPath, worktreeMode=True, useCache=False),
+            None
+        )
+        try:
+            results, _ = registryWatcher.verify(None)
+            self.assertNotEqual(
+                results[0].actualHash,
+                runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/zlib")
+            )
+
+            writeFiles(self.repositoryPath, {".gitignore": "*.log\n"})
+            # with a timeout, so it does not wait forever if the change is missed
+            changedPaths = registryWatcher.watcher.waitForChanges(5)
+            self.assertTrue(changedPaths is None or ".gitignore" in changedPaths)
+            results, _ = registryWatcher.verify(changedPaths)
+            self.assertEqual(
+                results[0].actualHash,
+                runGit(self.repositoryPath, "rev-parse", "HEAD:recipes/zlib")
+            )
+        finally:
+            registryWatcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()